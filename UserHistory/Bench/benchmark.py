@@ -0,0 +1,373 @@
+"""
+Archivo: `benchmark.py`
+
+Benchmarks de la capa de servicios sobre inventarios sintéticos (`generador.py`):
+- cada caso se prepara fuera del cronómetro y se mide `repeticiones` veces
+  (se reporta el mejor tiempo); luego se repite una vez bajo tracemalloc para
+  registrar el pico de memoria asignada
+- los resultados (segundos, operaciones por segundo, pico de bytes) se
+  guardan en JSON junto con los datos de la corrida
+- `--base` compara contra un JSON anterior y marca como regresión todo caso
+  cuyo tiempo supere al de la base en más del `--umbral` (sale con código 1)
+
+Uso:
+    python -m UserHistory.Bench.benchmark --filas 1000 100000 --salida actual.json
+    python -m UserHistory.Bench.benchmark --filas 100000 --base actual.json --umbral 0.15
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, Dict, Iterator, List, Optional
+
+from UserHistory.Bench.generador import escribir_csv
+from UserHistory.Service.base_datos import InventarioSQLite
+from UserHistory.Service.carga_paralela import cargar_csv_paralelo
+from UserHistory.Service.particiones import InventarioParticionado
+from UserHistory.Service.services import (
+    Product, actualizar_producto, agregar_producto, agregar_productos, buscar_producto, buscar_similares,
+    calcular_estadisticas, cargar_csv, eliminar_producto, guardar_csv, mostrar_inventario,
+    productos_en_rango, top_productos
+)
+from UserHistory.Service.snapshot import cargar_snapshot, guardar_snapshot
+from UserHistory.Service.store import InventoryStore
+from UserHistory.Utils.Validator import (
+    are_valid_names, is_valid_name, parse_fixed_decimal, parse_positive_decimal, parse_positive_decimals,
+    parse_positive_int, parse_positive_ints
+)
+
+UMBRAL_REGRESION = 0.10
+REPETICIONES = 3
+# Particiones del inventario particionado: una por núcleo
+PARTICIONES = max(2, os.cpu_count() or 1)
+
+
+@dataclass
+class Contexto:
+    """Datos compartidos por los casos de un tamaño: CSV generado y sus filas válidas."""
+    filas: int
+    directorio: str
+    ruta_csv: str
+    productos: List[Product]
+
+    # Contador para que cada preparación use una base SQLite nueva
+    _bases: Iterator[int] = field(default_factory=count)
+    # Inventarios particionados creados, para terminar sus procesos al cambiar de tamaño
+    _particionados: List[InventarioParticionado] = field(default_factory=list)
+
+    def ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    def dict(self, vacio: bool = False) -> Dict[str, Product]:
+        if vacio:
+            return {}
+        return {p.nombre: Product(p.nombre, p.precio, p.cantidad) for p in self.productos}
+
+    def store(self, vacio: bool = False) -> InventoryStore:
+        if vacio:
+            return InventoryStore()
+        return InventoryStore((p.nombre, p.precio, p.cantidad) for p in self.productos)
+
+    def fijo(self, vacio: bool = False) -> InventoryStore:
+        """InventoryStore con precios en punto fijo (centavos)."""
+        if vacio:
+            return InventoryStore(decimales=2)
+        return InventoryStore(((p.nombre, p.precio, p.cantidad) for p in self.productos), decimales=2)
+
+    def particionado(self, vacio: bool = False) -> InventarioParticionado:
+        inventario = InventarioParticionado(PARTICIONES)
+        self._particionados.append(inventario)
+        if not vacio:
+            inventario.agregar_lote([(p.nombre, p.precio, p.cantidad) for p in self.productos])
+        return inventario
+
+    def cerrar(self) -> None:
+        for inventario in self._particionados:
+            inventario.cerrar()
+        self._particionados.clear()
+
+    def sqlite(self, vacio: bool = False) -> InventarioSQLite:
+        base = InventarioSQLite(self.ruta(f"inventario_{next(self._bases)}.db"))
+        if not vacio:
+            base.agregar_lote([(p.nombre, p.precio, p.cantidad) for p in self.productos])
+        return base
+
+
+@dataclass
+class Caso:
+    nombre: str
+    # preparar(contexto) -> estado; no se mide
+    preparar: Callable[[Contexto], object]
+    # ejecutar(estado) -> nº de operaciones realizadas (para ops/s)
+    ejecutar: Callable[[object], int]
+
+
+def _cargar(tipo: str, fabrica: str, cargador: Callable = cargar_csv) -> Caso:
+    nombre = f"{cargador.__name__}[{tipo}]"
+
+    def ejecutar(estado) -> int:
+        ctx, inventario = estado
+        exito, nuevos, actualizados, errores = cargador(inventario, ctx.ruta_csv, False, "csv")
+        return nuevos + actualizados + errores
+    return Caso(nombre, lambda ctx: (ctx, getattr(ctx, fabrica)(vacio=True)), ejecutar)
+
+
+def _por_producto(nombre: str, fabrica: str, operacion: Callable[[Dict[str, Product], Product], object],
+                  vacio: bool = False) -> Caso:
+    def preparar(ctx: Contexto):
+        inventario = getattr(ctx, fabrica)(vacio)
+        return inventario, ctx.productos
+
+    def ejecutar(estado) -> int:
+        inventario, productos = estado
+        for producto in productos:
+            operacion(inventario, producto)
+        return len(productos)
+    return Caso(f"{nombre}[{fabrica}]", preparar, ejecutar)
+
+
+def _agregar(inventario, p):
+    agregar_producto(inventario, p.nombre, p.precio, p.cantidad)
+
+
+def _lote(valores: Callable[[Contexto], list], funcion: Callable[[list], object], nombre: str) -> Caso:
+    def ejecutar(valores_lote) -> int:
+        funcion(valores_lote)
+        return len(valores_lote)
+    return Caso(nombre, valores, ejecutar)
+
+
+def _veces(nombre: str, fabrica: str, consulta: Callable[[Dict[str, Product]], object], veces: int) -> Caso:
+    def ejecutar(inventario) -> int:
+        for _ in range(veces):
+            consulta(inventario)
+        return veces
+    return Caso(f"{nombre}[{fabrica}]", lambda ctx: getattr(ctx, fabrica)(), ejecutar)
+
+
+def _mostrar(inventario) -> int:
+    with contextlib.redirect_stdout(io.StringIO()):
+        mostrar_inventario(inventario, "precio")
+    return len(inventario)
+
+
+def _uno_a_uno(parser: Callable[[str], object]) -> Callable[[list], list]:
+    """Aplica un parser escalar a cada valor como lo haría el bucle previo a las versiones por lote."""
+    def aplicar(valores: list) -> list:
+        resultado = []
+        for valor in valores:
+            try:
+                resultado.append(parser(valor))
+            except ValueError:
+                resultado.append(None)
+        return resultado
+    return aplicar
+
+
+# Raíz del repositorio, para que el intérprete hijo encuentre el paquete UserHistory
+_RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _importar(modulo: str) -> Caso:
+    """Arranque de un intérprete nuevo que solo importa `modulo` (lo que tarda en abrir la CLI o una herramienta)."""
+    def preparar(ctx: Contexto):
+        entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_RAIZ, os.environ.get("PYTHONPATH")])))
+        return [sys.executable, "-c", f"import {modulo}"], entorno
+
+    def ejecutar(estado) -> int:
+        orden, entorno = estado
+        subprocess.run(orden, env=entorno, check=True)
+        return 1
+    return Caso(f"importar[{modulo.rsplit('.', 1)[-1]}]", preparar, ejecutar)
+
+
+def _textos(ctx: Contexto, campo: str) -> List[str]:
+    return [str(getattr(p, campo)) for p in ctx.productos]
+
+
+def casos() -> List[Caso]:
+    def store_con_indices(ctx: Contexto) -> InventoryStore:
+        store = ctx.store()
+        store.indices_ordenados()
+        store.indice_busqueda()
+        return store
+
+    return [
+        _importar("UserHistory.Service.services"), _importar("UserHistory.app"),
+        _cargar("dict", "dict"), _cargar("InventoryStore", "store"),
+        _cargar("InventoryStore", "store", cargar_csv_paralelo), _cargar("InventarioSQLite", "sqlite"),
+        _cargar("InventoryStore-fijo", "fijo"), _cargar("InventarioParticionado", "particionado"),
+        Caso("guardar_csv[store]", lambda ctx: (ctx.store(), ctx.ruta("salida.csv")),
+             lambda e: guardar_csv(*e) and len(e[0])),
+        Caso("guardar_csv[sqlite]", lambda ctx: (ctx.sqlite(), ctx.ruta("salida.csv")),
+             lambda e: guardar_csv(*e) and len(e[0])),
+        Caso("guardar_snapshot[store]", lambda ctx: (ctx.store(), ctx.ruta("inventario.snap")),
+             lambda e: guardar_snapshot(*e) and len(e[0])),
+        Caso("cargar_snapshot", lambda ctx: guardar_snapshot(ctx.store(), ctx.ruta("b.snap")) and ctx.ruta("b.snap"),
+             lambda ruta: len(cargar_snapshot(ruta))),
+        _veces("calcular_estadisticas", "dict", calcular_estadisticas, 10),
+        _veces("calcular_estadisticas", "store", calcular_estadisticas, 10),
+        _veces("calcular_estadisticas", "sqlite", calcular_estadisticas, 10),
+        _veces("calcular_estadisticas", "fijo", calcular_estadisticas, 10),
+        # Estadísticas desde cero (sin el motor incremental ya armado) y guardado por partición
+        Caso("estadisticas_frias[store]", lambda ctx: ctx.store(), lambda inv: calcular_estadisticas(inv) and 1),
+        Caso("estadisticas_frias[particionado]", lambda ctx: ctx.particionado(),
+             lambda inv: calcular_estadisticas(inv) and 1),
+        Caso("guardar_particiones[particionado]", lambda ctx: (ctx.particionado(), ctx.ruta("particiones")),
+             lambda e: e[0].guardar(e[1]) and PARTICIONES),
+        _por_producto("agregar_producto", "dict", _agregar, vacio=True),
+        _por_producto("agregar_producto", "store", _agregar, vacio=True),
+        _por_producto("agregar_producto", "sqlite", _agregar, vacio=True),
+        Caso("agregar_productos[store]", lambda ctx: [(p.nombre, p.precio, p.cantidad) for p in ctx.productos],
+             lambda filas: agregar_productos(InventoryStore(), filas) and len(filas)),
+        _por_producto("buscar_producto", "dict", lambda inv, p: buscar_producto(inv, p.nombre)),
+        _por_producto("buscar_producto", "store", lambda inv, p: buscar_producto(inv, p.nombre)),
+        _por_producto("buscar_producto", "sqlite", lambda inv, p: buscar_producto(inv, p.nombre)),
+        _por_producto("actualizar_producto", "dict", lambda inv, p: actualizar_producto(inv, p.nombre, 1.0, 1)),
+        _por_producto("actualizar_producto", "store", lambda inv, p: actualizar_producto(inv, p.nombre, 1.0, 1)),
+        _por_producto("actualizar_producto", "sqlite", lambda inv, p: actualizar_producto(inv, p.nombre, 1.0, 1)),
+        _por_producto("eliminar_producto", "dict", lambda inv, p: eliminar_producto(inv, p.nombre)),
+        _por_producto("eliminar_producto", "store", lambda inv, p: eliminar_producto(inv, p.nombre)),
+        Caso("buscar_similares[store]", store_con_indices,
+             lambda inv: [buscar_similares(inv, "Manzna Organico") for _ in range(20)] and 20),
+        Caso("top_productos[store]", store_con_indices,
+             lambda inv: [top_productos(inv, "subtotal", 50) for _ in range(100)] and 100),
+        Caso("productos_en_rango[store]", store_con_indices,
+             lambda inv: len(productos_en_rango(inv, "cantidad", maximo=10))),
+        Caso("top_productos[sqlite]", lambda ctx: ctx.sqlite(),
+             lambda inv: [top_productos(inv, "subtotal", 50) for _ in range(100)] and 100),
+        Caso("productos_en_rango[sqlite]", lambda ctx: ctx.sqlite(),
+             lambda inv: len(productos_en_rango(inv, "cantidad", maximo=10))),
+        Caso("mostrar_inventario[store]", store_con_indices, _mostrar),
+        _lote(lambda ctx: [p.nombre for p in ctx.productos], lambda v: [is_valid_name(x) for x in v],
+              "is_valid_name"),
+        _lote(lambda ctx: [p.nombre for p in ctx.productos], are_valid_names, "are_valid_names"),
+        _lote(lambda ctx: _textos(ctx, "precio"), _uno_a_uno(parse_positive_decimal),
+              "parse_positive_decimal"),
+        _lote(lambda ctx: _textos(ctx, "precio"), parse_positive_decimals, "parse_positive_decimals"),
+        _lote(lambda ctx: _textos(ctx, "precio"), _uno_a_uno(parse_fixed_decimal), "parse_fixed_decimal"),
+        _lote(lambda ctx: _textos(ctx, "cantidad"), _uno_a_uno(parse_positive_int),
+              "parse_positive_int"),
+        _lote(lambda ctx: _textos(ctx, "cantidad"), parse_positive_ints, "parse_positive_ints"),
+    ]
+
+
+def _medir(caso: Caso, ctx: Contexto, repeticiones: int) -> Dict[str, object]:
+    mejor = float("inf")
+    operaciones = 0
+    for _ in range(repeticiones):
+        estado = caso.preparar(ctx)
+        gc.collect()
+        inicio = time.perf_counter()
+        operaciones = caso.ejecutar(estado)
+        mejor = min(mejor, time.perf_counter() - inicio)
+        del estado
+    # Pasada aparte: tracemalloc ralentiza la ejecución y falsearía los tiempos
+    estado = caso.preparar(ctx)
+    gc.collect()
+    tracemalloc.start()
+    caso.ejecutar(estado)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "segundos": mejor,
+        "operaciones": operaciones,
+        "ops_por_segundo": operaciones / mejor if mejor > 0 else None,
+        "pico_bytes": pico,
+    }
+
+
+def ejecutar(tamanos: List[int], semilla: int = 0, repeticiones: int = REPETICIONES,
+             filtro: Optional[str] = None, avance=None) -> Dict[str, object]:
+    resultados: Dict[str, Dict[str, object]] = {}
+    seleccion = [c for c in casos() if filtro is None or filtro in c.nombre]
+    for filas in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = escribir_csv(os.path.join(directorio, "inventario.csv"), filas, semilla)
+            validas: Dict[str, Product] = {}
+            cargar_csv(validas, ruta, True, "csv")
+            ctx = Contexto(filas, directorio, ruta, list(validas.values()))
+            try:
+                for caso in seleccion:
+                    clave = f"{caso.nombre}@{filas}"
+                    resultados[clave] = _medir(caso, ctx, repeticiones)
+                    if avance is not None:
+                        avance(clave, resultados[clave])
+            finally:
+                ctx.cerrar()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "semilla": semilla,
+            "repeticiones": repeticiones,
+            "tamanos": tamanos,
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(actual: Dict[str, object], base: Dict[str, object],
+             umbral: float = UMBRAL_REGRESION) -> List[Dict[str, object]]:
+    """Casos presentes en ambas corridas con su razón de tiempos (actual / base)."""
+    filas = []
+    for clave, medida in actual["resultados"].items():
+        anterior = base["resultados"].get(clave)
+        if anterior is None or not anterior["segundos"]:
+            continue
+        razon = medida["segundos"] / anterior["segundos"]
+        filas.append({"caso": clave, "base": anterior["segundos"], "actual": medida["segundos"],
+                      "razon": razon, "regresion": razon > 1 + umbral})
+    return filas
+
+
+def main(argv: list | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa de servicios.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 100000],
+                        help="tamaños de inventario a medir (1e3 a 1e7)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--solo", help="mide solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--base", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="aumento relativo de tiempo que cuenta como regresión (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    def avance(clave: str, medida: Dict[str, object]) -> None:
+        print(f"{clave:<45}{medida['segundos'] * 1000:>12.2f} ms{medida['ops_por_segundo'] or 0:>14.0f} ops/s"
+              f"{medida['pico_bytes'] / 1e6:>10.1f} MB", file=sys.stderr)
+
+    actual = ejecutar(args.filas, args.semilla, args.repeticiones, args.solo, avance)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(actual, f, ensure_ascii=False, indent=2)
+    if not args.base:
+        return
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    comparacion = comparar(actual, base, args.umbral)
+    print(f"\n{'Caso':<45}{'Base (ms)':>12}{'Actual (ms)':>13}{'Razón':>8}", file=sys.stderr)
+    for fila in comparacion:
+        marca = "  REGRESIÓN" if fila["regresion"] else ""
+        print(f"{fila['caso']:<45}{fila['base'] * 1000:>12.2f}{fila['actual'] * 1000:>13.2f}"
+              f"{fila['razon']:>8.2f}{marca}", file=sys.stderr)
+    if any(fila["regresion"] for fila in comparacion):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Archivo: `generador.py`
+
+Generador reproducible de inventarios sintéticos en CSV:
+- nombres realistas (productos, variantes y presentaciones, con acentos y ñ)
+- duplicados exactos y con otra escritura (mayúsculas, espacios sobrantes)
+- filas mal formadas: campos faltantes, números inválidos o negativos,
+  nombre vacío, coma decimal, columnas de más y líneas vacías
+
+Misma semilla y mismos parámetros producen el mismo archivo byte a byte.
+Las filas se escriben en streaming, así que 1e7 filas no ocupan memoria.
+
+Uso:
+    python -m UserHistory.Bench.generador --filas 1000000 --semilla 7 inventario_1m.csv
+"""
+
+import argparse
+import csv
+import random
+from typing import Iterator, List
+
+PRODUCTOS = [
+    "Manzana", "Pera", "Plátano", "Limón", "Piña", "Papaya", "Melón", "Sandía", "Uva", "Coco",
+    "Papa", "Cebolla", "Jitomate", "Jalapeño", "Chile Poblano", "Zanahoria", "Calabacín", "Champiñón",
+    "Arroz", "Frijol", "Lenteja", "Garbanzo", "Avena", "Harina de Trigo", "Azúcar", "Sal de Mar",
+    "Café", "Té Verde", "Chocolate", "Leche", "Yogurt", "Queso Panela", "Mantequilla", "Crema",
+    "Huevo", "Pan Integral", "Tortilla", "Galletas", "Cereal de Maíz", "Atún", "Jamón", "Salchicha",
+    "Aceite de Oliva", "Vinagre", "Mayonesa", "Salsa de Tomate", "Mostaza", "Jabón", "Detergente",
+]
+VARIANTES = [
+    "", "Orgánico", "Light", "Natural", "Integral", "Roja", "Verde", "Premium", "Económico",
+    "sin Azúcar", "Descafeinado", "Añejo", "Ahumado", "Clásico", "de Temporada",
+]
+PRESENTACIONES = ["", "250g", "500g", "1kg", "2kg", "1L", "2L", "Docena", "Paquete", "Caja", "Lata", "Bolsa"]
+
+
+def _nombre(azar: random.Random, indice: int) -> str:
+    partes = [azar.choice(PRODUCTOS), azar.choice(VARIANTES), azar.choice(PRESENTACIONES)]
+    # El índice garantiza nombres distintos aunque se repita la combinación
+    return " ".join(p for p in partes if p) + f" {indice}"
+
+
+def _malformada(azar: random.Random, nombre: str, precio: str, cantidad: str) -> List[str]:
+    tipo = azar.randrange(9)
+    if tipo == 0:
+        return [nombre, precio]
+    if tipo == 1:
+        return [nombre, "abc", cantidad]
+    if tipo == 2:
+        return [nombre, precio, "-" + cantidad]
+    if tipo == 3:
+        return ["", precio, cantidad]
+    if tipo == 4:
+        return [nombre, precio.replace(".", ","), cantidad]
+    if tipo == 5:
+        return [nombre, precio, cantidad + ".5"]
+    if tipo == 6:
+        return [nombre, "-" + precio, cantidad]
+    if tipo == 7:
+        return [nombre, precio, cantidad, "extra"]
+    return []
+
+
+def generar_filas(filas: int, semilla: int = 0, duplicados: float = 0.05,
+                  invalidas: float = 0.02) -> Iterator[List[str]]:
+    """Encabezado más `filas` filas de datos (las filas vacías cuentan como inválidas)."""
+    azar = random.Random(semilla)
+    yield ["nombre", "precio", "cantidad"]
+    vistos: List[str] = []
+    for i in range(filas):
+        precio = f"{azar.uniform(0.5, 500):.2f}"
+        cantidad = str(azar.randint(0, 1000))
+        sorteo = azar.random()
+        if vistos and sorteo < duplicados:
+            nombre = azar.choice(vistos)
+            if azar.random() < 0.5:
+                # Misma clave al normalizar, distinta escritura
+                nombre = azar.choice([nombre.upper(), nombre.lower(), f"  {nombre} ", nombre.replace(" ", "  ")])
+        else:
+            nombre = _nombre(azar, i)
+            if len(vistos) < 100_000:
+                vistos.append(nombre)
+            else:
+                vistos[azar.randrange(len(vistos))] = nombre
+        if sorteo > 1 - invalidas:
+            yield _malformada(azar, nombre, precio, cantidad)
+        else:
+            yield [nombre, precio, cantidad]
+
+
+def escribir_csv(ruta: str, filas: int, semilla: int = 0, duplicados: float = 0.05,
+                 invalidas: float = 0.02) -> str:
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(generar_filas(filas, semilla, duplicados, invalidas))
+    return ruta
+
+
+def main(argv: list | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera un inventario sintético en CSV.")
+    parser.add_argument("salida", help="ruta del CSV a escribir")
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--duplicados", type=float, default=0.05, help="proporción de nombres repetidos")
+    parser.add_argument("--invalidas", type=float, default=0.02, help="proporción de filas mal formadas")
+    args = parser.parse_args(argv)
+    escribir_csv(args.salida, args.filas, args.semilla, args.duplicados, args.invalidas)
+
+
+if __name__ == "__main__":
+    main()
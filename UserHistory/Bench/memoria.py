@@ -0,0 +1,112 @@
+"""
+Archivo: `memoria.py`
+
+Memoria retenida por producto en cada representación del inventario:
+- dict de Product con __dict__ por instancia (la representación previa a slots)
+- dict de Product con slots
+- InventoryStore (columnas) con y sin nombres normalizados
+
+Las filas se generan como texto antes de medir (el nombre no se cuenta: es el
+mismo objeto en todos los casos) y se convierten a número dentro de la medición,
+como al cargar un CSV. Los bytes por producto salen de tracemalloc: memoria
+asignada que sigue viva después de construir el inventario, dividida entre filas.
+
+Uso:
+    python -m UserHistory.Bench.memoria --filas 1000000 --salida memoria.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from UserHistory.Service.services import Product
+from UserHistory.Service.store import InventoryStore, ProductoVista
+
+
+@dataclass
+class ProductoAnterior:
+    """Product tal como era antes de slots (con __dict__ por instancia)."""
+    nombre: str
+    precio: float
+    cantidad: int
+
+
+def _filas(n: int) -> List[Tuple[str, str, str]]:
+    return [(f"Producto {i:07d}", f"{(i * 37) % 50000 / 100 + 0.5:.2f}", str(i % 1000 + 300)) for i in range(n)]
+
+
+def _dict(clase: type) -> Callable[[list], object]:
+    def construir(filas: list) -> Dict[str, object]:
+        return {nombre: clase(nombre, float(precio), int(cantidad)) for nombre, precio, cantidad in filas}
+    return construir
+
+
+def _store(normalizado: bool) -> Callable[[list], object]:
+    def construir(filas: list) -> InventoryStore:
+        store = InventoryStore()
+        if normalizado:
+            store.normalizar_nombres()
+        store.agregar_lote([(nombre, float(precio), int(cantidad)) for nombre, precio, cantidad in filas])
+        return store
+    return construir
+
+
+CASOS: Dict[str, Callable[[list], object]] = {
+    "dict[Product] con __dict__ (antes)": _dict(ProductoAnterior),
+    "dict[Product] con slots": _dict(Product),
+    "InventoryStore": _store(False),
+    "InventoryStore normalizado": _store(True),
+}
+
+
+def _retenido(construir: Callable[[list], object], filas: list) -> int:
+    gc.collect()
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    inventario = construir(filas)
+    gc.collect()
+    retenido = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del inventario
+    return retenido
+
+
+def medir(filas: int) -> Dict[str, object]:
+    datos = _filas(filas)
+    resultados = {}
+    for nombre, construir in CASOS.items():
+        retenido = _retenido(construir, datos)
+        resultados[nombre] = {"bytes": retenido, "bytes_por_producto": round(retenido / filas, 1)}
+    store = InventoryStore(vistas=True)
+    store.agregar_producto("Papa", 1.5, 300)
+    objetos = {
+        "ProductoAnterior": sys.getsizeof(ProductoAnterior("Papa", 1.5, 300)) + sys.getsizeof(
+            ProductoAnterior("Papa", 1.5, 300).__dict__),
+        "Product": sys.getsizeof(Product("Papa", 1.5, 300)),
+        "ProductoVista": sys.getsizeof(store["Papa"]),
+    }
+    return {"filas": filas, "python": sys.version.split()[0], "resultados": resultados, "objetos": objetos}
+
+
+def main(argv: list | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Memoria por producto según la representación del inventario.")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    informe = medir(args.filas)
+    for nombre, medida in informe["resultados"].items():
+        print(f"{nombre:<40}{medida['bytes'] / 1e6:>10.1f} MB{medida['bytes_por_producto']:>10.1f} B/producto")
+    for nombre, tamano in informe["objetos"].items():
+        print(f"sizeof {nombre:<33}{tamano:>10} B")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Archivo: `carga.py`
+
+Cliente de prueba de carga para `servidor.py` (solo biblioteca estándar):
+- abre `conexiones` conexiones keep-alive y reparte entre ellas las peticiones
+- mezcla lecturas (GET) y escrituras (PATCH / POST) según `proporcion_escrituras`
+- informa peticiones por segundo y latencias p50 / p99 / máxima
+
+Uso (con el servidor ya corriendo):
+    python -m UserHistory.Server.carga --conexiones 50 --peticiones 20000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil p (0-100) por rango más cercano sobre una lista ya ordenada."""
+    return ordenadas[max(0, math.ceil(p / 100 * len(ordenadas)) - 1)]
+
+
+async def _peticion(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    metodo: str, ruta: str, datos: object = None) -> int:
+    cuerpo = b"" if datos is None else json.dumps(datos).encode("utf-8")
+    writer.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: inventario\r\n"
+                 f"Content-Length: {len(cuerpo)}\r\n\r\n".encode("latin-1") + cuerpo)
+    await writer.drain()
+    estado = int((await reader.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b""):
+            break
+        clave, _, valor = linea.decode("latin-1").partition(":")
+        if clave.strip().lower() == "content-length":
+            largo = int(valor)
+    await reader.readexactly(largo)
+    return estado
+
+
+async def _conexion(host: str, puerto: int, peticiones: int, nombres: List[str],
+                    proporcion_escrituras: float, semilla: int,
+                    latencias: List[float], estados: Dict[int, int]) -> None:
+    azar = random.Random(semilla)
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        for i in range(peticiones):
+            nombre = azar.choice(nombres)
+            if azar.random() >= proporcion_escrituras:
+                args: Tuple = ("GET", f"/productos/{quote(nombre)}")
+            elif azar.random() < 0.9:
+                args = ("PATCH", f"/productos/{quote(nombre)}", {"cantidad": azar.randint(1, 500)})
+            else:
+                args = ("POST", "/productos",
+                        {"nombre": f"Carga {semilla}-{i}", "precio": 1.5, "cantidad": 1})
+            inicio = time.perf_counter()
+            estado = await _peticion(reader, writer, *args)
+            latencias.append(time.perf_counter() - inicio)
+            estados[estado] = estados.get(estado, 0) + 1
+    finally:
+        writer.close()
+
+
+async def medir(host: str = "127.0.0.1", puerto: int = 8080, conexiones: int = 50,
+                peticiones: int = 10000, proporcion_escrituras: float = 0.1,
+                nombres: List[str] | None = None, semilla: int = 0) -> Dict[str, object]:
+    """Lanza la carga y devuelve el resumen (peticiones/s y latencias en milisegundos)."""
+    nombres = nombres or [f"Producto {i}" for i in range(1000)]
+    latencias: List[float] = []
+    estados: Dict[int, int] = {}
+    por_conexion = [peticiones // conexiones + (i < peticiones % conexiones) for i in range(conexiones)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        _conexion(host, puerto, n, nombres, proporcion_escrituras, semilla + i, latencias, estados)
+        for i, n in enumerate(por_conexion) if n
+    ))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "segundos": segundos,
+        "peticiones_por_segundo": len(latencias) / segundos if segundos else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000 if latencias else None,
+        "p99_ms": percentil(latencias, 99) * 1000 if latencias else None,
+        "max_ms": latencias[-1] * 1000 if latencias else None,
+        "estados": estados,
+    }
+
+
+def main(argv: list | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de inventario.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--conexiones", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=10000)
+    parser.add_argument("--escrituras", type=float, default=0.1,
+                        help="proporción de peticiones que modifican el inventario (0-1)")
+    parser.add_argument("--productos", type=int, default=1000,
+                        help="se consultan los nombres 'Producto 0' .. 'Producto N-1'")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    nombres = [f"Producto {i}" for i in range(args.productos)]
+    resumen = asyncio.run(medir(args.host, args.puerto, args.conexiones, args.peticiones,
+                                args.escrituras, nombres, args.semilla))
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
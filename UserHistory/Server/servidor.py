@@ -0,0 +1,303 @@
+"""
+Archivo: `servidor.py`
+
+Servicio HTTP/JSON del inventario sobre asyncio (solo biblioteca estándar):
+- HTTP/1.1 con conexiones keep-alive y cierre por inactividad
+- a lo sumo `max_concurrentes` peticiones en curso (semáforo)
+- un único escritor a la vez (asyncio.Lock); las lecturas no esperan al escritor
+- la importación de CSV se parsea y valida en un executor y se aplica después
+  bajo el lock, de a tramos que ceden el event loop entre uno y otro, así que
+  las lecturas siguen respondiendo durante cargas grandes
+
+Todo acceso al inventario ocurre en el hilo del event loop: cada operación es
+atómica respecto de las demás peticiones. La única excepción es una importación
+en modo fusión, que entre tramos puede verse aplicada en parte (cada producto
+siempre entero); en modo reemplazo el inventario nuevo se arma aparte y entra
+de una vez.
+
+Rutas:
+    GET    /productos/{nombre}          buscar_producto (404 con sugerencias)
+    POST   /productos                   agregar_producto {nombre, precio, cantidad}
+    PATCH  /productos/{nombre}          actualizar_producto {precio?, cantidad?}
+    DELETE /productos/{nombre}          eliminar_producto
+    GET    /estadisticas                calcular_estadisticas
+    GET    /csv                         exporta el inventario como CSV
+    POST   /csv?reemplazar=0&politica_precio=existente   importa el CSV del cuerpo
+
+Uso:
+    python -m UserHistory.Server.servidor --puerto 8080
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from UserHistory.Service.carga_paralela import aplicar_csv_por_tramos, preparar_csv
+from UserHistory.Service.services import (
+    Product, actualizar_producto, agregar_producto, buscar_producto, buscar_similares,
+    calcular_estadisticas, eliminar_producto
+)
+from UserHistory.Utils.Validator import (
+    clean_string, is_valid_name, parse_bool, parse_positive_decimal, parse_positive_int, to_text
+)
+
+MAX_CONCURRENTES = 256
+MAX_CUERPO_BYTES = 64 * 1024 * 1024
+INACTIVIDAD_SEGUNDOS = 30.0
+
+_RAZONES = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 411: "Length Required",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+# (estado, cuerpo, tipo de contenido)
+Respuesta = Tuple[int, bytes, str]
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json(estado: int, datos: object) -> Respuesta:
+    return estado, json.dumps(datos, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+
+
+def _error(estado: int, mensaje: str) -> Respuesta:
+    return _json(estado, {"ok": False, "error": mensaje})
+
+
+def _producto(producto: Product) -> Dict[str, object]:
+    return {"nombre": producto.nombre, "precio": producto.precio, "cantidad": producto.cantidad,
+            "subtotal": producto.calcular_subtotal()}
+
+
+def _exportar_csv(filas: list) -> bytes:
+    # Corre en el executor sobre una copia: el inventario puede seguir cambiando mientras tanto
+    salida = io.StringIO(newline="")
+    writer = csv.writer(salida)
+    writer.writerow(['nombre', 'precio', 'cantidad'])
+    writer.writerows(filas)
+    return salida.getvalue().encode("utf-8")
+
+
+class ServidorInventario:
+    """Atiende peticiones HTTP sobre un inventario compartido."""
+
+    def __init__(self, inventario: Dict[str, Product], max_concurrentes: int = MAX_CONCURRENTES,
+                 executor=None):
+        self.inventario = inventario
+        self._cupos = asyncio.Semaphore(max_concurrentes)
+        self._escritor = asyncio.Lock()
+        self._executor = executor
+
+    # --- Conexiones ---------------------------------------------------------
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    peticion = await asyncio.wait_for(self._leer_peticion(reader), INACTIVIDAD_SEGUNDOS)
+                except ErrorHTTP as e:
+                    await self._responder(writer, _error(e.estado, str(e)), mantener=False)
+                    return
+                if peticion is None:
+                    return
+                metodo, destino, cuerpo, mantener = peticion
+                async with self._cupos:
+                    try:
+                        respuesta = await self._despachar(metodo, destino, cuerpo)
+                    except ErrorHTTP as e:
+                        respuesta = _error(e.estado, str(e))
+                    except Exception as e:
+                        respuesta = _error(500, f"Error inesperado: {e}")
+                await self._responder(writer, respuesta, mantener)
+                if not mantener:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _leer_peticion(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+        linea = await reader.readline()
+        if not linea:
+            return None
+        try:
+            metodo, destino, version = linea.decode("latin-1").split()
+        except ValueError:
+            raise ErrorHTTP(400, "Línea de petición inválida.")
+        cabeceras: Dict[str, str] = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            clave, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[clave.strip().lower()] = valor.strip()
+        if "chunked" in cabeceras.get("transfer-encoding", "").lower():
+            raise ErrorHTTP(411, "Se requiere Content-Length.")
+        try:
+            largo = int(cabeceras.get("content-length", "0"))
+        except ValueError:
+            raise ErrorHTTP(400, "Content-Length inválido.")
+        if largo > MAX_CUERPO_BYTES:
+            raise ErrorHTTP(413, f"El cuerpo supera {MAX_CUERPO_BYTES} bytes.")
+        cuerpo = await reader.readexactly(largo) if largo > 0 else b""
+        conexion = cabeceras.get("connection", "").lower()
+        # HTTP/1.1 mantiene la conexión salvo "close"; HTTP/1.0 solo con "keep-alive"
+        mantener = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+        return metodo.upper(), destino, cuerpo, mantener
+
+    async def _responder(self, writer: asyncio.StreamWriter, respuesta: Respuesta, mantener: bool) -> None:
+        estado, cuerpo, tipo = respuesta
+        cabecera = (f"HTTP/1.1 {estado} {_RAZONES.get(estado, '')}\r\n"
+                    f"Content-Type: {tipo}\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+        writer.write(cabecera.encode("latin-1") + cuerpo)
+        await writer.drain()
+
+    # --- Rutas --------------------------------------------------------------
+
+    async def _despachar(self, metodo: str, destino: str, cuerpo: bytes) -> Respuesta:
+        partes = urlsplit(destino)
+        segmentos = [unquote(s) for s in partes.path.split("/") if s]
+        consulta = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        if segmentos == ["productos"]:
+            if metodo == "POST":
+                return await self._agregar(self._cuerpo_json(cuerpo))
+        elif len(segmentos) == 2 and segmentos[0] == "productos":
+            nombre = clean_string(segmentos[1])
+            if metodo == "GET":
+                return self._buscar(nombre)
+            if metodo == "PATCH":
+                return await self._actualizar(nombre, self._cuerpo_json(cuerpo))
+            if metodo == "DELETE":
+                return await self._eliminar(nombre)
+        elif segmentos == ["estadisticas"]:
+            if metodo == "GET":
+                return _json(200, calcular_estadisticas(self.inventario))
+        elif segmentos == ["csv"]:
+            if metodo == "GET":
+                return await self._exportar()
+            if metodo == "POST":
+                return await self._importar(cuerpo, consulta)
+        else:
+            return _error(404, "Ruta inexistente.")
+        return _error(405, f"Método {metodo} no permitido en {partes.path}.")
+
+    @staticmethod
+    def _cuerpo_json(cuerpo: bytes) -> dict:
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            raise ErrorHTTP(400, "El cuerpo no es JSON válido.")
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(400, "El cuerpo debe ser un objeto JSON.")
+        return datos
+
+    @staticmethod
+    def _numero(datos: dict, campo: str, parser, opcional: bool = False):
+        if opcional and datos.get(campo) is None:
+            return None
+        try:
+            return parser(to_text(datos.get(campo)))
+        except ValueError as e:
+            raise ErrorHTTP(400, f"{campo}: {e}")
+
+    def _buscar(self, nombre: str) -> Respuesta:
+        producto = buscar_producto(self.inventario, nombre)
+        if producto is None:
+            sugerencias = [similar for similar, _ in buscar_similares(self.inventario, nombre)]
+            return _json(404, {"ok": False, "error": "El producto no existe.", "sugerencias": sugerencias})
+        return _json(200, {"ok": True, "producto": _producto(producto)})
+
+    async def _agregar(self, datos: dict) -> Respuesta:
+        nombre = to_text(datos.get("nombre"))
+        if not is_valid_name(nombre):
+            raise ErrorHTTP(400, "Nombre inválido. Debe tener 1-100 caracteres y no iniciar con dígito.")
+        nombre = clean_string(nombre)
+        precio = self._numero(datos, "precio", parse_positive_decimal)
+        cantidad = self._numero(datos, "cantidad", parse_positive_int)
+        async with self._escritor:
+            if not agregar_producto(self.inventario, nombre, precio, cantidad):
+                return _error(409, "El producto ya existe.")
+            return _json(201, {"ok": True, "producto": _producto(self.inventario[nombre])})
+
+    async def _actualizar(self, nombre: str, datos: dict) -> Respuesta:
+        precio = self._numero(datos, "precio", parse_positive_decimal, opcional=True)
+        cantidad = self._numero(datos, "cantidad", parse_positive_int, opcional=True)
+        if precio is None and cantidad is None:
+            raise ErrorHTTP(400, "No se proporcionaron datos para actualizar.")
+        async with self._escritor:
+            if nombre not in self.inventario:
+                return _error(404, "El producto no existe.")
+            actualizar_producto(self.inventario, nombre, precio, cantidad)
+            return _json(200, {"ok": True, "producto": _producto(self.inventario[nombre])})
+
+    async def _eliminar(self, nombre: str) -> Respuesta:
+        async with self._escritor:
+            if not eliminar_producto(self.inventario, nombre):
+                return _error(404, "El producto no existe.")
+            return _json(200, {"ok": True})
+
+    async def _exportar(self) -> Respuesta:
+        if hasattr(self.inventario, "filas"):
+            filas = list(self.inventario.filas())
+        else:
+            filas = [(p.nombre, p.precio, p.cantidad) for p in self.inventario.values()]
+        cuerpo = await asyncio.get_running_loop().run_in_executor(self._executor, _exportar_csv, filas)
+        return 200, cuerpo, "text/csv; charset=utf-8"
+
+    async def _importar(self, cuerpo: bytes, consulta: Dict[str, str]) -> Respuesta:
+        reemplazar = parse_bool(consulta.get("reemplazar", "no"))
+        politica = consulta.get("politica_precio", "existente")
+        if reemplazar is None or politica not in ("csv", "existente"):
+            raise ErrorHTTP(400, "Parámetros: reemplazar=si|no, politica_precio=csv|existente.")
+        try:
+            texto = cuerpo.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ErrorHTTP(400, "El CSV debe estar en UTF-8.")
+        normalizar = getattr(self.inventario, "normalizador", None)
+        # El escritor se toma antes de parsear: las importaciones y escrituras se aplican en orden de llegada
+        async with self._escritor:
+            preparado = await asyncio.get_running_loop().run_in_executor(
+                self._executor, preparar_csv, texto, reemplazar, normalizar)
+            for nuevos, actualizados, errores in aplicar_csv_por_tramos(
+                    self.inventario, preparado, reemplazar, politica):
+                await asyncio.sleep(0)
+        return _json(200, {"ok": True, "nuevos": nuevos, "actualizados": actualizados, "errores": errores})
+
+
+async def servir(inventario: Dict[str, Product], host: str = "127.0.0.1", puerto: int = 8080,
+                 max_concurrentes: int = MAX_CONCURRENTES) -> None:
+    servidor = ServidorInventario(inventario, max_concurrentes)
+    async with await asyncio.start_server(servidor.atender, host, puerto) as tcp:
+        print(f" Sirviendo inventario en http://{host}:{puerto} ({len(inventario)} productos)", file=sys.stderr)
+        await tcp.serve_forever()
+
+
+def main(argv: list | None = None) -> None:
+    from UserHistory.app import inventario_inicial
+
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del inventario.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--max-concurrentes", type=int, default=MAX_CONCURRENTES)
+    args = parser.parse_args(argv)
+    inventario, journal = inventario_inicial(avisos=sys.stderr)
+    try:
+        asyncio.run(servir(inventario, args.host, args.puerto, args.max_concurrentes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        journal.cerrar()
+
+
+if __name__ == "__main__":
+    main()
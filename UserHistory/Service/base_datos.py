@@ -0,0 +1,458 @@
+"""
+Archivo: `base_datos.py`
+
+Inventario persistido en SQLite (módulo estándar `sqlite3`), alternativa al CSV
+completo en memoria:
+- una sola conexión reutilizada, en modo WAL con synchronous=NORMAL
+- tabla `productos(id, clave, nombre, precio, cantidad)`: `id` es la secuencia de
+  inserción (AUTOINCREMENT, nunca se reutiliza) y `clave` el nombre, o el nombre
+  normalizado si se activa `normalizar_nombres` (la elección se guarda en `meta`)
+- índices por clave, precio, cantidad y subtotal: rangos, top-k, percentiles y
+  estadísticas se resuelven en SQL sin cargar el inventario en memoria
+- las escrituras masivas (lotes, fusión e importación de CSV) van en una sola
+  transacción con `executemany` y sentencias preparadas
+
+Implementa la misma interfaz de almacenamiento que InventoryStore (ver
+`services.py`), así que los servicios, `app.py` y el modo batch lo usan sin
+cambios; `cargar_csv` y `guardar_csv` pasan a ser importación y exportación
+contra la base. Admite observadores (al_agregar, al_modificar, al_eliminar,
+al_limpiar) con `id` como secuencia.
+"""
+
+import math
+import sqlite3
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from UserHistory.Service.busqueda import IndiceBusqueda
+from UserHistory.Service.estadisticas import sumar_exacto
+from UserHistory.Service.indices import CAMPOS
+from UserHistory.Service.services import Product, _resolver_ruta, precio_valido
+from UserHistory.Service.store import InventoryStore
+from UserHistory.Utils.Validator import normalize_name
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave TEXT NOT NULL UNIQUE,
+    nombre TEXT NOT NULL,
+    precio REAL NOT NULL,
+    cantidad INTEGER NOT NULL
+);
+-- (valor, id DESC): recorrido hacia adelante = orden de IndicesOrdenados,
+-- hacia atrás = mayor valor primero y, a igual valor, el insertado antes
+CREATE INDEX IF NOT EXISTS idx_productos_precio ON productos (precio, id DESC);
+CREATE INDEX IF NOT EXISTS idx_productos_cantidad ON productos (cantidad, id DESC);
+CREATE INDEX IF NOT EXISTS idx_productos_subtotal ON productos (precio * cantidad, id DESC);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+"""
+
+# Expresión SQL de cada campo ordenable; debe coincidir con la de su índice
+_EXPRESIONES = dict(zip(CAMPOS, ("precio", "cantidad", "precio * cantidad")))
+
+# Modos de nombres guardados en meta: None = exactos, False = normalizados, True = además sin acentos
+_MODOS = {"exactos": None, "normalizados": False, "sin_acentos": True}
+
+# Máximo de parámetros por sentencia en las consultas IN (...)
+_LOTE_IN = 500
+
+
+class _SumaExacta:
+    """Agregado SQL `suma_exacta`: misma suma sin pérdida que las estadísticas en memoria."""
+
+    def __init__(self):
+        self._parciales: List[float] = []
+
+    def step(self, valor: float) -> None:
+        sumar_exacto(self._parciales, valor)
+
+    def finalize(self) -> float:
+        return math.fsum(self._parciales)
+
+
+class _IndicesSQL:
+    """Misma interfaz que IndicesOrdenados, resuelta con los índices de la tabla."""
+
+    def __init__(self, base: "InventarioSQLite"):
+        self._base = base
+
+    def _expresion(self, campo: str) -> str:
+        try:
+            return _EXPRESIONES[campo]
+        except KeyError:
+            raise ValueError(f"Campo desconocido: '{campo}'. Usa uno de {', '.join(CAMPOS)}.") from None
+
+    def nombres(self, campo: str, descendente: bool = False) -> Iterator[str]:
+        expr = self._expresion(campo)
+        orden = f"{expr} DESC, id" if descendente else f"{expr}, id DESC"
+        return (nombre for nombre, in self._base._conexion.execute(f"SELECT nombre FROM productos ORDER BY {orden}"))
+
+    def rango(self, campo: str, minimo: float | None = None, maximo: float | None = None,
+              k: int | None = None) -> List[Tuple[str, float]]:
+        expr = self._expresion(campo)
+        filtros = [f for f, v in ((f"{expr} >= :minimo", minimo), (f"{expr} <= :maximo", maximo)) if v is not None]
+        donde = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        return self._base._conexion.execute(
+            f"SELECT nombre, {expr} FROM productos {donde} ORDER BY {expr}, id DESC LIMIT :k",
+            {"minimo": minimo, "maximo": maximo, "k": -1 if k is None else k}).fetchall()
+
+    def top(self, campo: str, k: int = 10) -> List[Tuple[str, float]]:
+        expr = self._expresion(campo)
+        return self._base._conexion.execute(
+            f"SELECT nombre, {expr} FROM productos ORDER BY {expr} DESC, id LIMIT ?", (k,)).fetchall()
+
+    def percentil(self, campo: str, p: float) -> Optional[Tuple[str, float]]:
+        if not 0 <= p <= 100:
+            raise ValueError("El percentil debe estar entre 0 y 100.")
+        expr = self._expresion(campo)
+        total = len(self._base)
+        if not total:
+            return None
+        return self._base._conexion.execute(
+            f"SELECT nombre, {expr} FROM productos ORDER BY {expr}, id DESC LIMIT 1 OFFSET ?",
+            (max(0, math.ceil(p / 100 * total) - 1),)).fetchone()
+
+
+class InventarioSQLite(MutableMapping):
+    """Inventario guardado en una base SQLite, con la interfaz de InventoryStore."""
+
+    def __init__(self, archivo: str | None = None):
+        self.ruta = archivo if archivo == ":memory:" else _resolver_ruta(archivo, "inventario.db")
+        # isolation_level=None: autocommit por sentencia; las operaciones masivas abren su transacción
+        self._conexion = sqlite3.connect(self.ruta, isolation_level=None, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+        self._conexion.create_aggregate("suma_exacta", 1, _SumaExacta)
+        self._observadores: list = []
+        self._busqueda: Optional[IndiceBusqueda] = None
+        # Cachés invalidadas en cada escritura: COUNT(*) y los agregados recorren la tabla
+        self._total: int = self._conexion.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+        self._resumen: Optional[Dict[str, object]] = None
+        modo = self._conexion.execute("SELECT valor FROM meta WHERE clave = 'nombres'").fetchone()
+        self._plegar_acentos: Optional[bool] = _MODOS[modo[0]] if modo else None
+        self._normalizar: Optional[Callable[[str], str]] = (
+            None if self._plegar_acentos is None else partial(normalize_name, fold_accents=self._plegar_acentos)
+        )
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    @contextmanager
+    def _transaccion(self):
+        self._conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conexion.execute("ROLLBACK")
+            raise
+        self._conexion.execute("COMMIT")
+
+    def _escrito(self) -> None:
+        self._resumen = None
+
+    def _ultimo_id(self) -> int:
+        # AUTOINCREMENT: el próximo id supera al mayor que haya existido, aunque se haya borrado
+        fila = self._conexion.execute("SELECT seq FROM sqlite_sequence WHERE name = 'productos'").fetchone()
+        return fila[0] if fila else 0
+
+    # --- Nombres normalizados -----------------------------------------------
+
+    def normalizar_nombres(self, plegar_acentos: bool = False) -> None:
+        """
+        Igual que InventoryStore.normalizar_nombres, pero persistente: la clave
+        normalizada se guarda en la tabla y la base recuerda el modo al reabrirse.
+        """
+        if self._normalizar is not None and self._plegar_acentos == plegar_acentos:
+            return
+        normalizar = partial(normalize_name, fold_accents=plegar_acentos)
+        claves: Dict[str, str] = {}
+        cambios = []
+        for id_, nombre in self._conexion.execute("SELECT id, nombre FROM productos ORDER BY id"):
+            clave = normalizar(nombre)
+            if clave in claves:
+                raise ValueError(f"'{nombre}' y '{claves[clave]}' coinciden al normalizar.")
+            claves[clave] = nombre
+            cambios.append((clave, id_))
+        modo = "sin_acentos" if plegar_acentos else "normalizados"
+        with self._transaccion():
+            # Claves provisionales únicas: evita choques transitorios con UNIQUE durante el cambio
+            self._conexion.execute("UPDATE productos SET clave = char(0) || id")
+            self._conexion.executemany("UPDATE productos SET clave = ? WHERE id = ?", cambios)
+            self._conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('nombres', ?)", (modo,))
+        self._normalizar, self._plegar_acentos = normalizar, plegar_acentos
+
+    @property
+    def normaliza_nombres(self) -> bool:
+        return self._normalizar is not None
+
+    @property
+    def plegar_acentos(self) -> bool:
+        return bool(self._plegar_acentos)
+
+    @property
+    def normalizador(self) -> Optional[Callable[[str], str]]:
+        return self._normalizar
+
+    def clave_nombre(self, nombre: str) -> str:
+        return nombre if self._normalizar is None else self._normalizar(nombre)
+
+    def resolver_nombre(self, nombre: str) -> Optional[str]:
+        fila = self._conexion.execute("SELECT nombre FROM productos WHERE clave = ?",
+                                      (self.clave_nombre(nombre),)).fetchone()
+        return None if fila is None else fila[0]
+
+    # --- Operaciones del servicio -------------------------------------------
+
+    def consultar(self, nombre: str) -> Optional[Tuple[float, int, int]]:
+        """Devuelve (precio, cantidad, secuencia) de un producto o None."""
+        return self._conexion.execute("SELECT precio, cantidad, id FROM productos WHERE clave = ?",
+                                      (self.clave_nombre(nombre),)).fetchone()
+
+    def agregar_producto(self, nombre: str, precio: float, cantidad: int) -> bool:
+        if not precio_valido(precio) or cantidad < 0:
+            return False
+        return self._insertar(nombre, precio, cantidad)
+
+    def _insertar(self, nombre: str, precio: float, cantidad: int) -> bool:
+        cursor = self._conexion.execute(
+            "INSERT INTO productos (clave, nombre, precio, cantidad) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (clave) DO NOTHING",
+            (self.clave_nombre(nombre), nombre, float(precio), int(cantidad)))
+        if not cursor.rowcount:
+            return False
+        self._total += 1
+        self._escrito()
+        for obs in self._observadores:
+            obs.al_agregar(nombre, float(precio), int(cantidad), cursor.lastrowid)
+        return True
+
+    def buscar_producto(self, nombre: str) -> Optional[Product]:
+        fila = self._conexion.execute("SELECT nombre, precio, cantidad FROM productos WHERE clave = ?",
+                                      (self.clave_nombre(nombre),)).fetchone()
+        return None if fila is None else Product(*fila)
+
+    def actualizar_producto(self, nombre: str,
+                            nuevo_precio: Optional[float] = None,
+                            nueva_cantidad: Optional[int] = None) -> bool:
+        # Mismo orden de validación que services.actualizar_producto
+        actual = self._conexion.execute("SELECT id, nombre, precio, cantidad FROM productos WHERE clave = ?",
+                                        (self.clave_nombre(nombre),)).fetchone()
+        if actual is None:
+            return False
+        id_, nombre, precio_ant, cantidad_ant = actual
+        if nuevo_precio is None and nueva_cantidad is None:
+            return False
+        precio_ok = nuevo_precio is None or precio_valido(nuevo_precio)
+        precio = precio_ant if nuevo_precio is None or not precio_ok else float(nuevo_precio)
+        valido = precio_ok and (nueva_cantidad is None or nueva_cantidad >= 0)
+        # Con precio válido y cantidad negativa el precio queda aplicado, igual que en InventoryStore
+        cantidad = int(nueva_cantidad) if valido and nueva_cantidad is not None else cantidad_ant
+        if (precio, cantidad) != (precio_ant, cantidad_ant):
+            self._escribir(id_, nombre, precio_ant, cantidad_ant, precio, cantidad)
+        return valido
+
+    def eliminar_producto(self, nombre: str) -> bool:
+        fila = self._conexion.execute("DELETE FROM productos WHERE clave = ? RETURNING id, nombre, precio, cantidad",
+                                      (self.clave_nombre(nombre),)).fetchone()
+        if fila is None:
+            return False
+        self._total -= 1
+        self._escrito()
+        id_, nombre, precio, cantidad = fila
+        for obs in self._observadores:
+            obs.al_eliminar(nombre, precio, cantidad, id_)
+        return True
+
+    def agregar_lote(self, filas: List[Tuple[str, float, int]]) -> None:
+        """Inserta filas ya validadas (nombres nuevos y únicos) en una transacción."""
+        with self._transaccion():
+            inicio = self._ultimo_id() + 1
+            self._conexion.executemany(
+                "INSERT INTO productos (id, clave, nombre, precio, cantidad) VALUES (?, ?, ?, ?, ?)",
+                ((inicio + i, self.clave_nombre(n), n, p, c) for i, (n, p, c) in enumerate(filas)))
+        self._total += len(filas)
+        self._escrito()
+        for obs in self._observadores:
+            for i, (nombre, precio, cantidad) in enumerate(filas):
+                obs.al_agregar(nombre, precio, cantidad, inicio + i)
+
+    def fusionar_parciales(self, parciales: Iterable[Tuple[str, float, float, int, int]],
+                           politica_precio: str) -> Tuple[int, int]:
+        """
+        Fusiona parciales (nombre, primer_precio, ultimo_precio, suma_cantidad, apariciones)
+        con la semántica de `cargar_csv` en modo fusión (una fila del CSV es un parcial con
+        una aparición). Todo el lote se escribe en una transacción. Devuelve (nuevos, actualizados).
+        """
+        parciales = list(parciales)
+        eventos = []
+        nuevos = actualizados = 0
+        with self._transaccion():
+            # Estado vigente de las claves del lote: clave -> [id, nombre, precio, cantidad]
+            estado: Dict[str, list] = {}
+            claves = list({self.clave_nombre(p[0]): None for p in parciales})
+            for i in range(0, len(claves), _LOTE_IN):
+                trozo = claves[i:i + _LOTE_IN]
+                consulta = (f"SELECT clave, id, nombre, precio, cantidad FROM productos "
+                            f"WHERE clave IN ({', '.join('?' * len(trozo))})")
+                for clave, *fila in self._conexion.execute(consulta, trozo):
+                    estado[clave] = fila
+            siguiente = self._ultimo_id() + 1
+            insertar: Dict[str, list] = {}
+            modificar: Dict[str, list] = {}
+            for nombre, primer_precio, ultimo_precio, suma, apariciones in parciales:
+                clave = self.clave_nombre(nombre)
+                fila = estado.get(clave)
+                if fila is None:
+                    precio = ultimo_precio if politica_precio == 'csv' else primer_precio
+                    fila = estado[clave] = insertar[clave] = [siguiente, nombre, precio, suma]
+                    siguiente += 1
+                    nuevos += 1
+                    actualizados += apariciones - 1
+                    eventos.append(("al_agregar", nombre, precio, suma, fila[0]))
+                    continue
+                id_, existente, precio_ant, cantidad_ant = fila
+                fila[3] += suma
+                if politica_precio == 'csv':
+                    fila[2] = ultimo_precio
+                if clave not in insertar:
+                    modificar[clave] = fila
+                actualizados += apariciones
+                eventos.append(("al_modificar", existente, precio_ant, cantidad_ant, fila[2], fila[3], id_))
+            self._conexion.executemany(
+                "INSERT INTO productos (id, clave, nombre, precio, cantidad) VALUES (?, ?, ?, ?, ?)",
+                ((id_, clave, nombre, precio, cantidad) for clave, (id_, nombre, precio, cantidad) in insertar.items()))
+            self._conexion.executemany(
+                "UPDATE productos SET precio = ?, cantidad = ? WHERE id = ?",
+                ((precio, cantidad, id_) for id_, _, precio, cantidad in modificar.values()))
+        self._total += len(insertar)
+        self._escrito()
+        for evento, *args in eventos:
+            for obs in self._observadores:
+                getattr(obs, evento)(*args)
+        return nuevos, actualizados
+
+    def filas(self) -> Iterator[Tuple[str, float, int]]:
+        """Itera (nombre, precio, cantidad) en orden de inserción sin crear Product."""
+        return iter(self._conexion.execute("SELECT nombre, precio, cantidad FROM productos ORDER BY id"))
+
+    def vacio(self) -> InventoryStore:
+        """Inventario en memoria, con la misma configuración de nombres, para preparar un reemplazo."""
+        store = InventoryStore()
+        if self._plegar_acentos is not None:
+            store.normalizar_nombres(self._plegar_acentos)
+        return store
+
+    def intercambiar(self, otro: Dict[str, Product]) -> None:
+        """Reemplaza todo el contenido por el de `otro` en una transacción (`otro` queda vacío)."""
+        filas = list(otro.filas()) if hasattr(otro, "filas") else [(p.nombre, p.precio, p.cantidad)
+                                                                   for p in otro.values()]
+        with self._transaccion():
+            self._conexion.execute("DELETE FROM productos")
+            inicio = self._ultimo_id() + 1
+            self._conexion.executemany(
+                "INSERT INTO productos (id, clave, nombre, precio, cantidad) VALUES (?, ?, ?, ?, ?)",
+                ((inicio + i, self.clave_nombre(n), n, p, c) for i, (n, p, c) in enumerate(filas)))
+        otro.clear()
+        self._total = len(filas)
+        self._escrito()
+        for obs in self._observadores:
+            obs.al_limpiar()
+            for i, (nombre, precio, cantidad) in enumerate(filas):
+                obs.al_agregar(nombre, precio, cantidad, inicio + i)
+
+    def suscribir(self, observador) -> None:
+        self._observadores.append(observador)
+
+    def desuscribir(self, observador) -> None:
+        self._observadores.remove(observador)
+
+    def resumen_estadisticas(self) -> Dict[str, object]:
+        """Estadísticas calculadas por SQLite (agregados e índices), en caché hasta la próxima escritura."""
+        if self._resumen is not None:
+            return self._resumen
+        if not self._total:
+            return {
+                "unidades_totales": 0,
+                "valor_total": 0.0,
+                "producto_mas_caro": None,
+                "producto_mayor_stock": None
+            }
+        unidades, valor = self._conexion.execute(
+            "SELECT SUM(cantidad), suma_exacta(precio * cantidad) FROM productos").fetchone()
+        # A igual valor gana el insertado primero, como max() sobre un dict
+        mas_caro = self._conexion.execute(
+            "SELECT nombre, precio FROM productos ORDER BY precio DESC, id LIMIT 1").fetchone()
+        mayor_stock = self._conexion.execute(
+            "SELECT nombre, cantidad FROM productos ORDER BY cantidad DESC, id LIMIT 1").fetchone()
+        self._resumen = {
+            "unidades_totales": unidades,
+            "valor_total": valor,
+            "producto_mas_caro": mas_caro,
+            "producto_mayor_stock": mayor_stock
+        }
+        return self._resumen
+
+    def indice_busqueda(self) -> IndiceBusqueda:
+        """Índice de prefijos y trigramas en memoria (solo nombres); se construye en la primera búsqueda."""
+        if self._busqueda is None:
+            self._busqueda = IndiceBusqueda(iter(self))
+            self.suscribir(self._busqueda)
+        return self._busqueda
+
+    def indices_ordenados(self) -> _IndicesSQL:
+        return _IndicesSQL(self)
+
+    def _escribir(self, id_: int, nombre: str, precio_ant: float, cantidad_ant: int,
+                  precio: float, cantidad: int) -> None:
+        self._conexion.execute("UPDATE productos SET precio = ?, cantidad = ? WHERE id = ?", (precio, cantidad, id_))
+        self._escrito()
+        for obs in self._observadores:
+            obs.al_modificar(nombre, precio_ant, cantidad_ant, precio, cantidad, id_)
+
+    # --- Adaptador MutableMapping[str, Product] -----------------------------
+
+    def __getitem__(self, nombre: str) -> Product:
+        producto = self.buscar_producto(nombre)
+        if producto is None:
+            raise KeyError(nombre)
+        return producto
+
+    def __setitem__(self, nombre: str, producto: Product) -> None:
+        # Los Product devueltos son copias: los cambios se escriben de vuelta con inventario[nombre] = producto
+        if not math.isfinite(producto.precio):
+            raise ValueError(f"Precio no finito para '{nombre}'.")
+        actual = self._conexion.execute("SELECT id, nombre, precio, cantidad FROM productos WHERE clave = ?",
+                                        (self.clave_nombre(nombre),)).fetchone()
+        if actual is None:
+            self._insertar(nombre, producto.precio, producto.cantidad)
+        else:
+            self._escribir(*actual, float(producto.precio), int(producto.cantidad))
+
+    def __delitem__(self, nombre: str) -> None:
+        if not self.eliminar_producto(nombre):
+            raise KeyError(nombre)
+
+    def __contains__(self, nombre: object) -> bool:
+        if not isinstance(nombre, str):
+            return False
+        return self._conexion.execute("SELECT 1 FROM productos WHERE clave = ?",
+                                      (self.clave_nombre(nombre),)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (nombre for nombre, in self._conexion.execute("SELECT nombre FROM productos ORDER BY id"))
+
+    def __len__(self) -> int:
+        return self._total
+
+    def clear(self) -> None:
+        self._conexion.execute("DELETE FROM productos")
+        self._total = 0
+        self._escrito()
+        for obs in self._observadores:
+            obs.al_limpiar()
+
+    def __repr__(self) -> str:
+        return f"InventarioSQLite({len(self)} productos, '{self.ruta}')"
@@ -0,0 +1,139 @@
+"""
+Archivo: `busqueda.py`
+
+Búsqueda aproximada de productos por nombre:
+- índice de prefijos: arreglo ordenado de (nombre normalizado, nombre) con bisect
+- índice de trigramas: trigrama -> nombres que lo contienen, para tolerar errores
+
+Los nombres se comparan normalizados y sin acentos (normalize_name), así que
+"manzana" encuentra "Manzana Roja" y "limon" encuentra "Limón". El índice se
+suscribe a un InventoryStore y se actualiza con cada alta, baja y carga.
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from UserHistory.Utils.Validator import normalize_name
+
+# Trigramas presentes en más nombres que esto se ignoran si la consulta tiene otros más selectivos
+MAX_POSTING = 10_000
+# Candidatos (por trigramas compartidos) a los que se calcula la similitud exacta, por resultado pedido
+CANDIDATOS_POR_RESULTADO = 20
+# Similitud mínima (coeficiente de Dice sobre trigramas) para sugerir un nombre
+SIMILITUD_MINIMA = 0.3
+
+
+def _normalizar(nombre: str) -> str:
+    return normalize_name(nombre, fold_accents=True)
+
+
+def _trigramas(normalizado: str) -> Set[str]:
+    relleno = f"  {normalizado} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceBusqueda:
+    """Índice de prefijos y trigramas mantenido de forma incremental."""
+
+    def __init__(self, nombres: Iterable[str] = ()):
+        self._ordenados: List[Tuple[str, str]] = []
+        # Altas aún no ordenadas: se funden con un solo sort (timsort) antes de la siguiente consulta
+        self._pendientes: List[Tuple[str, str]] = []
+        self._trigramas: Dict[str, Set[str]] = {}
+        for nombre in nombres:
+            self.al_agregar(nombre, 0.0, 0, 0)
+
+    def _consolidar(self) -> None:
+        if self._pendientes:
+            self._ordenados.extend(self._pendientes)
+            self._ordenados.sort()
+            self._pendientes = []
+
+    # --- Eventos del inventario ---------------------------------------------
+
+    def al_agregar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        normalizado = _normalizar(nombre)
+        if normalizado == nombre:
+            # Nombre ya normalizado: se guarda una sola copia del texto
+            normalizado = nombre
+        self._pendientes.append((normalizado, nombre))
+        for trigrama in _trigramas(normalizado):
+            self._trigramas.setdefault(trigrama, set()).add(nombre)
+
+    def al_modificar(self, nombre: str, precio_ant: float, cantidad_ant: int,
+                     precio: float, cantidad: int, seq: int) -> None:
+        pass  # el nombre no cambia
+
+    def al_eliminar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self._consolidar()
+        normalizado = _normalizar(nombre)
+        i = bisect_left(self._ordenados, (normalizado, nombre))
+        if i < len(self._ordenados) and self._ordenados[i] == (normalizado, nombre):
+            del self._ordenados[i]
+        for trigrama in _trigramas(normalizado):
+            nombres = self._trigramas.get(trigrama)
+            if nombres is not None:
+                nombres.discard(nombre)
+                if not nombres:
+                    del self._trigramas[trigrama]
+
+    def al_limpiar(self) -> None:
+        self._ordenados = []
+        self._pendientes = []
+        self._trigramas = {}
+
+    # --- Consultas ----------------------------------------------------------
+
+    def nombres(self, descendente: bool = False) -> Iterator[str]:
+        """Todos los nombres en orden alfabético (sin distinguir mayúsculas ni acentos)."""
+        self._consolidar()
+        entradas = reversed(self._ordenados) if descendente else iter(self._ordenados)
+        return (nombre for _, nombre in entradas)
+
+    def por_prefijo(self, prefijo: str, k: int = 10) -> List[str]:
+        """Hasta k nombres que empiezan por `prefijo`, en orden alfabético."""
+        self._consolidar()
+        normalizado = _normalizar(prefijo)
+        resultado: List[str] = []
+        i = bisect_left(self._ordenados, (normalizado,))
+        while i < len(self._ordenados) and len(resultado) < k:
+            clave, nombre = self._ordenados[i]
+            if not clave.startswith(normalizado):
+                break
+            resultado.append(nombre)
+            i += 1
+        return resultado
+
+    def similares(self, consulta: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Hasta k (nombre, similitud) por coeficiente de Dice sobre trigramas."""
+        buscados = _trigramas(_normalizar(consulta))
+        listas = sorted((self._trigramas.get(t, ()) for t in buscados), key=len)
+        listas = [l for l in listas if l]
+        if not listas:
+            return []
+        # Los trigramas muy frecuentes no discriminan: se usan solo si no hay otros
+        selectivas = [l for l in listas if len(l) <= MAX_POSTING] or listas[:1]
+        coincidencias: Counter = Counter()
+        for nombres in selectivas:
+            coincidencias.update(nombres)
+        puntuados = []
+        for nombre, _ in coincidencias.most_common(k * CANDIDATOS_POR_RESULTADO):
+            propios = _trigramas(_normalizar(nombre))
+            puntuados.append((2 * len(buscados & propios) / (len(buscados) + len(propios)), nombre))
+        mejores = heapq.nlargest(k, puntuados)
+        return [(nombre, similitud) for similitud, nombre in mejores if similitud >= SIMILITUD_MINIMA]
+
+    def buscar(self, consulta: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Ranking combinado: coincidencia exacta (3), prefijo (2) y similitud por
+        trigramas (0-1). Devuelve hasta k (nombre, puntaje), de mayor a menor.
+        """
+        normalizado = _normalizar(consulta)
+        puntajes: Dict[str, float] = {}
+        for nombre in self.por_prefijo(consulta, k):
+            puntajes[nombre] = 3.0 if _normalizar(nombre) == normalizado else 2.0
+        for nombre, similitud in self.similares(consulta, k):
+            puntajes.setdefault(nombre, similitud)
+        return heapq.nlargest(k, puntajes.items(), key=lambda par: par[1])
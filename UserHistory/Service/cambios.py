@@ -0,0 +1,238 @@
+"""
+Archivo: `cambios.py`
+
+Simulación (dry-run) de la fusión de un CSV sobre el inventario:
+- `calcular_cambios` lee el CSV en streaming y lo cruza con el inventario
+  (hash join: el CSV se reduce por clave y cada clave consulta una sola vez
+  el inventario); no modifica ni copia el inventario
+- el resultado (`CambiosCSV`) lista altas, deltas de cantidad, cambios de
+  precio bajo cada `politica_precio` ('csv' o 'existente') y filas
+  rechazadas con su número de línea y motivo
+- `aplicar_cambios` aplica después ese resultado de una vez: primero
+  comprueba que el inventario no cambió desde el cálculo y recién entonces
+  escribe (en SQLite, en una sola transacción)
+
+Aplicar los cambios deja el inventario igual que `cargar_csv` en modo fusión
+y devuelve los mismos contadores (nuevos, actualizados, errores).
+"""
+
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from UserHistory.Service.carga_paralela import aplicar_parciales
+from UserHistory.Service.services import (
+    TAM_LOTE_CSV, Product, Progreso, _indices_encabezado, _resolver_ruta, _validar_fila, precio_valido
+)
+from UserHistory.Utils.Decorators import contar, instrumentar
+from UserHistory.Utils.Validator import parse_fixed_decimal
+
+POLITICAS = ("csv", "existente")
+
+
+class CambiosDesactualizados(ValueError):
+    """El inventario cambió entre calcular_cambios y aplicar_cambios."""
+
+
+@dataclass(slots=True)
+class Cambio:
+    """Efecto de todas las filas válidas de un mismo producto."""
+    nombre: str
+    primer_precio: float
+    ultimo_precio: float
+    delta_cantidad: int
+    filas: int
+    # Estado al calcular; None en un producto nuevo
+    precio_anterior: Optional[float] = None
+    cantidad_anterior: Optional[int] = None
+
+    @property
+    def es_alta(self) -> bool:
+        return self.precio_anterior is None
+
+    def precio_final(self, politica_precio: str) -> float:
+        if politica_precio == 'csv':
+            return self.ultimo_precio
+        return self.primer_precio if self.es_alta else self.precio_anterior
+
+    @property
+    def cantidad_final(self) -> int:
+        return (self.cantidad_anterior or 0) + self.delta_cantidad
+
+
+@dataclass(slots=True)
+class Rechazo:
+    linea: int
+    motivo: str
+    nombre: str = ""
+
+
+@dataclass
+class CambiosCSV:
+    """Resultado de calcular_cambios; se aplica con aplicar_cambios."""
+    ruta: str
+    # Por clave del inventario (nombre o nombre normalizado), en orden de primera aparición
+    cambios: Dict[str, Cambio] = field(default_factory=dict)
+    rechazos: List[Rechazo] = field(default_factory=list)
+
+    def altas(self) -> List[Cambio]:
+        return [c for c in self.cambios.values() if c.es_alta]
+
+    def modificaciones(self) -> List[Cambio]:
+        return [c for c in self.cambios.values() if not c.es_alta]
+
+    def cambios_de_precio(self, politica_precio: str) -> List[Tuple[str, float, float]]:
+        """(nombre, precio_anterior, precio_nuevo) de los productos existentes cuyo precio cambia."""
+        return [(c.nombre, c.precio_anterior, c.precio_final(politica_precio))
+                for c in self.modificaciones() if c.precio_final(politica_precio) != c.precio_anterior]
+
+    def contadores(self) -> Tuple[int, int, int]:
+        """(nuevos, actualizados, errores), los mismos que devolvería cargar_csv."""
+        nuevos = actualizados = 0
+        for cambio in self.cambios.values():
+            if cambio.es_alta:
+                nuevos += 1
+                actualizados += cambio.filas - 1
+            else:
+                actualizados += cambio.filas
+        return nuevos, actualizados, len(self.rechazos)
+
+    def resumen(self, politica_precio: str) -> Dict[str, object]:
+        nuevos, actualizados, errores = self.contadores()
+        return {
+            "nuevos": nuevos,
+            "actualizados": actualizados,
+            "errores": errores,
+            "productos_modificados": len(self.cambios) - nuevos,
+            "unidades_agregadas": sum(c.delta_cantidad for c in self.cambios.values()),
+            "cambios_de_precio": len(self.cambios_de_precio(politica_precio)),
+        }
+
+    def registros(self, politica_precio: str) -> Iterator[Dict[str, object]]:
+        """Un dict por alta, modificación o rechazo (por ejemplo, para escribirlos como JSONL)."""
+        for cambio in self.cambios.values():
+            registro = {"tipo": "alta" if cambio.es_alta else "modificacion", "nombre": cambio.nombre,
+                        "delta_cantidad": cambio.delta_cantidad, "cantidad": cambio.cantidad_final,
+                        "precio": cambio.precio_final(politica_precio)}
+            if not cambio.es_alta:
+                registro["precio_anterior"] = cambio.precio_anterior
+                registro["cantidad_anterior"] = cambio.cantidad_anterior
+            yield registro
+        for rechazo in self.rechazos:
+            yield {"tipo": "rechazo", "linea": rechazo.linea, "nombre": rechazo.nombre, "motivo": rechazo.motivo}
+
+
+def _motivo_rechazo(fila: List[str], indices: Tuple[int, int, int], decimales: Optional[int]) -> str:
+    """Explica por qué _validar_fila rechazó la fila (solo se llama en las filas rechazadas)."""
+    faltantes = [c for c, i in zip(("nombre", "precio", "cantidad"), indices) if i < 0]
+    if faltantes:
+        return f"Falta la columna '{faltantes[0]}' en el encabezado."
+    i_nombre, i_precio, i_cantidad = indices
+    if max(indices) >= len(fila):
+        return "Faltan campos."
+    if not fila[i_nombre].strip():
+        return "Nombre vacío."
+    try:
+        if decimales is None:
+            precio = float(fila[i_precio])
+        else:
+            precio = parse_fixed_decimal(fila[i_precio], decimales)
+    except ValueError:
+        return "Precio inválido."
+    if precio < 0:
+        return "Precio negativo."
+    if not precio_valido(precio):
+        return "Precio no finito."
+    try:
+        cantidad = int(fila[i_cantidad])
+    except ValueError:
+        return "Cantidad inválida."
+    if cantidad < 0:
+        return "Cantidad negativa."
+    return "Fila inválida."
+
+
+@instrumentar
+def calcular_cambios(inventario: Dict[str, Product], archivo: str | None,
+                     progreso: Optional[Progreso] = None) -> Optional[CambiosCSV]:
+    """
+    Cambios que haría cargar_csv(inventario, archivo, reemplazar=False, ...) sin aplicarlos.
+    Devuelve None si el archivo no existe o no se puede leer.
+    """
+    ruta = _resolver_ruta(archivo)
+    clave_nombre = getattr(inventario, "clave_nombre", None)
+    # Inventario en punto fijo: mismas filas válidas y mismos precios que su carga
+    decimales = getattr(inventario, "decimales", None)
+    resultado = CambiosCSV(ruta)
+    cambios, rechazos = resultado.cambios, resultado.rechazos
+    try:
+        total = os.path.getsize(ruta)
+        with open(ruta, mode='r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            encabezado = next((fila for fila in reader if fila), [])
+            indices = _indices_encabezado(encabezado)
+            leidas = 0
+            for fila in reader:
+                leidas += 1
+                if progreso is not None and leidas % TAM_LOTE_CSV == 0:
+                    progreso(leidas, f.buffer.tell(), total)
+                if not fila:
+                    continue
+                valida = _validar_fila(fila, *indices, decimales)
+                if valida is None:
+                    nombre = fila[indices[0]].strip() if 0 <= indices[0] < len(fila) else ""
+                    rechazos.append(Rechazo(reader.line_num, _motivo_rechazo(fila, indices, decimales), nombre))
+                    continue
+                nombre, precio, cantidad = valida
+                if decimales is not None:
+                    precio = precio / 10 ** decimales
+                clave = nombre if clave_nombre is None else clave_nombre(nombre)
+                cambio = cambios.get(clave)
+                if cambio is not None:
+                    cambio.ultimo_precio = precio
+                    cambio.delta_cantidad += cantidad
+                    cambio.filas += 1
+                    continue
+                # Primera aparición de la clave: única consulta al inventario
+                existente = inventario.get(nombre)
+                if existente is None:
+                    cambios[clave] = Cambio(nombre, precio, precio, cantidad, 1)
+                else:
+                    cambios[clave] = Cambio(existente.nombre, precio, precio, cantidad, 1,
+                                            existente.precio, existente.cantidad)
+            if progreso is not None:
+                progreso(leidas, total, total)
+        contar("csv_bytes_leidos", total)
+        return resultado
+    except IOError:
+        return None
+
+
+@instrumentar
+def aplicar_cambios(inventario: Dict[str, Product], cambios: CambiosCSV,
+                    politica_precio: str) -> Tuple[int, int, int]:
+    """
+    Aplica de una vez los cambios calculados. Si algún producto ya no está como al
+    calcularlos, lanza CambiosDesactualizados sin modificar nada.
+    Devuelve (nuevos, actualizados, errores), como cargar_csv.
+    """
+    if politica_precio not in POLITICAS:
+        raise ValueError("politica_precio debe ser 'csv' o 'existente'.")
+    for cambio in cambios.cambios.values():
+        actual = inventario.get(cambio.nombre)
+        if cambio.es_alta:
+            vigente = actual is None
+        else:
+            vigente = actual is not None and (actual.precio, actual.cantidad) == (
+                cambio.precio_anterior, cambio.cantidad_anterior)
+        if not vigente:
+            raise CambiosDesactualizados(f"'{cambio.nombre}' cambió desde que se calcularon los cambios.")
+    # Mismos parciales que la carga en paralelo: (nombre, primer_precio, ultimo_precio, suma, apariciones)
+    parciales = [(c.nombre, c.primer_precio, c.ultimo_precio, c.delta_cantidad, c.filas)
+                 for c in cambios.cambios.values()]
+    nuevos, actualizados = aplicar_parciales(inventario, {}, parciales, 0, False, politica_precio)
+    errores = len(cambios.rechazos)
+    contar("csv_filas_leidas", nuevos + actualizados + errores)
+    contar("csv_filas_rechazadas", errores)
+    return nuevos, actualizados, errores
@@ -0,0 +1,260 @@
+"""
+Archivo: `carga_paralela.py`
+
+Carga de CSV en varios procesos:
+- el archivo se divide en rangos de bytes alineados a saltos de línea
+- cada proceso parsea, valida y pre-reduce su rango (por nombre, en orden)
+- el proceso padre combina los resultados parciales en el orden del archivo
+
+`preparar_csv` + `aplicar_csv` exponen las dos fases por separado: la
+pesada (parseo, validación y pre-reducción, sin tocar el inventario) puede
+correr en otro hilo o proceso, y la aplicación queda en O(nombres distintos).
+`aplicar_csv_por_tramos` hace la misma aplicación de a tramos (un generador),
+para que un event loop pueda atender otras tareas entre uno y otro.
+
+La combinación respeta exactamente la semántica de `cargar_csv`: la cantidad
+se acumula para nombres existentes, `politica_precio` ('csv' o 'existente') se
+aplica según el orden del archivo y los contadores (nuevos, actualizados,
+errores) coinciden.
+
+Supone que ningún campo entrecomillado contiene saltos de línea (los nombres
+válidos no pueden tenerlos); para esos archivos se debe usar `cargar_csv`.
+"""
+
+import csv
+import io
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from UserHistory.Service.services import (
+    Product, Progreso, cargar_csv, _indices_encabezado, _resolver_ruta, _validar_fila
+)
+from UserHistory.Utils.Decorators import contar, instrumentar
+
+# Por debajo de este tamaño no compensa arrancar procesos
+UMBRAL_PARALELO_BYTES = 4 * 1024 * 1024
+# Rangos por trabajador: más rangos reparten mejor la carga y el progreso
+RANGOS_POR_TRABAJADOR = 4
+# Parciales aplicados entre dos cesiones de aplicar_csv_por_tramos
+TAM_TRAMO = 4096
+
+# Parcial de fusión: (nombre, primer_precio, ultimo_precio, suma_cantidad, apariciones)
+ParcialFusion = Tuple[str, float, float, int, int]
+# Parcial de reemplazo: (nombre, ultimo_precio, ultima_cantidad)
+ParcialReemplazo = Tuple[str, float, int]
+
+
+def _leer_encabezado(f) -> Tuple[List[str], int]:
+    """Devuelve el encabezado y el desplazamiento en bytes donde empiezan los datos."""
+    for linea in iter(f.readline, b""):
+        fila = next(csv.reader([linea.decode("utf-8")]), [])
+        if fila:
+            return fila, f.tell()
+    return [], f.tell()
+
+
+def _dividir_rangos(f, inicio: int, total: int, partes: int) -> List[Tuple[int, int]]:
+    """Parte [inicio, total) en rangos que empiezan justo después de un salto de línea."""
+    cortes = [inicio]
+    paso = max(1, (total - inicio) // partes)
+    for i in range(1, partes):
+        objetivo = max(inicio + i * paso, cortes[-1])
+        if objetivo >= total:
+            break
+        f.seek(objetivo - 1)
+        f.readline()  # avanza hasta el final de la línea en curso
+        corte = f.tell()
+        if corte >= total:
+            break
+        if corte > cortes[-1]:
+            cortes.append(corte)
+    cortes.append(total)
+    return list(zip(cortes, cortes[1:]))
+
+
+def _reducir(lector: Iterable[List[str]], indices: Tuple[int, int, int],
+             reemplazar: bool, normalizar: Optional[Callable[[str], str]]) -> Tuple[list, int, int, int]:
+    """
+    Valida y pre-reduce filas ya parseadas. Devuelve (parciales, validas, errores, filas).
+    Agrupa por la misma clave que el inventario destino (nombre o nombre normalizado).
+    """
+    i_nombre, i_precio, i_cantidad = indices
+    validas = errores = filas = 0
+    parciales: Dict[str, list] = {}
+    for fila in lector:
+        filas += 1
+        if not fila:
+            continue
+        datos = _validar_fila(fila, i_nombre, i_precio, i_cantidad)
+        if datos is None:
+            errores += 1
+            continue
+        validas += 1
+        nombre, precio, cantidad = datos
+        clave = nombre if normalizar is None else normalizar(nombre)
+        parcial = parciales.get(clave)
+        if reemplazar:
+            # Gana el último valor, pero se conservan la posición y el nombre de la primera aparición
+            if parcial is None:
+                parciales[clave] = [nombre, precio, cantidad]
+            else:
+                parcial[1], parcial[2] = precio, cantidad
+        elif parcial is None:
+            parciales[clave] = [nombre, precio, precio, cantidad, 1]
+        else:
+            parcial[2] = precio
+            parcial[3] += cantidad
+            parcial[4] += 1
+    return [tuple(p) for p in parciales.values()], validas, errores, filas
+
+
+def _procesar_rango(ruta: str, inicio: int, fin: int, indices: Tuple[int, int, int],
+                    reemplazar: bool, normalizar: Optional[Callable[[str], str]]) -> Tuple[list, int, int, int]:
+    """Trabajador: parsea un rango de bytes del archivo y lo reduce."""
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        texto = f.read(fin - inicio).decode("utf-8")
+    return _reducir(csv.reader(io.StringIO(texto, newline="")), indices, reemplazar, normalizar)
+
+
+def aplicar_parciales(inventario: Dict[str, Product], destino: Dict[str, Product], parciales: list,
+                      validas: int, reemplazar: bool, politica_precio: str) -> Tuple[int, int]:
+    """
+    Aplica los parciales de un rango en orden y devuelve (nuevos, actualizados).
+    En reemplazo escribe en `destino`; si no, fusiona sobre `inventario`.
+    """
+    if reemplazar:
+        for nombre, precio, cantidad in parciales:
+            destino[nombre] = Product(nombre, precio, cantidad)
+        return validas, 0
+    fusionar = getattr(inventario, "fusionar_parciales", None)
+    if fusionar is not None:
+        return fusionar(parciales, politica_precio)
+    nuevos = actualizados = 0
+    for nombre, primer_precio, ultimo_precio, suma, apariciones in parciales:
+        if nombre in inventario:
+            existente = inventario[nombre]
+            existente.cantidad += suma
+            if politica_precio == 'csv':
+                existente.precio = ultimo_precio
+            inventario[nombre] = existente
+            actualizados += apariciones
+        else:
+            precio = ultimo_precio if politica_precio == 'csv' else primer_precio
+            inventario[nombre] = Product(nombre, precio, suma)
+            nuevos += 1
+            actualizados += apariciones - 1
+    return nuevos, actualizados
+
+
+def _reemplazar_con(inventario: Dict[str, Product], destino: Dict[str, Product]) -> None:
+    intercambiar = getattr(inventario, "intercambiar", None)
+    if intercambiar:
+        intercambiar(destino)
+    else:
+        inventario.clear()
+        inventario.update(destino)
+
+
+# Resultado de preparar_csv: (parciales, validas, errores)
+CSVPreparado = Tuple[list, int, int]
+
+
+@instrumentar
+def preparar_csv(texto: str, reemplazar: bool,
+                 normalizar: Optional[Callable[[str], str]] = None) -> CSVPreparado:
+    """Fase pesada de una importación: parsea, valida y pre-reduce el CSV sin tocar el inventario."""
+    lector = csv.reader(io.StringIO(texto, newline=""))
+    encabezado = next((fila for fila in lector if fila), [])
+    parciales, validas, errores, _ = _reducir(lector, _indices_encabezado(encabezado), reemplazar, normalizar)
+    return parciales, validas, errores
+
+
+def aplicar_csv_por_tramos(inventario: Dict[str, Product], preparado: CSVPreparado, reemplazar: bool,
+                           politica_precio: str, tam_tramo: int = TAM_TRAMO) -> Iterator[Tuple[int, int, int]]:
+    """
+    Como `aplicar_csv`, pero aplica los parciales de a `tam_tramo` y entrega el avance
+    (nuevos, actualizados, errores) tras cada tramo; el último valor es el resultado.
+    En reemplazo el inventario nuevo se arma aparte y se intercambia de una vez al
+    final; en fusión cada tramo ya queda aplicado al entregarse.
+    """
+    parciales, validas, errores = preparado
+    destino: Dict[str, Product] = inventario.vacio() if hasattr(inventario, "intercambiar") else {}
+    nuevos = actualizados = 0
+    for inicio in range(0, len(parciales), max(1, tam_tramo)):
+        n, a = aplicar_parciales(inventario, destino, parciales[inicio:inicio + tam_tramo], 0,
+                                 reemplazar, politica_precio)
+        nuevos += n
+        actualizados += a
+        if inicio + tam_tramo < len(parciales):
+            yield nuevos, actualizados, errores
+    if reemplazar:
+        # En reemplazo los contadores vienen de las filas válidas, no de los parciales
+        nuevos, actualizados = validas, 0
+        _reemplazar_con(inventario, destino)
+    contar("csv_filas_leidas", nuevos + actualizados + errores)
+    contar("csv_filas_rechazadas", errores)
+    yield nuevos, actualizados, errores
+
+
+@instrumentar
+def aplicar_csv(inventario: Dict[str, Product], preparado: CSVPreparado,
+                reemplazar: bool, politica_precio: str) -> Tuple[int, int, int]:
+    """
+    Fase rápida: aplica un CSV preparado con la misma semántica que `cargar_csv`.
+    `normalizar` en la preparación debe ser el `normalizador` del inventario.
+    Devuelve (nuevos, actualizados, errores).
+    """
+    # Un solo tramo: todos los parciales de una vez
+    for resultado in aplicar_csv_por_tramos(inventario, preparado, reemplazar, politica_precio,
+                                            len(preparado[0])):
+        pass
+    return resultado
+
+
+@instrumentar
+def cargar_csv_paralelo(inventario: Dict[str, Product], archivo: str | None,
+                        reemplazar: bool, politica_precio: str,
+                        trabajadores: Optional[int] = None,
+                        progreso: Optional[Progreso] = None) -> Tuple[bool, int, int, int]:
+    """Equivalente a `cargar_csv` repartiendo el parseo y la validación entre procesos."""
+    trabajadores = trabajadores or os.cpu_count() or 1
+    ruta = _resolver_ruta(archivo)
+    try:
+        total = os.path.getsize(ruta)
+        # En punto fijo la carga secuencial ya parsea los precios a enteros sin pasar por float
+        if trabajadores == 1 or total < UMBRAL_PARALELO_BYTES or getattr(inventario, "decimales", None) is not None:
+            return cargar_csv(inventario, archivo, reemplazar, politica_precio, progreso)
+        # Importado aquí: multiprocessing solo se carga cuando de verdad se reparte el trabajo
+        from concurrent.futures import ProcessPoolExecutor
+        with open(ruta, "rb") as f:
+            encabezado, inicio = _leer_encabezado(f)
+            rangos = _dividir_rangos(f, inicio, total, trabajadores * RANGOS_POR_TRABAJADOR)
+        indices = _indices_encabezado(encabezado)
+
+        nuevos = actualizados = errores = leidas = 0
+        destino: Dict[str, Product] = inventario.vacio() if hasattr(inventario, "intercambiar") else {}
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            resultados = pool.map(_procesar_rango, [ruta] * len(rangos),
+                                  [r[0] for r in rangos], [r[1] for r in rangos],
+                                  [indices] * len(rangos), [reemplazar] * len(rangos),
+                                  [getattr(inventario, "normalizador", None)] * len(rangos))
+            # map() entrega los resultados en el orden de los rangos: la reducción es determinista
+            for (_, fin), (parciales, validas, err, filas) in zip(rangos, resultados):
+                errores += err
+                n, a = aplicar_parciales(inventario, destino, parciales, validas, reemplazar, politica_precio)
+                nuevos += n
+                actualizados += a
+                leidas += filas
+                if progreso is not None:
+                    progreso(leidas, fin, total)
+        if reemplazar:
+            _reemplazar_con(inventario, destino)
+        contar("csv_bytes_leidos", total)
+        contar("csv_filas_leidas", nuevos + actualizados + errores)
+        contar("csv_filas_rechazadas", errores)
+        return True, nuevos, actualizados, errores
+    except FileNotFoundError:
+        return False, 0, 0, 0
+    except IOError:
+        return False, 0, 0, 0
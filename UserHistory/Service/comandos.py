@@ -0,0 +1,208 @@
+"""
+Archivo: `comandos.py`
+
+Ejecución de comandos del inventario sin menú (modo batch):
+- cada comando es un dict {"op": ..., ...} leído de una línea JSON
+- operaciones: agregar, actualizar, eliminar, buscar, estadisticas, guardar, cargar, historial
+- las corridas consecutivas de agregar / actualizar / eliminar se validan con
+  los validadores por lotes y se aplican con las funciones masivas de
+  `services.py`, respetando el orden original de los comandos
+- "cargar" con "simular": true (solo en fusión) informa los cambios que haría
+  el CSV (resumen y filas rechazadas con su motivo) sin aplicarlos
+- "historial" (con el historial activo) devuelve los cambios de un producto
+  entre "desde" y "hasta", o el inventario en el instante "en" (timestamps)
+- cada comando produce un resultado {"op", "ok", ...} (con su "id" si lo trae)
+
+Formato de ejemplo:
+    {"op": "agregar", "nombre": "Papa", "precio": 23.5, "cantidad": 10}
+    {"op": "actualizar", "nombre": "Papa", "cantidad": 12}
+    {"op": "cargar", "archivo": "otro.csv", "reemplazar": false, "politica_precio": "csv"}
+    {"op": "cargar", "archivo": "otro.csv", "politica_precio": "csv", "simular": true}
+    {"op": "historial", "nombre": "Papa", "desde": 1767225600}
+    {"op": "historial", "en": 1767225600}
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, List
+
+from UserHistory.Service.cambios import calcular_cambios
+from UserHistory.Service.carga_paralela import cargar_csv_paralelo
+from UserHistory.Service.services import (
+    Product, actualizar_productos, agregar_productos, buscar_producto, buscar_similares,
+    calcular_estadisticas, eliminar_productos, guardar_csv
+)
+from UserHistory.Utils.Validator import are_valid_names, parse_positive_decimals, parse_positive_ints, to_text
+
+OPERACIONES = ("agregar", "actualizar", "eliminar", "buscar", "estadisticas", "guardar", "cargar", "historial")
+# Operaciones que se agrupan y aplican con las funciones masivas
+_MASIVAS = ("agregar", "actualizar", "eliminar")
+TAM_LOTE_COMANDOS = 1024
+
+Resultado = Dict[str, object]
+
+
+def leer_comandos(lineas: Iterable[str]) -> Iterator[object]:
+    """Parsea JSONL; las líneas vacías se saltan y las inválidas se entregan como ValueError."""
+    for numero, linea in enumerate(lineas, 1):
+        if not linea.strip():
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError as e:
+            yield ValueError(f"Línea {numero}: JSON inválido ({e.msg}).")
+
+
+def _resultado(comando: dict, ok: bool, **datos) -> Resultado:
+    resultado: Resultado = {"op": comando.get("op"), "ok": ok}
+    if "id" in comando:
+        resultado["id"] = comando["id"]
+    resultado.update(datos)
+    return resultado
+
+
+def _validar_nombres(comandos: List[dict], errores: List[str | None]) -> List[str]:
+    nombres_ok, nombres = are_valid_names([to_text(c.get("nombre")) for c in comandos])
+    for i, ok in enumerate(nombres_ok):
+        if not ok:
+            errores[i] = "Nombre inválido."
+    return nombres
+
+
+def _validar_numeros(comandos: List[dict], errores: List[str | None], opcionales: bool):
+    """Devuelve (precios, cantidades); con opcionales=True un campo ausente queda en None."""
+    columnas = []
+    for campo, parser, mensaje in (("precio", parse_positive_decimals, "Precio inválido."),
+                                   ("cantidad", parse_positive_ints, "Cantidad inválida.")):
+        crudos = [c.get(campo) for c in comandos]
+        validos, valores = parser([to_text(v) for v in crudos])
+        columna = []
+        for i, (crudo, ok, valor) in enumerate(zip(crudos, validos, valores)):
+            if opcionales and crudo is None:
+                columna.append(None)
+                continue
+            if not ok and errores[i] is None:
+                errores[i] = mensaje
+            columna.append(valor)
+        columnas.append(columna)
+    return columnas
+
+
+def _ejecutar_lote(inventario: Dict[str, Product], op: str, comandos: List[dict]) -> List[Resultado]:
+    errores: List[str | None] = [None] * len(comandos)
+    nombres = _validar_nombres(comandos, errores)
+    if op == "eliminar":
+        filas = nombres
+    else:
+        precios, cantidades = _validar_numeros(comandos, errores, opcionales=(op == "actualizar"))
+        filas = list(zip(nombres, precios, cantidades))
+    validos = [i for i, error in enumerate(errores) if error is None]
+    masiva = {"agregar": agregar_productos, "actualizar": actualizar_productos,
+              "eliminar": eliminar_productos}[op]
+    _, aplicados = masiva(inventario, [filas[i] for i in validos])
+    rechazo = {"agregar": "El producto ya existe.",
+               "actualizar": "El producto no existe o no hay datos para actualizar.",
+               "eliminar": "El producto no existe."}[op]
+    for i, ok in zip(validos, aplicados):
+        if not ok:
+            errores[i] = rechazo
+    return [_resultado(c, e is None, **({} if e is None else {"error": e}))
+            for c, e in zip(comandos, errores)]
+
+
+def _producto(producto: Product) -> Dict[str, object]:
+    return {"nombre": producto.nombre, "precio": producto.precio, "cantidad": producto.cantidad,
+            "subtotal": producto.calcular_subtotal()}
+
+
+def _ejecutar_historial(inventario: Dict[str, Product], comando: dict, historial) -> Resultado:
+    if historial is None:
+        return _resultado(comando, False, error="El historial no está activo (usa --historial).")
+    try:
+        instantes = {clave: None if comando.get(clave) is None else float(comando[clave])
+                     for clave in ("en", "desde", "hasta")}
+    except (TypeError, ValueError):
+        return _resultado(comando, False, error="'en', 'desde' y 'hasta' deben ser timestamps.")
+    if instantes["en"] is not None:
+        pasado = historial.inventario_en(instantes["en"])
+        return _resultado(comando, True, productos=[_producto(p) for p in pasado.values()])
+    nombre = to_text(comando.get("nombre")).strip()
+    if not nombre:
+        return _resultado(comando, False, error="Falta 'nombre' o 'en'.")
+    # El historial guarda el nombre tal como está en el inventario
+    producto = buscar_producto(inventario, nombre)
+    puntos = historial.serie(producto.nombre if producto else nombre, instantes["desde"], instantes["hasta"])
+    return _resultado(comando, True, puntos=[list(punto) for punto in puntos])
+
+
+def _ejecutar_simple(inventario: Dict[str, Product], comando: dict, historial=None) -> Resultado:
+    op = comando.get("op")
+    if op in ("guardar", "cargar") and not isinstance(comando.get("archivo"), (str, type(None))):
+        return _resultado(comando, False, error="'archivo' debe ser texto.")
+    if op == "historial":
+        return _ejecutar_historial(inventario, comando, historial)
+    if op == "buscar":
+        nombre = to_text(comando.get("nombre")).strip()
+        producto = buscar_producto(inventario, nombre)
+        if producto is not None:
+            return _resultado(comando, True, producto=_producto(producto))
+        return _resultado(comando, False, error="El producto no existe.",
+                          sugerencias=[similar for similar, _ in buscar_similares(inventario, nombre)])
+    if op == "estadisticas":
+        return _resultado(comando, True, estadisticas=calcular_estadisticas(inventario))
+    if op == "guardar":
+        if guardar_csv(inventario, comando.get("archivo")):
+            return _resultado(comando, True)
+        return _resultado(comando, False, error="Error al guardar el archivo.")
+    if op == "cargar":
+        politica = comando.get("politica_precio", "existente")
+        if politica not in ("csv", "existente"):
+            return _resultado(comando, False, error="politica_precio debe ser 'csv' o 'existente'.")
+        reemplazar = bool(comando.get("reemplazar", False))
+        if comando.get("simular"):
+            if reemplazar:
+                return _resultado(comando, False, error="La simulación solo está disponible en fusión.")
+            cambios = calcular_cambios(inventario, comando.get("archivo"))
+            if cambios is None:
+                return _resultado(comando, False, error="Error al procesar el archivo.")
+            return _resultado(comando, True, simulacion=cambios.resumen(politica),
+                              rechazos=[{"linea": r.linea, "nombre": r.nombre, "motivo": r.motivo}
+                                        for r in cambios.rechazos])
+        exito, nuevos, actualizados, errores = cargar_csv_paralelo(
+            inventario, comando.get("archivo"), reemplazar, politica)
+        if not exito:
+            return _resultado(comando, False, error="Error al procesar el archivo.")
+        return _resultado(comando, True, nuevos=nuevos, actualizados=actualizados, errores=errores)
+    return _resultado(comando, False, error=f"Operación desconocida. Usa una de: {', '.join(OPERACIONES)}.")
+
+
+def _ejecutar_lote_aislado(inventario: Dict[str, Product], comandos: List[dict]) -> List[Resultado]:
+    try:
+        return _ejecutar_lote(inventario, comandos[0]["op"], comandos)
+    except Exception as e:
+        return [_resultado(c, False, error=f"Error inesperado: {e}") for c in comandos]
+
+
+def ejecutar_comandos(inventario: Dict[str, Product], comandos: Iterable[object],
+                      tam_lote: int = TAM_LOTE_COMANDOS, historial=None) -> Iterator[Resultado]:
+    """Ejecuta los comandos en orden y entrega un resultado por comando (historial: el Historial activo)."""
+    pendientes: List[dict] = []
+    for comando in comandos:
+        op = comando.get("op") if isinstance(comando, dict) else None
+        if pendientes and (op != pendientes[0]["op"] or len(pendientes) >= tam_lote):
+            yield from _ejecutar_lote_aislado(inventario, pendientes)
+            pendientes = []
+        if isinstance(comando, ValueError):
+            yield {"op": None, "ok": False, "error": str(comando)}
+        elif not isinstance(comando, dict):
+            yield {"op": None, "ok": False, "error": "Cada línea debe ser un objeto JSON."}
+        elif op in _MASIVAS:
+            pendientes.append(comando)
+        else:
+            try:
+                resultado = _ejecutar_simple(inventario, comando, historial)
+            except Exception as e:
+                # Un comando que falla de forma inesperada no corta el resto de la corrida
+                resultado = _resultado(comando, False, error=f"Error inesperado: {e}")
+            yield resultado
+    if pendientes:
+        yield from _ejecutar_lote_aislado(inventario, pendientes)
@@ -0,0 +1,211 @@
+"""
+Archivo: `concurrente.py`
+
+Inventario seguro para varios hilos:
+- `LockLectoresEscritor`: muchos lectores a la vez o un único escritor, con
+  un torniquete común para que ni lectores ni escritores se queden sin turno
+- `InventarioConcurrente`: envuelve un InventoryStore (o un dict) y protege
+  cada operación con el lock; los Product devueltos son siempre copias
+- `cargar_csv_concurrente`: parsea y valida sin lock y aplica el archivo
+  completo en una sola escritura, así nadie ve una carga a medias
+
+Las operaciones compuestas (leer y luego escribir) deben ir dentro de
+`escribir(funcion)`; las consultas que necesitan varios datos coherentes
+entre sí, dentro de `leer(funcion)` o sobre `instantanea()`. Las funciones
+reciben el inventario interno y no deben volver a llamar al envoltorio.
+"""
+
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from UserHistory.Service.carga_paralela import aplicar_csv, preparar_csv
+from UserHistory.Service.services import (
+    Product, _resolver_ruta, actualizar_producto, agregar_producto, calcular_estadisticas, eliminar_producto
+)
+from UserHistory.Service.store import InventoryStore
+
+T = TypeVar("T")
+
+
+class LockLectoresEscritor:
+    """
+    Lock de lectores/escritor. Lectores y escritores pasan por el mismo torniquete,
+    así un escritor en espera frena a los lectores nuevos y, al terminar, los lectores
+    que esperaban entran antes que el siguiente escritor: nadie se queda sin turno.
+    No es reentrante.
+    """
+
+    def __init__(self):
+        self._torniquete = threading.Lock()
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+
+    @contextmanager
+    def lectura(self):
+        with self._torniquete:
+            with self._condicion:
+                self._lectores += 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._lectores -= 1
+                if not self._lectores:
+                    self._condicion.notify_all()
+
+    @contextmanager
+    def escritura(self):
+        with self._torniquete:
+            with self._condicion:
+                while self._lectores:
+                    self._condicion.wait()
+            yield
+
+
+class InventarioConcurrente(MutableMapping):
+    """Inventario compartido entre hilos; cada escritura incrementa `version`."""
+
+    def __init__(self, inventario: Optional[Dict[str, Product]] = None):
+        self._inventario = inventario if inventario is not None else InventoryStore()
+        self._lock = LockLectoresEscritor()
+        # Las consultas con estado perezoso (montículos de estadísticas, índices) no admiten dos lectores a la vez
+        self._perezosos = threading.Lock()
+        # InventoryStore ya devuelve copias (salvo con vistas, que leen la fila sin lock); un dict entrega sus propios Product
+        self._copiar = not isinstance(self._inventario, InventoryStore) or self._inventario.usa_vistas
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _copia(self, producto: Product) -> Product:
+        return Product(producto.nombre, producto.precio, producto.cantidad) if self._copiar else producto
+
+    # --- Acceso coherente ---------------------------------------------------
+
+    def leer(self, funcion: Callable[[Dict[str, Product]], T]) -> T:
+        """Ejecuta funcion(inventario) sin escrituras concurrentes."""
+        with self._lock.lectura(), self._perezosos:
+            return funcion(self._inventario)
+
+    def escribir(self, funcion: Callable[[Dict[str, Product]], T]) -> T:
+        """Ejecuta funcion(inventario) en exclusiva: los lectores ven el estado previo o el final."""
+        with self._lock.escritura():
+            self._version += 1
+            return funcion(self._inventario)
+
+    def instantanea(self) -> Tuple[int, Dict[str, Product]]:
+        """(version, copia independiente) tomada en un único instante."""
+        with self._lock.lectura():
+            copia = getattr(self._inventario, "copia", None)
+            if copia is not None:
+                return self._version, copia()
+            return self._version, {n: self._copia(p) for n, p in self._inventario.items()}
+
+    # --- Operaciones del servicio -------------------------------------------
+
+    def agregar_producto(self, nombre: str, precio: float, cantidad: int) -> bool:
+        return self.escribir(lambda inv: agregar_producto(inv, nombre, precio, cantidad))
+
+    def buscar_producto(self, nombre: str) -> Optional[Product]:
+        return self.get(nombre)
+
+    def actualizar_producto(self, nombre: str, nuevo_precio: Optional[float] = None,
+                            nueva_cantidad: Optional[int] = None) -> bool:
+        return self.escribir(lambda inv: actualizar_producto(inv, nombre, nuevo_precio, nueva_cantidad))
+
+    def eliminar_producto(self, nombre: str) -> bool:
+        return self.escribir(lambda inv: eliminar_producto(inv, nombre))
+
+    def resumen_estadisticas(self) -> Dict[str, object]:
+        return self.leer(calcular_estadisticas)
+
+    def clave_nombre(self, nombre: str) -> str:
+        clave = getattr(self._inventario, "clave_nombre", None)
+        return nombre if clave is None else clave(nombre)
+
+    @property
+    def normaliza_nombres(self) -> bool:
+        return getattr(self._inventario, "normaliza_nombres", False)
+
+    @property
+    def plegar_acentos(self) -> bool:
+        return getattr(self._inventario, "plegar_acentos", False)
+
+    @property
+    def normalizador(self) -> Optional[Callable[[str], str]]:
+        return getattr(self._inventario, "normalizador", None)
+
+    def vacio(self) -> Dict[str, Product]:
+        vacio = getattr(self._inventario, "vacio", None)
+        return {} if vacio is None else vacio()
+
+    def intercambiar(self, otro: Dict[str, Product]) -> None:
+        """Reemplazo atómico: `cargar_csv` en modo reemplazo llena `otro` sin lock y solo bloquea aquí."""
+        def reemplazar(inventario: Dict[str, Product]) -> None:
+            intercambiar = getattr(inventario, "intercambiar", None)
+            if intercambiar is not None:
+                intercambiar(otro)
+            else:
+                inventario.clear()
+                inventario.update(otro)
+        self.escribir(reemplazar)
+
+    # --- Adaptador MutableMapping[str, Product] -----------------------------
+
+    def __getitem__(self, nombre: str) -> Product:
+        with self._lock.lectura():
+            return self._copia(self._inventario[nombre])
+
+    def __setitem__(self, nombre: str, producto: Product) -> None:
+        producto = Product(producto.nombre, producto.precio, producto.cantidad)
+        self.escribir(lambda inv: inv.__setitem__(nombre, producto))
+
+    def __delitem__(self, nombre: str) -> None:
+        self.escribir(lambda inv: inv.__delitem__(nombre))
+
+    def __contains__(self, nombre: object) -> bool:
+        with self._lock.lectura():
+            return nombre in self._inventario
+
+    def __iter__(self) -> Iterator[str]:
+        # Se recorre una copia de las claves: el inventario puede cambiar durante la iteración
+        with self._lock.lectura():
+            return iter(list(self._inventario))
+
+    def __len__(self) -> int:
+        with self._lock.lectura():
+            return len(self._inventario)
+
+    def values(self) -> List[Product]:
+        """Todos los productos de una misma versión."""
+        with self._lock.lectura():
+            return [self._copia(p) for p in self._inventario.values()]
+
+    def items(self) -> List[Tuple[str, Product]]:
+        with self._lock.lectura():
+            return [(n, self._copia(p)) for n, p in self._inventario.items()]
+
+    def clear(self) -> None:
+        self.escribir(lambda inv: inv.clear())
+
+    def __repr__(self) -> str:
+        return f"InventarioConcurrente({self._inventario!r}, version={self._version})"
+
+
+def cargar_csv_concurrente(inventario: InventarioConcurrente, archivo: str | None,
+                           reemplazar: bool, politica_precio: str) -> Tuple[bool, int, int, int]:
+    """Como `cargar_csv`, pero el archivo entero se aplica en una sola escritura."""
+    try:
+        with open(_resolver_ruta(archivo), encoding="utf-8", newline="") as f:
+            texto = f.read()
+    except (FileNotFoundError, IOError):
+        return False, 0, 0, 0
+    # Lo costoso (parseo, validación, reducción) no bloquea a nadie
+    preparado = preparar_csv(texto, reemplazar, inventario.normalizador)
+    nuevos, actualizados, errores = inventario.escribir(
+        lambda inv: aplicar_csv(inv, preparado, reemplazar, politica_precio))
+    return True, nuevos, actualizados, errores
+
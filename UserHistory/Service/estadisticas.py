@@ -0,0 +1,152 @@
+"""
+Archivo: `estadisticas.py`
+
+Estadísticas del inventario mantenidas de forma incremental:
+- unidades totales y valor total como acumulados (suma exacta en coma flotante,
+  o suma entera si los precios están en punto fijo)
+- producto más caro y de mayor stock con montículos y borrado perezoso
+- `sumar_exacto`: el acumulador sin pérdida de precisión, también para otros
+  almacenamientos que llevan su propio valor total
+
+Se suscribe a un InventoryStore y recibe cada alta, modificación y baja,
+por lo que `resumen()` responde en tiempo constante amortizado.
+"""
+
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (precio, cantidad, secuencia) vigentes de un producto, o None si no existe
+Consulta = Callable[[str], Optional[Tuple[float, int, int]]]
+
+
+def sumar_exacto(parciales: List[float], x: float) -> None:
+    """Acumula x en `parciales` sin pérdida de precisión (algoritmo de Shewchuk)."""
+    i = 0
+    for y in parciales:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            parciales[i] = lo
+            i += 1
+        x = hi
+    parciales[i:] = [x]
+
+
+class EstadisticasIncrementales:
+    """Acumulados y máximos que se actualizan con cada mutación del inventario."""
+
+    def __init__(self, consultar: Consulta, escala: Optional[int] = None):
+        self._consultar = consultar
+        # Con escala (10**decimales del punto fijo) el valor total se acumula como entero
+        self._escala = escala
+        self._vivos = 0
+        self._unidades = 0
+        self._parciales: List[float] = []
+        self._valor_escalado = 0
+        # Entradas (-clave, secuencia, nombre): a igual clave gana el insertado primero,
+        # igual que max() sobre un dict en orden de inserción.
+        self._por_precio: List[Tuple[float, int, str]] = []
+        self._por_stock: List[Tuple[int, int, str]] = []
+
+    # --- Eventos del inventario ---------------------------------------------
+
+    def al_agregar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self._vivos += 1
+        self._sumar(precio, cantidad, 1)
+        self._apilar(nombre, precio, cantidad, seq)
+
+    def al_modificar(self, nombre: str, precio_ant: float, cantidad_ant: int,
+                     precio: float, cantidad: int, seq: int) -> None:
+        self._sumar(precio_ant, cantidad_ant, -1)
+        self._sumar(precio, cantidad, 1)
+        if precio != precio_ant:
+            heapq.heappush(self._por_precio, (-precio, seq, nombre))
+        if cantidad != cantidad_ant:
+            heapq.heappush(self._por_stock, (-cantidad, seq, nombre))
+        self._podar()
+
+    def al_eliminar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self._vivos -= 1
+        self._sumar(precio, cantidad, -1)
+        self._podar()
+
+    def al_limpiar(self) -> None:
+        self._vivos = 0
+        self._unidades = 0
+        self._parciales = []
+        self._valor_escalado = 0
+        self._por_precio = []
+        self._por_stock = []
+
+    # --- Lectura ------------------------------------------------------------
+
+    def resumen(self) -> Dict[str, object]:
+        if not self._vivos:
+            return {
+                "unidades_totales": 0,
+                "valor_total": 0.0,
+                "producto_mas_caro": None,
+                "producto_mayor_stock": None
+            }
+        _, _, mas_caro = self._cima(self._por_precio, 0)
+        _, _, mayor_stock = self._cima(self._por_stock, 1)
+        precio, _, _ = self._consultar(mas_caro)
+        _, cantidad, _ = self._consultar(mayor_stock)
+        return {
+            "unidades_totales": self._unidades,
+            "valor_total": (math.fsum(self._parciales) if self._escala is None
+                            else self._valor_escalado / self._escala),
+            "producto_mas_caro": (mas_caro, precio),
+            "producto_mayor_stock": (mayor_stock, cantidad)
+        }
+
+    def sumandos(self) -> List[float]:
+        """
+        Sumandos del valor total; los de varios inventarios combinados con math.fsum
+        dan el mismo total que una sola suma sobre todos (exacto salvo en punto fijo).
+        """
+        if self._escala is not None:
+            return [self._valor_escalado / self._escala]
+        return list(self._parciales)
+
+    # --- Internos -----------------------------------------------------------
+
+    def _sumar(self, precio: float, cantidad: int, signo: int) -> None:
+        self._unidades += signo * cantidad
+        if self._escala is None:
+            sumar_exacto(self._parciales, signo * (precio * cantidad))
+        else:
+            self._valor_escalado += signo * round(precio * self._escala) * cantidad
+
+    def _apilar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        heapq.heappush(self._por_precio, (-precio, seq, nombre))
+        heapq.heappush(self._por_stock, (-cantidad, seq, nombre))
+
+    def _vigente(self, entrada: Tuple, campo: int) -> bool:
+        clave, seq, nombre = entrada
+        actual = self._consultar(nombre)
+        return actual is not None and actual[2] == seq and -actual[campo] == clave
+
+    def _cima(self, monticulo: List[Tuple], campo: int) -> Tuple:
+        # Borrado perezoso: se descartan entradas obsoletas al llegar a la cima
+        while not self._vigente(monticulo[0], campo):
+            heapq.heappop(monticulo)
+        return monticulo[0]
+
+    def _podar(self) -> None:
+        # Evita que las entradas obsoletas crezcan sin límite con muchas actualizaciones
+        limite = 2 * self._vivos + 64
+        if len(self._por_precio) > limite:
+            self._por_precio = self._reconstruir(self._por_precio, 0)
+        if len(self._por_stock) > limite:
+            self._por_stock = self._reconstruir(self._por_stock, 1)
+
+    def _reconstruir(self, monticulo: List[Tuple], campo: int) -> List[Tuple]:
+        # Una entrada vigente por nombre (un valor puede volver a uno anterior y duplicarse)
+        vigentes = {e[2]: e for e in monticulo if self._vigente(e, campo)}
+        nuevo = list(vigentes.values())
+        heapq.heapify(nuevo)
+        return nuevo
@@ -0,0 +1,537 @@
+"""
+Archivo: `historial.py`
+
+Historial de precios y cantidades por producto (serie temporal):
+- `Historial` es un observador del inventario (InventoryStore o InventarioSQLite):
+  cada alta, modificación, baja o vaciado agrega un punto (tiempo, precio, cantidad)
+  a la serie del producto
+- los puntos nuevos se acumulan en un bloque abierto (arrays compactos); al llegar
+  a PUNTOS_POR_SEGMENTO se sellan en un segmento inmutable codificado por deltas:
+  por punto un byte de marcas, el delta de tiempo y el de cantidad como varint
+  zigzag y el precio (8 bytes) solo si cambió
+- cada segmento guarda su tiempo inicial y final y el estado final; el índice de
+  tiempos iniciales por producto (búsqueda binaria) hace que "el inventario en el
+  instante T" decodifique como mucho un segmento por producto, sin reaplicar todo
+- `retener` descarta lo anterior a un instante (conservando el estado en ese
+  instante) y `reducir` deja un punto (el último) por intervalo en los datos
+  viejos; con `retencion` y `reduccion` se aplican solos al sellar segmentos
+- con `ruta`, los segmentos sellados se agregan a un archivo (solo anexar, con
+  crc32 por registro como el WAL); tras retener o reducir, el archivo se reescribe
+  entero cuando crece al doble de lo vivo y al cerrar
+
+Los tiempos se reciben y devuelven en segundos (como time.time()) y se guardan en
+milisegundos enteros; nunca retroceden aunque el reloj lo haga.
+"""
+
+import os
+import struct
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from UserHistory.Service import services
+from UserHistory.Service.services import Product
+
+PUNTOS_POR_SEGMENTO = 256
+UMBRAL_COMPACTACION_BYTES = 16 * 1024 * 1024
+# Política de abrir_historial: detalle completo la última hora, un punto por minuto
+# hasta 90 días y nada más viejo
+RETENCION = 90 * 24 * 3600
+REDUCCION = (3600, 60)
+
+# Marcas del byte inicial de cada punto codificado
+_PRECIO = 1
+_BAJA = 2
+# Cantidad con la que el bloque abierto representa una baja (las cantidades nunca son negativas)
+_SIN_CANTIDAD = -1
+
+_DOBLE = struct.Struct("<d")
+# longitud del nombre, inicio, fin, puntos, longitud de los datos, precio y cantidad finales
+_REGISTRO = struct.Struct("<IqqIIdq")
+_CRC = struct.Struct("<I")
+
+# (tiempo en segundos, precio, cantidad); precio y cantidad son None en una baja
+Punto = Tuple[float, Optional[float], Optional[int]]
+
+
+def _ms(segundos: float) -> int:
+    return round(segundos * 1000)
+
+
+def _escribir_varint(salida: bytearray, n: int) -> None:
+    while n >= 0x80:
+        salida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    salida.append(n)
+
+
+def _leer_varint(datos: bytes, pos: int) -> Tuple[int, int]:
+    n = desplazamiento = 0
+    while True:
+        byte = datos[pos]
+        pos += 1
+        n |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80:
+            return n, pos
+        desplazamiento += 7
+
+
+def _codificar(tiempos, precios, cantidades) -> bytes:
+    """Codifica puntos (ms, precio, cantidad o _SIN_CANTIDAD) por deltas; el segmento es autónomo."""
+    salida = bytearray()
+    t_ant, precio_ant, cantidad_ant = tiempos[0], None, 0
+    for t, precio, cantidad in zip(tiempos, precios, cantidades):
+        if cantidad == _SIN_CANTIDAD:
+            salida.append(_BAJA)
+            _escribir_varint(salida, t - t_ant)
+            precio_ant, cantidad_ant = None, 0
+        else:
+            cambia = precio_ant is None or precio != precio_ant
+            salida.append(_PRECIO if cambia else 0)
+            _escribir_varint(salida, t - t_ant)
+            delta = cantidad - cantidad_ant
+            _escribir_varint(salida, (delta << 1) ^ (delta >> 63))
+            if cambia:
+                salida += _DOBLE.pack(precio)
+            precio_ant, cantidad_ant = precio, cantidad
+        t_ant = t
+    return bytes(salida)
+
+
+def _decodificar(datos: bytes, inicio: int) -> Iterator[Tuple[int, Optional[float], Optional[int]]]:
+    """Itera (ms, precio, cantidad) de un segmento; precio y cantidad son None en una baja."""
+    pos, t, precio, cantidad = 0, inicio, None, 0
+    while pos < len(datos):
+        marcas = datos[pos]
+        dt, pos = _leer_varint(datos, pos + 1)
+        t += dt
+        if marcas & _BAJA:
+            precio, cantidad = None, 0
+            yield t, None, None
+            continue
+        zigzag, pos = _leer_varint(datos, pos)
+        cantidad += (zigzag >> 1) ^ -(zigzag & 1)
+        if marcas & _PRECIO:
+            (precio,) = _DOBLE.unpack_from(datos, pos)
+            pos += _DOBLE.size
+        yield t, precio, cantidad
+
+
+@dataclass(slots=True)
+class _Segmento:
+    inicio: int
+    fin: int
+    puntos: int
+    datos: bytes
+    # Estado al final del segmento; precio None si el producto quedó dado de baja
+    precio: Optional[float]
+    cantidad: int
+
+
+class _Serie:
+    """Segmentos sellados de un producto más su bloque abierto."""
+    __slots__ = ("segmentos", "inicios", "tiempos", "precios", "cantidades", "reducido_hasta")
+
+    def __init__(self):
+        self.segmentos: List[_Segmento] = []
+        self.inicios = array('q')
+        self.tiempos = array('q')
+        self.precios = array('d')
+        self.cantidades = array('q')
+        # Los puntos anteriores a este instante ya están reducidos
+        self.reducido_hasta = 0
+
+    def ultimo(self) -> Tuple[Optional[float], Optional[int]]:
+        """Estado tras el último punto: (precio, cantidad) o (None, None) si no existe."""
+        if self.cantidades:
+            if self.cantidades[-1] == _SIN_CANTIDAD:
+                return None, None
+            return self.precios[-1], self.cantidades[-1]
+        if self.segmentos and self.segmentos[-1].precio is not None:
+            return self.segmentos[-1].precio, self.segmentos[-1].cantidad
+        return None, None
+
+    def puntos(self, desde_segmento: int = 0) -> Iterator[Tuple[int, Optional[float], Optional[int]]]:
+        for segmento in self.segmentos[desde_segmento:]:
+            yield from _decodificar(segmento.datos, segmento.inicio)
+        for t, precio, cantidad in zip(self.tiempos, self.precios, self.cantidades):
+            yield (t, None, None) if cantidad == _SIN_CANTIDAD else (t, precio, cantidad)
+
+    def estado_en(self, t: int) -> Tuple[Optional[float], Optional[int]]:
+        if self.tiempos and t >= self.tiempos[0]:
+            i = bisect_right(self.tiempos, t) - 1
+            if self.cantidades[i] == _SIN_CANTIDAD:
+                return None, None
+            return self.precios[i], self.cantidades[i]
+        k = bisect_right(self.inicios, t) - 1
+        if k < 0:
+            return None, None
+        segmento = self.segmentos[k]
+        if t >= segmento.fin:
+            return segmento.precio, (None if segmento.precio is None else segmento.cantidad)
+        estado = (None, None)
+        for t_punto, precio, cantidad in _decodificar(segmento.datos, segmento.inicio):
+            if t_punto > t:
+                break
+            estado = (precio, cantidad)
+        return estado
+
+
+def _sellar(tiempos, precios, cantidades) -> _Segmento:
+    ultimo = cantidades[-1]
+    precio = None if ultimo == _SIN_CANTIDAD else precios[-1]
+    return _Segmento(tiempos[0], tiempos[-1], len(tiempos), _codificar(tiempos, precios, cantidades),
+                     precio, 0 if precio is None else ultimo)
+
+
+def _leer_registros(ruta: str) -> Iterator[Tuple[str, _Segmento, int]]:
+    """Itera (nombre, segmento, fin) y se detiene en el primer registro incompleto o corrupto."""
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+    except FileNotFoundError:
+        return
+    pos = 0
+    while pos + _REGISTRO.size <= len(datos):
+        largo, inicio, fin_t, puntos, largo_datos, precio, cantidad = _REGISTRO.unpack_from(datos, pos)
+        fin = pos + _REGISTRO.size + largo + largo_datos + _CRC.size
+        if fin > len(datos):
+            return
+        (crc,) = _CRC.unpack_from(datos, fin - _CRC.size)
+        if zlib.crc32(datos[pos:fin - _CRC.size]) != crc:
+            return
+        inicio_nombre = pos + _REGISTRO.size
+        nombre = datos[inicio_nombre:inicio_nombre + largo].decode("utf-8")
+        carga = datos[inicio_nombre + largo:fin - _CRC.size]
+        yield nombre, _Segmento(inicio, fin_t, puntos, carga, None if cantidad < 0 else precio,
+                                max(cantidad, 0)), fin
+        pos = fin
+
+
+def _registro(nombre: str, segmento: _Segmento) -> bytes:
+    codificado = nombre.encode("utf-8")
+    cantidad = _SIN_CANTIDAD if segmento.precio is None else segmento.cantidad
+    registro = _REGISTRO.pack(len(codificado), segmento.inicio, segmento.fin, segmento.puntos,
+                              len(segmento.datos), segmento.precio or 0.0, cantidad) + codificado + segmento.datos
+    return registro + _CRC.pack(zlib.crc32(registro))
+
+
+class Historial:
+    """Observador del inventario que guarda la serie temporal de cada producto."""
+
+    def __init__(self, ruta: str | None = None, reloj: Callable[[], float] = time.time,
+                 retencion: float | None = None, reduccion: Tuple[float, float] | None = None,
+                 puntos_por_segmento: int = PUNTOS_POR_SEGMENTO):
+        """
+        `retencion`: segundos de historia que se conservan (None = todo).
+        `reduccion`: (antigüedad, intervalo) en segundos; los puntos con más de esa
+        antigüedad se reducen a uno por intervalo.
+        """
+        self._series: Dict[str, _Serie] = {}
+        self._reloj = reloj
+        self._ultimo_t = 0
+        self._retencion = None if retencion is None else _ms(retencion)
+        self._reduccion = None if reduccion is None else (_ms(reduccion[0]), max(1, _ms(reduccion[1])))
+        self._puntos_por_segmento = max(1, puntos_por_segmento)
+        self._observados: list = []
+        self._ruta = ruta
+        self._f = None
+        # Hay segmentos reescritos en memoria que el archivo todavía tiene en su versión anterior
+        self._reescrito = False
+        self._bytes_base = 0
+        if ruta is not None:
+            valido = 0
+            for nombre, segmento, valido in _leer_registros(ruta):
+                serie = self._series.get(nombre)
+                if serie is None:
+                    serie = self._series[nombre] = _Serie()
+                serie.segmentos.append(segmento)
+                serie.inicios.append(segmento.inicio)
+                self._ultimo_t = max(self._ultimo_t, segmento.fin)
+            if os.path.exists(ruta) and os.path.getsize(ruta) > valido:
+                # Descarta la cola a medio escribir de una caída
+                with open(ruta, "r+b") as f:
+                    f.truncate(valido)
+            self._f = open(ruta, "ab")
+            self._bytes_base = self._f.tell()
+
+    # --- Eventos del inventario ---------------------------------------------
+
+    def observar(self, inventario) -> None:
+        """
+        Se suscribe a `inventario`. Antes anota su estado actual: los productos que
+        difieren de la historia (o faltan en ella) quedan registrados en este instante.
+        """
+        filas = inventario.filas() if hasattr(inventario, "filas") else (
+            (p.nombre, p.precio, p.cantidad) for p in inventario.values())
+        presentes = set()
+        for nombre, precio, cantidad in filas:
+            presentes.add(nombre)
+            self.registrar(nombre, precio, cantidad)
+        for nombre in [n for n in self._series if n not in presentes]:
+            self.registrar(nombre, None, None)
+        self._observados.append(inventario)
+        inventario.suscribir(self)
+
+    def al_agregar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self.registrar(nombre, precio, cantidad)
+
+    def al_modificar(self, nombre: str, precio_ant: float, cantidad_ant: int,
+                     precio: float, cantidad: int, seq: int) -> None:
+        self.registrar(nombre, precio, cantidad)
+
+    def al_eliminar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self.registrar(nombre, None, None)
+
+    def al_limpiar(self) -> None:
+        t = self._ahora()
+        for nombre, serie in self._series.items():
+            if serie.ultimo()[0] is not None:
+                self._anotar(nombre, serie, t, None, None)
+
+    # --- Escritura ----------------------------------------------------------
+
+    def _ahora(self) -> int:
+        self._ultimo_t = max(self._ultimo_t, _ms(self._reloj()))
+        return self._ultimo_t
+
+    def registrar(self, nombre: str, precio: Optional[float], cantidad: Optional[int],
+                  tiempo: float | None = None) -> None:
+        """Agrega un punto a la serie de `nombre` (precio None = baja). `tiempo` por defecto es el reloj."""
+        if tiempo is None:
+            t = self._ahora()
+        else:
+            t = self._ultimo_t = max(self._ultimo_t, _ms(tiempo))
+        serie = self._series.get(nombre)
+        if serie is None:
+            if precio is None:
+                return
+            serie = self._series[nombre] = _Serie()
+        self._anotar(nombre, serie, t, precio, cantidad)
+
+    def _anotar(self, nombre: str, serie: _Serie, t: int, precio: Optional[float],
+                cantidad: Optional[int]) -> None:
+        tiempos, cantidades = serie.tiempos, serie.cantidades
+        # Un vaciado seguido del alta del mismo producto en el mismo milisegundo (reemplazo del
+        # inventario) no deja rastro: se quita la baja y el alta solo queda si cambia algo
+        if tiempos and tiempos[-1] == t and cantidades[-1] == _SIN_CANTIDAD and precio is not None:
+            tiempos.pop()
+            serie.precios.pop()
+            cantidades.pop()
+        if serie.ultimo() == (precio, cantidad):
+            return
+        tiempos.append(t)
+        serie.precios.append(0.0 if precio is None else precio)
+        cantidades.append(_SIN_CANTIDAD if cantidad is None else cantidad)
+        if len(tiempos) >= self._puntos_por_segmento:
+            self._cerrar_bloque(nombre, serie)
+            if self._retencion is not None or self._reduccion is not None:
+                self._mantener_serie(nombre, serie, self._ultimo_t)
+
+    def _cerrar_bloque(self, nombre: str, serie: _Serie) -> None:
+        segmento = _sellar(serie.tiempos, serie.precios, serie.cantidades)
+        serie.segmentos.append(segmento)
+        serie.inicios.append(segmento.inicio)
+        serie.tiempos, serie.precios, serie.cantidades = array('q'), array('d'), array('q')
+        if self._f is not None:
+            self._f.write(_registro(nombre, segmento))
+
+    # --- Consultas ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, nombre: object) -> bool:
+        return nombre in self._series
+
+    def estado_en(self, nombre: str, tiempo: float) -> Optional[Product]:
+        """El producto tal como estaba en `tiempo`, o None si no existía."""
+        serie = self._series.get(nombre)
+        if serie is None:
+            return None
+        precio, cantidad = serie.estado_en(_ms(tiempo))
+        return None if precio is None else Product(nombre, precio, cantidad)
+
+    def inventario_en(self, tiempo: float) -> Dict[str, Product]:
+        """Inventario completo en `tiempo`: decodifica como mucho un segmento por producto."""
+        t = _ms(tiempo)
+        inventario: Dict[str, Product] = {}
+        for nombre, serie in self._series.items():
+            precio, cantidad = serie.estado_en(t)
+            if precio is not None:
+                inventario[nombre] = Product(nombre, precio, cantidad)
+        return inventario
+
+    def serie(self, nombre: str, desde: float | None = None, hasta: float | None = None) -> List[Punto]:
+        """Cambios de `nombre` con desde <= tiempo <= hasta, en orden; una baja es (tiempo, None, None)."""
+        serie = self._series.get(nombre)
+        if serie is None:
+            return []
+        inicio = None if desde is None else _ms(desde)
+        fin = None if hasta is None else _ms(hasta)
+        primero = 0 if inicio is None else max(0, bisect_right(serie.inicios, inicio) - 1)
+        puntos = []
+        for t, precio, cantidad in serie.puntos(primero):
+            if fin is not None and t > fin:
+                break
+            if inicio is None or t >= inicio:
+                puntos.append((t / 1000, precio, cantidad))
+        return puntos
+
+    def huella(self) -> Dict[str, int]:
+        """Tamaño de lo guardado: productos, segmentos, puntos y bytes de datos (sellados y abiertos)."""
+        segmentos = puntos = sellados = abiertos = 0
+        for serie in self._series.values():
+            segmentos += len(serie.segmentos)
+            puntos += sum(s.puntos for s in serie.segmentos) + len(serie.tiempos)
+            sellados += sum(len(s.datos) for s in serie.segmentos)
+            abiertos += len(serie.tiempos) * 24
+        return {"productos": len(self._series), "segmentos": segmentos, "puntos": puntos,
+                "bytes_sellados": sellados, "bytes_abiertos": abiertos}
+
+    # --- Retención y reducción ----------------------------------------------
+
+    def _reescribir(self, nombre: str, serie: _Serie, desde: int, corte: int,
+                    transformar: Callable[[list], list]) -> None:
+        """
+        Reemplaza por transformar(puntos) los puntos de los segmentos que empiezan antes o
+        en `corte`, a partir del que contiene `desde` (los anteriores no se decodifican).
+        """
+        k = bisect_right(serie.inicios, corte)
+        if k == 0 and not (serie.tiempos and serie.tiempos[0] <= corte):
+            return
+        j = max(0, bisect_right(serie.inicios, desde) - 1)
+        con_bloque = k == len(serie.segmentos)
+        puntos = [p for s in serie.segmentos[j:k] for p in _decodificar(s.datos, s.inicio)]
+        if con_bloque:
+            puntos += [(t, None, None) if c == _SIN_CANTIDAD else (t, p, c)
+                       for t, p, c in zip(serie.tiempos, serie.precios, serie.cantidades)]
+        puntos = transformar(puntos)
+        # Todo lo reescrito queda sellado (el último segmento puede ser corto)
+        nuevos: List[_Segmento] = []
+        for i in range(0, len(puntos), self._puntos_por_segmento):
+            tramo = puntos[i:i + self._puntos_por_segmento]
+            nuevos.append(_sellar(array('q', [t for t, _, _ in tramo]),
+                                  array('d', [p or 0.0 for _, p, _ in tramo]),
+                                  array('q', [_SIN_CANTIDAD if c is None else c for _, _, c in tramo])))
+        serie.segmentos[j:k] = nuevos
+        serie.inicios = array('q', [s.inicio for s in serie.segmentos])
+        if con_bloque:
+            serie.tiempos, serie.precios, serie.cantidades = array('q'), array('d'), array('q')
+        if not serie.segmentos and not serie.tiempos:
+            del self._series[nombre]
+        self._reescrito = True
+
+    def _retener_serie(self, nombre: str, serie: _Serie, corte: int) -> None:
+        primero = serie.inicios[0] if serie.segmentos else (serie.tiempos[0] if serie.tiempos else None)
+        if primero is None or primero >= corte:
+            return
+        precio, cantidad = serie.estado_en(corte)
+
+        def recortar(puntos: list) -> list:
+            posteriores = [p for p in puntos if p[0] > corte]
+            # El estado en el corte queda como punto inicial para que las consultas posteriores sigan exactas
+            return ([] if precio is None else [(corte, precio, cantidad)]) + posteriores
+
+        self._reescribir(nombre, serie, 0, corte, recortar)
+
+    def _reducir_serie(self, nombre: str, serie: _Serie, corte: int, intervalo: int) -> None:
+        # El corte se alinea al intervalo: reducir por partes da lo mismo que de una vez
+        corte = corte // intervalo * intervalo - 1
+        if corte <= serie.reducido_hasta:
+            return
+        desde = serie.reducido_hasta
+
+        def reducir(puntos: list) -> list:
+            resultado = []
+            for punto in puntos:
+                t = punto[0]
+                # Se conserva el último punto de cada intervalo (el estado al final del intervalo)
+                if (desde < t <= corte and resultado and desde < resultado[-1][0]
+                        and resultado[-1][0] // intervalo == t // intervalo):
+                    resultado[-1] = punto
+                else:
+                    resultado.append(punto)
+            return resultado
+
+        self._reescribir(nombre, serie, desde, corte, reducir)
+        serie.reducido_hasta = corte
+
+    def _mantener_serie(self, nombre: str, serie: _Serie, ahora: int) -> None:
+        if self._reduccion is not None:
+            antiguedad, intervalo = self._reduccion
+            self._reducir_serie(nombre, serie, ahora - antiguedad, intervalo)
+        if self._retencion is not None and nombre in self._series:
+            self._retener_serie(nombre, serie, ahora - self._retencion)
+        if self._reescrito and self._f is not None and self._f.tell() >= max(
+                2 * self._bytes_base, UMBRAL_COMPACTACION_BYTES):
+            self.compactar()
+
+    def retener(self, desde: float) -> None:
+        """Descarta la historia anterior a `desde`; el estado en `desde` se conserva."""
+        corte = _ms(desde)
+        for nombre, serie in list(self._series.items()):
+            self._retener_serie(nombre, serie, corte)
+
+    def reducir(self, antes_de: float, intervalo: float) -> None:
+        """Deja un solo punto (el último) por `intervalo` segundos en la historia anterior a `antes_de`."""
+        corte, paso = _ms(antes_de), max(1, _ms(intervalo))
+        for nombre, serie in list(self._series.items()):
+            self._reducir_serie(nombre, serie, corte, paso)
+
+    def mantener(self, ahora: float | None = None) -> None:
+        """Aplica la retención y la reducción configuradas a todos los productos."""
+        t = self._ahora() if ahora is None else _ms(ahora)
+        for nombre, serie in list(self._series.items()):
+            self._mantener_serie(nombre, serie, t)
+
+    # --- Persistencia -------------------------------------------------------
+
+    def compactar(self) -> None:
+        """Reescribe el archivo con los segmentos sellados actuales (atómico: temporal + os.replace)."""
+        if self._ruta is None:
+            return
+        if self._f is not None:
+            self._f.close()
+        temporal = self._ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            for nombre, serie in self._series.items():
+                for segmento in serie.segmentos:
+                    f.write(_registro(nombre, segmento))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta)
+        self._f = open(self._ruta, "ab")
+        self._bytes_base = self._f.tell()
+        self._reescrito = False
+
+    def cerrar(self) -> None:
+        """Sella los bloques abiertos, deja el archivo al día y deja de observar el inventario."""
+        for inventario in self._observados:
+            inventario.desuscribir(self)
+        self._observados = []
+        if self._retencion is not None or self._reduccion is not None:
+            self.mantener()
+        for nombre, serie in list(self._series.items()):
+            if serie.tiempos:
+                self._cerrar_bloque(nombre, serie)
+        if self._f is None:
+            return
+        if self._reescrito:
+            self.compactar()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        self._f = None
+
+
+def abrir_historial(inventario, base_dir: str | None = None, retencion: float | None = RETENCION,
+                    reduccion: Tuple[float, float] | None = REDUCCION) -> Historial:
+    """Abre `historial.seg` del directorio de datos y lo suscribe al inventario."""
+    base = base_dir or services.obtener_base_dir()
+    historial = Historial(os.path.join(base, "historial.seg"), retencion=retencion, reduccion=reduccion)
+    historial.observar(inventario)
+    return historial
@@ -0,0 +1,177 @@
+"""
+Archivo: `indices.py`
+
+Índices ordenados secundarios por precio, cantidad y subtotal:
+- `ListaOrdenada`: lista ordenada en cubetas (cada una de hasta 2 * CARGA
+  elementos) con bisect sobre el máximo de cada cubeta; insertar y borrar
+  cuesta O(log n + CARGA) en vez de mover toda la lista
+- `IndicesOrdenados`: una ListaOrdenada por campo, suscrita a un
+  InventoryStore, con consultas por rango, top-k y percentil
+
+Cada entrada es (clave, -secuencia, nombre): a igual clave, el top-k
+devuelve primero el producto insertado antes, igual que `calcular_estadisticas`.
+"""
+
+import math
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+CAMPOS = ("precio", "cantidad", "subtotal")
+# Tamaño nominal de cada cubeta
+CARGA = 512
+
+Entrada = Tuple[float, int, str]
+
+
+class ListaOrdenada:
+    """Secuencia ordenada con inserción, borrado y acceso por posición."""
+
+    def __init__(self, valores: Iterable = ()):
+        ordenados = sorted(valores)
+        self._cubetas: List[list] = [ordenados[i:i + CARGA] for i in range(0, len(ordenados), CARGA)]
+        self._maximos = [cubeta[-1] for cubeta in self._cubetas]
+        self._largo = len(ordenados)
+        # Posición inicial de cada cubeta; se recalcula solo cuando hace falta
+        self._inicios: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return self._largo
+
+    def agregar(self, valor) -> None:
+        self._inicios = None
+        self._largo += 1
+        if not self._cubetas:
+            self._cubetas.append([valor])
+            self._maximos.append(valor)
+            return
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._cubetas):
+            i -= 1
+            self._cubetas[i].append(valor)
+            self._maximos[i] = valor
+        else:
+            insort(self._cubetas[i], valor)
+        if len(self._cubetas[i]) > 2 * CARGA:
+            cubeta = self._cubetas[i]
+            self._cubetas.insert(i + 1, cubeta[CARGA:])
+            del cubeta[CARGA:]
+            self._maximos.insert(i, cubeta[-1])
+
+    def quitar(self, valor) -> bool:
+        i = bisect_left(self._maximos, valor)
+        if i == len(self._cubetas):
+            return False
+        cubeta = self._cubetas[i]
+        j = bisect_left(cubeta, valor)
+        if cubeta[j] != valor:
+            return False
+        self._inicios = None
+        self._largo -= 1
+        del cubeta[j]
+        if cubeta:
+            self._maximos[i] = cubeta[-1]
+        else:
+            del self._cubetas[i]
+            del self._maximos[i]
+        return True
+
+    def __getitem__(self, posicion: int):
+        if posicion < 0:
+            posicion += self._largo
+        if not 0 <= posicion < self._largo:
+            raise IndexError(posicion)
+        if self._inicios is None:
+            self._inicios = list(accumulate((len(c) for c in self._cubetas), initial=0))
+        i = bisect_right(self._inicios, posicion) - 1
+        return self._cubetas[i][posicion - self._inicios[i]]
+
+    def iterar(self, desde=None, hasta=None) -> Iterator:
+        """Valores v con desde <= v < hasta en orden ascendente (None = sin límite)."""
+        if desde is None:
+            i = j = 0
+        else:
+            i = bisect_left(self._maximos, desde)
+            j = bisect_left(self._cubetas[i], desde) if i < len(self._cubetas) else 0
+        for cubeta in islice(self._cubetas, i, None):
+            for valor in islice(cubeta, j, None):
+                if hasta is not None and valor >= hasta:
+                    return
+                yield valor
+            j = 0
+
+    def __reversed__(self) -> Iterator:
+        for cubeta in reversed(self._cubetas):
+            yield from reversed(cubeta)
+
+
+class IndicesOrdenados:
+    """Índices por precio, cantidad y subtotal mantenidos con cada mutación."""
+
+    def __init__(self, filas: Iterable[Tuple[str, float, int, int]] = ()):
+        entradas: Tuple[List[Entrada], ...] = ([], [], [])
+        for nombre, precio, cantidad, seq in filas:
+            for lista, clave in zip(entradas, _claves(precio, cantidad)):
+                lista.append((clave, -seq, nombre))
+        self._listas: Dict[str, ListaOrdenada] = dict(zip(CAMPOS, map(ListaOrdenada, entradas)))
+
+    # --- Eventos del inventario ---------------------------------------------
+
+    def al_agregar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        for campo, clave in zip(CAMPOS, _claves(precio, cantidad)):
+            self._listas[campo].agregar((clave, -seq, nombre))
+
+    def al_modificar(self, nombre: str, precio_ant: float, cantidad_ant: int,
+                     precio: float, cantidad: int, seq: int) -> None:
+        anteriores = _claves(precio_ant, cantidad_ant)
+        for campo, anterior, clave in zip(CAMPOS, anteriores, _claves(precio, cantidad)):
+            if clave != anterior:
+                self._listas[campo].quitar((anterior, -seq, nombre))
+                self._listas[campo].agregar((clave, -seq, nombre))
+
+    def al_eliminar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        for campo, clave in zip(CAMPOS, _claves(precio, cantidad)):
+            self._listas[campo].quitar((clave, -seq, nombre))
+
+    def al_limpiar(self) -> None:
+        self._listas = {campo: ListaOrdenada() for campo in CAMPOS}
+
+    # --- Consultas ----------------------------------------------------------
+
+    def _lista(self, campo: str) -> ListaOrdenada:
+        try:
+            return self._listas[campo]
+        except KeyError:
+            raise ValueError(f"Campo desconocido: '{campo}'. Usa uno de {', '.join(CAMPOS)}.") from None
+
+    def nombres(self, campo: str, descendente: bool = False) -> Iterator[str]:
+        """Todos los nombres ordenados por `campo`, sin copiar el índice."""
+        lista = self._lista(campo)
+        entradas = reversed(lista) if descendente else lista.iterar()
+        return (nombre for _, _, nombre in entradas)
+
+    def rango(self, campo: str, minimo: float | None = None, maximo: float | None = None,
+              k: int | None = None) -> List[Tuple[str, float]]:
+        """Hasta k (nombre, valor) con minimo <= valor <= maximo, de menor a mayor."""
+        lista = self._lista(campo)
+        desde = None if minimo is None else (minimo,)
+        hasta = None if maximo is None else (maximo, math.inf)
+        return [(nombre, clave) for clave, _, nombre in islice(lista.iterar(desde, hasta), k)]
+
+    def top(self, campo: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Los k (nombre, valor) con mayor valor, de mayor a menor."""
+        return [(nombre, clave) for clave, _, nombre in islice(reversed(self._lista(campo)), k)]
+
+    def percentil(self, campo: str, p: float) -> Optional[Tuple[str, float]]:
+        """(nombre, valor) en el percentil p (0-100) por rango más cercano; None si está vacío."""
+        if not 0 <= p <= 100:
+            raise ValueError("El percentil debe estar entre 0 y 100.")
+        lista = self._lista(campo)
+        if not len(lista):
+            return None
+        clave, _, nombre = lista[max(0, math.ceil(p / 100 * len(lista)) - 1)]
+        return nombre, clave
+
+
+def _claves(precio: float, cantidad: int) -> Tuple[float, int, float]:
+    return precio, cantidad, precio * cantidad
@@ -0,0 +1,224 @@
+"""
+Archivo: `journal.py`
+
+Persistencia por registro de escritura anticipada (WAL):
+- cada alta, modificación, baja o vaciado del inventario agrega un registro
+  binario compacto a `inventario.wal` dentro de BASE_DIR
+- los registros se sincronizan a disco (fsync) en lotes configurables
+- al arrancar se abre el último snapshot y se reaplica el log encima
+- cuando el log supera un umbral se compacta en segundo plano: se rota a
+  `inventario.wal.old`, se escribe un snapshot nuevo y se descarta el log viejo
+
+Los registros son asignaciones absolutas (poner / borrar / vaciar), así que
+reaplicar un log que ya está contenido en el snapshot no cambia el resultado.
+"""
+
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import Optional, Tuple
+
+from UserHistory.Service import services
+from UserHistory.Service.services import Product
+from UserHistory.Service.snapshot import cargar_snapshot, guardar_snapshot
+from UserHistory.Service.store import InventoryStore
+
+OP_PONER = 1
+OP_BORRAR = 2
+OP_VACIAR = 3
+
+# op, longitud del nombre, precio, cantidad; luego el nombre y un crc32 del registro
+_REGISTRO = struct.Struct("<BIdq")
+_CRC = struct.Struct("<I")
+
+FSYNC_CADA = 64
+UMBRAL_COMPACTACION_BYTES = 64 * 1024 * 1024
+
+
+def _leer_registros(ruta: str):
+    """Itera (op, nombre, precio, cantidad, fin) y se detiene en el primer registro incompleto o corrupto."""
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+    except FileNotFoundError:
+        return
+    pos = 0
+    while pos + _REGISTRO.size <= len(datos):
+        op, largo, precio, cantidad = _REGISTRO.unpack_from(datos, pos)
+        fin = pos + _REGISTRO.size + largo + _CRC.size
+        if fin > len(datos):
+            return
+        (crc,) = _CRC.unpack_from(datos, fin - _CRC.size)
+        if zlib.crc32(datos[pos:fin - _CRC.size]) != crc:
+            return
+        nombre = datos[pos + _REGISTRO.size:fin - _CRC.size].decode("utf-8")
+        yield op, nombre, precio, cantidad, fin
+        pos = fin
+
+
+def reaplicar_log(inventario: InventoryStore, ruta: str) -> int:
+    """Aplica los registros válidos de `ruta` y devuelve el offset del último registro íntegro."""
+    valido = 0
+    for op, nombre, precio, cantidad, fin in _leer_registros(ruta):
+        if op == OP_PONER:
+            inventario[nombre] = Product(nombre, precio, cantidad)
+        elif op == OP_BORRAR:
+            inventario.eliminar_producto(nombre)
+        elif op == OP_VACIAR:
+            inventario.clear()
+        valido = fin
+    return valido
+
+
+class Journal:
+    """Observador de InventoryStore que registra cada mutación en el WAL."""
+
+    def __init__(self, inventario: InventoryStore, ruta_wal: str, ruta_snapshot: str,
+                 fsync_cada: int = FSYNC_CADA,
+                 umbral_compactacion: int = UMBRAL_COMPACTACION_BYTES):
+        self._inventario = inventario
+        self._ruta_wal = ruta_wal
+        self._ruta_viejo = ruta_wal + ".old"
+        self._ruta_snapshot = ruta_snapshot
+        self._fsync_cada = max(1, fsync_cada)
+        self._umbral = umbral_compactacion
+        self._lock = threading.Lock()
+        self._f = open(ruta_wal, "ab")
+        self._pendientes = 0
+        self._compactacion: Optional[threading.Thread] = None
+        # Resultado de la última compactación (None si aún no hubo ninguna)
+        self.ultima_compactacion: Optional[bool] = None
+        inventario.suscribir(self)
+
+    # --- Eventos del inventario ---------------------------------------------
+
+    def al_agregar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self._registrar(OP_PONER, nombre, precio, cantidad)
+
+    def al_modificar(self, nombre: str, precio_ant: float, cantidad_ant: int,
+                     precio: float, cantidad: int, seq: int) -> None:
+        self._registrar(OP_PONER, nombre, precio, cantidad)
+
+    def al_eliminar(self, nombre: str, precio: float, cantidad: int, seq: int) -> None:
+        self._registrar(OP_BORRAR, nombre, 0.0, 0)
+
+    def al_limpiar(self) -> None:
+        self._registrar(OP_VACIAR, "", 0.0, 0)
+
+    # --- Escritura ----------------------------------------------------------
+
+    def _registrar(self, op: int, nombre: str, precio: float, cantidad: int) -> None:
+        codificado = nombre.encode("utf-8")
+        registro = _REGISTRO.pack(op, len(codificado), precio, cantidad) + codificado
+        with self._lock:
+            self._f.write(registro + _CRC.pack(zlib.crc32(registro)))
+            self._pendientes += 1
+            if self._pendientes >= self._fsync_cada:
+                self._sincronizar()
+            if self._f.tell() >= self._umbral and not self.compactando():
+                self._rotar()
+
+    def _sincronizar(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pendientes = 0
+
+    def sincronizar(self) -> None:
+        with self._lock:
+            self._sincronizar()
+
+    # --- Compactación -------------------------------------------------------
+
+    def compactando(self) -> bool:
+        return self._compactacion is not None and self._compactacion.is_alive()
+
+    def _rotar(self) -> None:
+        # Se copia el estado exacto en el que se corta el log; el snapshot se escribe en segundo plano
+        self._sincronizar()
+        self._f.close()
+        if os.path.exists(self._ruta_viejo):
+            # Una compactación anterior falló: el log viejo no se pisa, se le añade el actual
+            with open(self._ruta_wal, "rb") as actual, open(self._ruta_viejo, "ab") as viejo:
+                viejo.write(actual.read())
+                viejo.flush()
+                os.fsync(viejo.fileno())
+            self._f = open(self._ruta_wal, "wb")
+        else:
+            os.replace(self._ruta_wal, self._ruta_viejo)
+            self._f = open(self._ruta_wal, "ab")
+        inventario = self._inventario
+        # La copia del snapshot conserva decimales y modo de nombres (None = nombres exactos)
+        plegar = inventario.plegar_acentos if inventario.normaliza_nombres else None
+        args = (*inventario.columnas(), inventario.decimales, plegar)
+        self._compactacion = threading.Thread(target=self._escribir_snapshot, args=args,
+                                              name="compactacion-wal", daemon=True)
+        self._compactacion.start()
+
+    def _escribir_snapshot(self, nombres: list, precios: array, cantidades: array,
+                           decimales: Optional[int], plegar_acentos: Optional[bool]) -> None:
+        # desde_columnas descarta los tombstones de la copia
+        copia = InventoryStore.desde_columnas(nombres, precios, cantidades)
+        if plegar_acentos is not None:
+            copia.normalizar_nombres(plegar_acentos)
+        if decimales is not None:
+            copia.fijar_decimales(decimales)
+        # Si falla, el log viejo se conserva y se reaplica en el próximo arranque
+        try:
+            guardado = guardar_snapshot(copia, self._ruta_snapshot)
+            if guardado:
+                os.remove(self._ruta_viejo)
+        except OSError:
+            guardado = False
+        self.ultima_compactacion = guardado
+
+    def compactar(self) -> bool:
+        """Fuerza una compactación, espera a que termine y devuelve si el snapshot se guardó."""
+        with self._lock:
+            # Sin soltar el lock entre la espera y la rotación, _registrar podría rotar en medio
+            while self.compactando():
+                hilo = self._compactacion
+                self._lock.release()
+                try:
+                    hilo.join()
+                finally:
+                    self._lock.acquire()
+            self._rotar()
+        self.esperar()
+        return bool(self.ultima_compactacion)
+
+    def esperar(self) -> None:
+        if self._compactacion is not None:
+            self._compactacion.join()
+
+    def cerrar(self) -> None:
+        self.esperar()
+        with self._lock:
+            self._sincronizar()
+            self._f.close()
+        self._inventario.desuscribir(self)
+
+
+def abrir_inventario(base_dir: str | None = None, fsync_cada: int = FSYNC_CADA,
+                     umbral_compactacion: int = UMBRAL_COMPACTACION_BYTES) -> Tuple[InventoryStore, Journal]:
+    """Recupera el inventario (snapshot + log) y le adjunta un journal nuevo."""
+    base = base_dir or services.obtener_base_dir()
+    ruta_snapshot = os.path.join(base, "inventario.snap")
+    ruta_wal = os.path.join(base, "inventario.wal")
+    inventario = cargar_snapshot(ruta_snapshot) or InventoryStore()
+    # Un .old indica una compactación que no llegó a terminar: va antes que el log actual
+    viejo = os.path.exists(ruta_wal + ".old")
+    if viejo:
+        reaplicar_log(inventario, ruta_wal + ".old")
+    valido = reaplicar_log(inventario, ruta_wal)
+    if os.path.exists(ruta_wal) and os.path.getsize(ruta_wal) > valido:
+        # Descarta la cola a medio escribir de una caída
+        with open(ruta_wal, "r+b") as f:
+            f.truncate(valido)
+    if viejo and guardar_snapshot(inventario, ruta_snapshot):
+        # El estado recuperado ya incluye ambos logs: se consolida antes de seguir escribiendo
+        os.remove(ruta_wal + ".old")
+        open(ruta_wal, "wb").close()
+    journal = Journal(inventario, ruta_wal, ruta_snapshot, fsync_cada, umbral_compactacion)
+    return inventario, journal
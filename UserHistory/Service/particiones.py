@@ -0,0 +1,392 @@
+"""
+Archivo: `particiones.py`
+
+Inventario repartido en N particiones por hash del nombre:
+- la partición de un producto es crc32(clave) % N (clave = nombre, o nombre
+  normalizado si se activa `normalizar_nombres`); crc32 es estable entre
+  procesos y ejecuciones, a diferencia de hash()
+- cada partición es un InventoryStore que vive en su propio proceso
+  trabajador (o en el mismo proceso con `procesos=False`)
+- las operaciones de un producto van solo a su partición; las masivas
+  (altas por lote, fusión de un CSV, guardar y cargar los archivos de cada
+  partición) se envían a todas a la vez y corren en paralelo
+- `resumen_estadisticas` es un map-reduce: cada partición entrega sus sumas
+  y sus máximos locales y aquí se combinan
+
+Implementa la interfaz de almacenamiento de `services.py`, así que sirve
+para cargar_csv, guardar_csv, calcular_estadisticas y el resto de servicios.
+El orden de iteración es por partición (y dentro de ella, de inserción): a
+igual precio o stock, el máximo lo decide la partición de menor índice.
+
+Cada operación individual cuesta un viaje de ida y vuelta al trabajador;
+el reparto compensa en cargas, guardados y estadísticas sobre muchos datos.
+"""
+
+import math
+import os
+import zlib
+from collections.abc import MutableMapping
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from UserHistory.Service.carga_paralela import aplicar_parciales
+from UserHistory.Service.services import Product, cargar_csv, guardar_csv
+from UserHistory.Service.snapshot import cargar_snapshot, guardar_snapshot
+from UserHistory.Service.store import InventoryStore
+from UserHistory.Utils.Validator import normalize_name
+
+
+# --- Tareas que ejecuta cada partición ------------------------------------------
+
+def _poner(inventario: InventoryStore, nombre: str, precio: float, cantidad: int) -> None:
+    inventario[nombre] = Product(nombre, precio, cantidad)
+
+
+def _reemplazar(inventario: InventoryStore, filas: List[Tuple[str, float, int]]) -> None:
+    inventario.clear()
+    inventario.agregar_lote(filas)
+
+
+def _fusionar(inventario: InventoryStore, parciales: list, politica_precio: str) -> Tuple[int, int]:
+    # Misma semántica de fusión que cargar_csv / carga_paralela
+    return aplicar_parciales(inventario, {}, parciales, 0, False, politica_precio)
+
+
+def _resumen(inventario: InventoryStore) -> Tuple[Dict[str, object], List[float]]:
+    return inventario.resumen_estadisticas(), inventario.sumandos_valor()
+
+
+def _guardar(inventario: InventoryStore, ruta: str) -> bool:
+    if ruta.endswith(".csv"):
+        return guardar_csv(inventario, ruta)
+    return guardar_snapshot(inventario, ruta)
+
+
+def _cargar(inventario: InventoryStore, ruta: str) -> int:
+    if ruta.endswith(".csv"):
+        if not cargar_csv(inventario, ruta, True, "csv")[0]:
+            raise FileNotFoundError(ruta)
+        return len(inventario)
+    cargado = cargar_snapshot(ruta)
+    if cargado is None:
+        raise FileNotFoundError(ruta)
+    # Se reinsertan las filas para respetar la normalización de nombres de la partición
+    _reemplazar(inventario, list(cargado.filas()))
+    return len(inventario)
+
+
+_TAREAS: Dict[str, Callable] = {
+    "agregar_producto": InventoryStore.agregar_producto,
+    "actualizar_producto": InventoryStore.actualizar_producto,
+    "eliminar_producto": InventoryStore.eliminar_producto,
+    "buscar_producto": InventoryStore.buscar_producto,
+    "contiene": InventoryStore.__contains__,
+    "poner": _poner,
+    "agregar_lote": InventoryStore.agregar_lote,
+    "reemplazar": _reemplazar,
+    "fusionar": _fusionar,
+    "normalizar": InventoryStore.normalizar_nombres,
+    "nombres": lambda inventario: list(inventario),
+    "filas": lambda inventario: list(inventario.filas()),
+    "tamano": InventoryStore.__len__,
+    "resumen": _resumen,
+    "vaciar": InventoryStore.clear,
+    "guardar": _guardar,
+    "cargar": _cargar,
+}
+
+
+def _servir(conexion) -> None:
+    """Bucle del proceso trabajador: ejecuta (tarea, args) sobre su partición hasta recibir None."""
+    inventario = InventoryStore()
+    while True:
+        try:
+            mensaje = conexion.recv()
+        except EOFError:
+            # El proceso padre terminó sin llamar a cerrar()
+            break
+        if mensaje is None:
+            break
+        tarea, args = mensaje
+        try:
+            respuesta = (True, _TAREAS[tarea](inventario, *args))
+        except Exception as e:
+            respuesta = (False, e)
+        conexion.send(respuesta)
+    conexion.close()
+
+
+class _ParticionLocal:
+    """Partición en el mismo proceso (sin paralelismo); misma interfaz que _ParticionProceso."""
+
+    def __init__(self):
+        self._inventario = InventoryStore()
+        self._respuesta: Tuple[bool, object] = (True, None)
+
+    def enviar(self, tarea: str, *args) -> None:
+        try:
+            self._respuesta = (True, _TAREAS[tarea](self._inventario, *args))
+        except Exception as e:
+            self._respuesta = (False, e)
+
+    def recibir(self):
+        ok, valor = self._respuesta
+        if not ok:
+            raise valor
+        return valor
+
+    def cerrar(self) -> None:
+        pass
+
+
+class _ParticionProceso:
+    """Partición en un proceso trabajador, comunicada por un Pipe."""
+
+    def __init__(self, contexto):
+        self._conexion, extremo = contexto.Pipe()
+        self._proceso = contexto.Process(target=_servir, args=(extremo,), daemon=True)
+        self._proceso.start()
+        extremo.close()
+
+    def enviar(self, tarea: str, *args) -> None:
+        self._conexion.send((tarea, args))
+
+    def recibir(self):
+        ok, valor = self._conexion.recv()
+        if not ok:
+            raise valor
+        return valor
+
+    def cerrar(self) -> None:
+        if self._proceso.is_alive():
+            self._conexion.send(None)
+            self._proceso.join()
+        self._conexion.close()
+
+
+class InventarioParticionado(MutableMapping):
+    """Inventario repartido por hash del nombre en particiones independientes."""
+
+    def __init__(self, particiones: int = 4, procesos: bool = True):
+        if particiones < 1:
+            raise ValueError("Se necesita al menos una partición.")
+        if procesos:
+            # Importado aquí: multiprocessing solo se carga cuando hay trabajadores
+            import multiprocessing
+            contexto = multiprocessing.get_context()
+            self._particiones = [_ParticionProceso(contexto) for _ in range(particiones)]
+        else:
+            self._particiones = [_ParticionLocal() for _ in range(particiones)]
+        self._normalizar: Optional[Callable[[str], str]] = None
+        self._plegar_acentos = False
+
+    def cerrar(self) -> None:
+        """Termina los procesos trabajadores (el contenido no persistido se pierde)."""
+        for particion in self._particiones:
+            particion.cerrar()
+
+    def __enter__(self) -> "InventarioParticionado":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    # --- Reparto -------------------------------------------------------------
+
+    @property
+    def particiones(self) -> int:
+        return len(self._particiones)
+
+    def particion_de(self, nombre: str) -> int:
+        return zlib.crc32(self.clave_nombre(nombre).encode("utf-8")) % len(self._particiones)
+
+    def _llamar(self, nombre: str, tarea: str, *args):
+        particion = self._particiones[self.particion_de(nombre)]
+        particion.enviar(tarea, *args)
+        return particion.recibir()
+
+    def _en_todas(self, tarea: str, args_por_particion: Optional[List[tuple]] = None) -> list:
+        """Envía la tarea a todas las particiones antes de esperar respuestas: corren en paralelo."""
+        args_por_particion = args_por_particion or [()] * len(self._particiones)
+        for particion, args in zip(self._particiones, args_por_particion):
+            particion.enviar(tarea, *args)
+        # Se reciben todas las respuestas aunque alguna falle, para no dejar mensajes pendientes
+        resultados, error = [], None
+        for particion in self._particiones:
+            try:
+                resultados.append(particion.recibir())
+            except Exception as e:
+                resultados.append(None)
+                error = error or e
+        if error is not None:
+            raise error
+        return resultados
+
+    def _repartir(self, elementos: Iterable[tuple]) -> List[list]:
+        """Agrupa tuplas cuyo primer campo es el nombre según su partición (conservando el orden)."""
+        grupos: List[list] = [[] for _ in self._particiones]
+        for elemento in elementos:
+            grupos[self.particion_de(elemento[0])].append(elemento)
+        return grupos
+
+    # --- Nombres normalizados -----------------------------------------------
+
+    def normalizar_nombres(self, plegar_acentos: bool = False) -> None:
+        """
+        Como InventoryStore.normalizar_nombres. Cambia la clave de reparto, así que
+        los productos se redistribuyen; lanza ValueError si dos nombres colisionan.
+        """
+        normalizar = partial(normalize_name, fold_accents=plegar_acentos)
+        filas = list(self.filas())
+        vistos: Dict[str, str] = {}
+        for nombre, _, _ in filas:
+            clave = normalizar(nombre)
+            if clave in vistos:
+                raise ValueError(f"'{nombre}' y '{vistos[clave]}' coinciden al normalizar.")
+            vistos[clave] = nombre
+        self._normalizar, self._plegar_acentos = normalizar, plegar_acentos
+        self._en_todas("vaciar")
+        self._en_todas("normalizar", [(plegar_acentos,)] * len(self._particiones))
+        self._en_todas("reemplazar", [(grupo,) for grupo in self._repartir(filas)])
+
+    @property
+    def normaliza_nombres(self) -> bool:
+        return self._normalizar is not None
+
+    @property
+    def plegar_acentos(self) -> bool:
+        return self._normalizar is not None and self._plegar_acentos
+
+    @property
+    def normalizador(self) -> Optional[Callable[[str], str]]:
+        return self._normalizar
+
+    def clave_nombre(self, nombre: str) -> str:
+        return nombre if self._normalizar is None else self._normalizar(nombre)
+
+    # --- Operaciones del servicio -------------------------------------------
+
+    def agregar_producto(self, nombre: str, precio: float, cantidad: int) -> bool:
+        return self._llamar(nombre, "agregar_producto", nombre, precio, cantidad)
+
+    def buscar_producto(self, nombre: str) -> Optional[Product]:
+        return self._llamar(nombre, "buscar_producto", nombre)
+
+    def actualizar_producto(self, nombre: str, nuevo_precio: Optional[float] = None,
+                            nueva_cantidad: Optional[int] = None) -> bool:
+        return self._llamar(nombre, "actualizar_producto", nombre, nuevo_precio, nueva_cantidad)
+
+    def eliminar_producto(self, nombre: str) -> bool:
+        return self._llamar(nombre, "eliminar_producto", nombre)
+
+    def agregar_lote(self, filas: List[Tuple[str, float, int]]) -> None:
+        self._en_todas("agregar_lote", [(grupo,) for grupo in self._repartir(filas)])
+
+    def fusionar_parciales(self, parciales: Iterable[Tuple[str, float, float, int, int]],
+                           politica_precio: str) -> Tuple[int, int]:
+        """Fusión masiva de un CSV (ver cargar_csv): cada partición fusiona su parte en paralelo."""
+        grupos = self._repartir(parciales)
+        resultados = self._en_todas("fusionar", [(grupo, politica_precio) for grupo in grupos])
+        return sum(n for n, _ in resultados), sum(a for _, a in resultados)
+
+    def filas(self) -> Iterator[Tuple[str, float, int]]:
+        """(nombre, precio, cantidad) de todas las particiones, una tras otra."""
+        for filas in self._en_todas("filas"):
+            yield from filas
+
+    def vacio(self) -> InventoryStore:
+        """Inventario local vacío con la misma configuración de nombres, para llenar y luego `intercambiar`."""
+        store = InventoryStore()
+        if self._normalizar is not None:
+            store.normalizar_nombres(self._plegar_acentos)
+        return store
+
+    def intercambiar(self, otro: Dict[str, Product]) -> None:
+        """Reemplaza el contenido por el de `otro` (creado con `vacio()`), un lote por partición."""
+        filas = list(otro.filas()) if hasattr(otro, "filas") else [
+            (p.nombre, p.precio, p.cantidad) for p in otro.values()]
+        self._en_todas("reemplazar", [(grupo,) for grupo in self._repartir(filas)])
+        otro.clear()
+
+    def resumen_estadisticas(self) -> Dict[str, object]:
+        """Map-reduce: sumas y máximos locales de cada partición, combinados aquí."""
+        resultados = self._en_todas("resumen")
+        parciales = [r for r, _ in resultados if r["producto_mas_caro"] is not None]
+        if not parciales:
+            return {
+                "unidades_totales": 0,
+                "valor_total": 0.0,
+                "producto_mas_caro": None,
+                "producto_mayor_stock": None
+            }
+        # max() se queda con el primero entre iguales: gana la partición de menor índice
+        return {
+            "unidades_totales": sum(r["unidades_totales"] for r in parciales),
+            # Se suman los sumandos exactos de cada partición, no sus totales ya redondeados
+            "valor_total": math.fsum(x for _, sumandos in resultados for x in sumandos),
+            "producto_mas_caro": max((r["producto_mas_caro"] for r in parciales), key=lambda p: p[1]),
+            "producto_mayor_stock": max((r["producto_mayor_stock"] for r in parciales), key=lambda p: p[1])
+        }
+
+    # --- Archivos por partición ---------------------------------------------
+
+    def rutas(self, directorio: str, formato: str = "snap") -> List[str]:
+        """Un archivo por partición; el nombre incluye N porque el reparto depende de él."""
+        n = len(self._particiones)
+        return [os.path.join(directorio, f"inventario-{i + 1}-de-{n}.{formato}") for i in range(n)]
+
+    def guardar(self, directorio: str, formato: str = "snap") -> bool:
+        """Cada partición escribe su snapshot ('snap') o CSV ('csv') en paralelo."""
+        os.makedirs(directorio, exist_ok=True)
+        rutas = self.rutas(directorio, formato)
+        return all(self._en_todas("guardar", [(ruta,) for ruta in rutas]))
+
+    def cargar(self, directorio: str, formato: str = "snap") -> int:
+        """
+        Reemplaza el contenido leyendo en paralelo el archivo de cada partición
+        (guardados con el mismo número de particiones). Devuelve los productos cargados.
+        Lanza FileNotFoundError si falta alguno.
+        """
+        rutas = self.rutas(directorio, formato)
+        faltantes = [ruta for ruta in rutas if not os.path.exists(ruta)]
+        if faltantes:
+            raise FileNotFoundError(faltantes[0])
+        return sum(self._en_todas("cargar", [(ruta,) for ruta in rutas]))
+
+    # --- Adaptador MutableMapping[str, Product] -----------------------------
+
+    def __getitem__(self, nombre: str) -> Product:
+        producto = self._llamar(nombre, "buscar_producto", nombre)
+        if producto is None:
+            raise KeyError(nombre)
+        return producto
+
+    def __setitem__(self, nombre: str, producto: Product) -> None:
+        self._llamar(nombre, "poner", nombre, float(producto.precio), int(producto.cantidad))
+
+    def __delitem__(self, nombre: str) -> None:
+        if not self.eliminar_producto(nombre):
+            raise KeyError(nombre)
+
+    def __contains__(self, nombre: object) -> bool:
+        return isinstance(nombre, str) and self._llamar(nombre, "contiene", nombre)
+
+    def __iter__(self) -> Iterator[str]:
+        for nombres in self._en_todas("nombres"):
+            yield from nombres
+
+    def __len__(self) -> int:
+        return sum(self._en_todas("tamano"))
+
+    def values(self) -> List[Product]:
+        # Un viaje por partición en lugar de uno por producto
+        return [Product(*fila) for fila in self.filas()]
+
+    def items(self) -> List[Tuple[str, Product]]:
+        return [(fila[0], Product(*fila)) for fila in self.filas()]
+
+    def clear(self) -> None:
+        self._en_todas("vaciar")
+
+    def __repr__(self) -> str:
+        return f"InventarioParticionado({len(self)} productos, {len(self._particiones)} particiones)"
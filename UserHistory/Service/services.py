@@ -1,8 +1,14 @@
 
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from itertools import islice
 import os
 import csv
+import math
+import sys
+
+from UserHistory.Utils.Decorators import contar, instrumentar
+from UserHistory.Utils.Validator import parse_fixed_decimal
 
 # Determina un directorio base seguro dentro del proyecto
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,8 +17,13 @@ _BASE_INTERNA = os.path.join(_PROJECT_ROOT, "Data")
 # Fallback al HOME si la interna no es escribible
 _HOME_BASE = os.path.join(os.path.expanduser("~"), "UserHistory", "Data")
 
+# Si está definida, se usa este directorio (y solo este) para los datos
+ENV_BASE_DIR = "USERHISTORY_DATA_DIR"
+
 def _seleccionar_base() -> str:
-    for cand in (_BASE_INTERNA, _HOME_BASE):
+    configurada = os.environ.get(ENV_BASE_DIR, "").strip()
+    candidatos = (os.path.abspath(configurada),) if configurada else (_BASE_INTERNA, _HOME_BASE)
+    for cand in candidatos:
         try:
             os.makedirs(cand, exist_ok=True)
             test_path = os.path.join(cand, ".writable.test")
@@ -24,9 +35,42 @@ def _seleccionar_base() -> str:
             continue
     raise RuntimeError("No se encontró un directorio escribible para almacenar datos.")
 
-BASE_DIR = _seleccionar_base()  # Directorio por defecto seguro
+# Se resuelve en el primer uso: importar el módulo no toca el disco
+_base_dir: str | None = None
+# Directorios ya creados por _resolver_ruta (evita un makedirs por cada guardado/carga)
+_directorios_listos: set = set()
+
+def obtener_base_dir() -> str:
+    """Directorio de datos por defecto (seguro y escribible); se busca una sola vez."""
+    global _base_dir
+    if _base_dir is None:
+        _base_dir = _seleccionar_base()
+        _directorios_listos.add(_base_dir)
+    return _base_dir
+
+def __getattr__(nombre: str):
+    # BASE_DIR sigue disponible como atributo del módulo, pero se resuelve recién al leerlo
+    if nombre == "BASE_DIR":
+        return obtener_base_dir()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+# Interfaz de almacenamiento: las funciones de este módulo aceptan cualquier
+# MutableMapping[str, Product] (un dict sirve) y usan, si el inventario los tiene,
+# estos métodos opcionales para delegar el trabajo en el almacenamiento:
+#   agregar_producto / actualizar_producto / eliminar_producto  operación atómica propia
+#   agregar_lote(filas)                     alta masiva de filas ya validadas
+#   fusionar_parciales(parciales, politica) fusión masiva de un CSV (ver cargar_csv)
+#   filas()                                 (nombre, precio, cantidad) sin crear Product
+#   vacio() / intercambiar(otro)            reemplazo atómico del contenido
+#   resumen_estadisticas()                  estadísticas sin recorrer el inventario
+#   indice_busqueda() / indices_ordenados() búsquedas por nombre y consultas ordenadas
+#   clave_nombre(nombre) / normalizador     nombres normalizados
+#   decimales / aplicar_escalados(...)      precios en punto fijo (el CSV se parsea a enteros)
+# Implementaciones: InventoryStore (store.py, en memoria), InventarioSQLite (base_datos.py)
+# e InventarioParticionado (particiones.py, particiones en procesos trabajadores).
 
-@dataclass
+# slots: sin __dict__ por instancia (unos 40 bytes menos por producto en un dict de 1M)
+@dataclass(slots=True)
 class Product:
     nombre: str
     precio: float
@@ -34,47 +78,134 @@ class Product:
     def calcular_subtotal(self) -> float:
         return self.precio * self.cantidad
 
+def precio_valido(precio: float) -> bool:
+    """Precio no negativo y finito: NaN e inf romperían los índices y las sumas del inventario."""
+    return 0 <= precio < math.inf
+
 def _resolver_ruta(archivo: str | None, defecto: str = "inventario.csv") -> str:
     nombre = (archivo or "").strip() or defecto
     # Si el usuario da ruta relativa, se guarda bajo BASE_DIR
     if not os.path.isabs(nombre):
-        nombre = os.path.join(BASE_DIR, nombre)
+        nombre = os.path.join(obtener_base_dir(), nombre)
+    directorio = os.path.dirname(nombre)
+    if directorio in _directorios_listos:
+        return nombre
     # Si es absoluta, se intenta crear su directorio; si falla, se redirige a BASE_DIR
     try:
-        os.makedirs(os.path.dirname(nombre), exist_ok=True)
+        os.makedirs(directorio, exist_ok=True)
+        _directorios_listos.add(directorio)
     except PermissionError:
-        nombre = os.path.join(BASE_DIR, os.path.basename(nombre))
-        os.makedirs(os.path.dirname(nombre), exist_ok=True)
+        nombre = os.path.join(obtener_base_dir(), os.path.basename(nombre))
     return nombre
 
+@instrumentar
 def agregar_producto(inventario: Dict[str, Product], nombre: str, precio: float, cantidad: int) -> bool:
-    if nombre in inventario or precio < 0 or cantidad < 0:
+    # Los inventarios con operación propia (InventoryStore, InventarioConcurrente) la hacen de forma atómica
+    propia = getattr(inventario, "agregar_producto", None)
+    if propia is not None:
+        return propia(nombre, precio, cantidad)
+    if nombre in inventario or not precio_valido(precio) or cantidad < 0:
         return False
     inventario[nombre] = Product(nombre, float(precio), int(cantidad))
     return True
 
-def mostrar_inventario(inventario: Dict[str, Product]) -> None:
+# Criterios de orden para listar el inventario (None = orden de inserción)
+ORDENES = ("nombre", "precio", "cantidad", "subtotal")
+TAM_PAGINA = 20
+_ENCABEZADO = f"{'Nombre':<20}{'Precio':>10}{'Cantidad':>12}{'Subtotal':>12}\n" + "-" * 56 + "\n"
+
+def _formatear_fila(producto: Product) -> str:
+    subtotal = producto.calcular_subtotal()
+    return f"{producto.nombre:<20}{producto.precio:>10.2f}{producto.cantidad:>12d}{subtotal:>12.2f}\n"
+
+@instrumentar
+def nombres_ordenados(inventario: Dict[str, Product], orden: str | None = None,
+                      descendente: bool = False) -> Iterator[str]:
+    """Nombres según `orden`; en un InventoryStore se recorren sus índices ya ordenados."""
+    if orden is None:
+        return iter(inventario)
+    if orden not in ORDENES:
+        raise ValueError(f"Orden desconocido: '{orden}'. Usa uno de {', '.join(ORDENES)}.")
+    if orden == "nombre":
+        indice = getattr(inventario, "indice_busqueda", None)
+        if indice is not None:
+            return indice().nombres(descendente)
+        from UserHistory.Utils.Validator import normalize_name
+        return iter(sorted(inventario, key=lambda n: normalize_name(n, fold_accents=True), reverse=descendente))
+    return _indices_ordenados(inventario).nombres(orden, descendente)
+
+@instrumentar
+def paginas_inventario(inventario: Dict[str, Product], tam_pagina: int = TAM_PAGINA,
+                       orden: str | None = None, descendente: bool = False) -> Iterator[str]:
+    """Páginas de texto con encabezado; cada una se formatea recién cuando se pide."""
+    nombres = nombres_ordenados(inventario, orden, descendente)
+    while True:
+        pagina = list(islice(nombres, tam_pagina))
+        if not pagina:
+            return
+        yield _ENCABEZADO + "".join(_formatear_fila(inventario[nombre]) for nombre in pagina)
+
+@instrumentar
+def mostrar_inventario(inventario: Dict[str, Product], orden: str | None = None,
+                       descendente: bool = False) -> None:
     if not inventario:
         print("Inventario vacío.")
         return
-    print(f"{'Nombre':<20}{'Precio':>10}{'Cantidad':>12}{'Subtotal':>12}")
-    print("-" * 56)
-    for producto in inventario.values():
-        subtotal = producto.calcular_subtotal()
-        print(f"{producto.nombre:<20}{producto.precio:>10.2f}{producto.cantidad:>12d}{subtotal:>12.2f}")
+    # Una sola escritura en vez de un print (y una llamada al sistema) por producto
+    filas = (_formatear_fila(inventario[nombre]) for nombre in nombres_ordenados(inventario, orden, descendente))
+    sys.stdout.write(_ENCABEZADO + "".join(filas))
 
+@instrumentar
 def buscar_producto(inventario: Dict[str, Product], nombre: str) -> Optional[Product]:
     return inventario.get(nombre)
 
+@instrumentar
+def buscar_similares(inventario: Dict[str, Product], consulta: str, k: int = 5) -> List[Tuple[str, float]]:
+    """Hasta k (nombre, puntaje) parecidos a `consulta`: exacto, por prefijo o con errores de tipeo."""
+    indice = getattr(inventario, "indice_busqueda", None)
+    if indice is not None:
+        return indice().buscar(consulta, k)
+    # Inventarios sin índice propio: se indexa al vuelo (O(n) por consulta)
+    from UserHistory.Service.busqueda import IndiceBusqueda
+    return IndiceBusqueda(inventario).buscar(consulta, k)
+
+def _indices_ordenados(inventario: Dict[str, Product]):
+    indices = getattr(inventario, "indices_ordenados", None)
+    if indices is not None:
+        return indices()
+    # Inventarios sin índices propios: se ordenan al vuelo (O(n log n) por consulta)
+    from UserHistory.Service.indices import IndicesOrdenados
+    return IndicesOrdenados((p.nombre, p.precio, p.cantidad, seq) for seq, p in enumerate(inventario.values()))
+
+@instrumentar
+def productos_en_rango(inventario: Dict[str, Product], campo: str, minimo: float | None = None,
+                       maximo: float | None = None, k: int | None = None) -> List[Tuple[str, float]]:
+    """Hasta k (nombre, valor) con `campo` ('precio', 'cantidad' o 'subtotal') entre minimo y maximo."""
+    return _indices_ordenados(inventario).rango(campo, minimo, maximo, k)
+
+@instrumentar
+def top_productos(inventario: Dict[str, Product], campo: str, k: int = 10) -> List[Tuple[str, float]]:
+    """Los k (nombre, valor) con mayor `campo`, de mayor a menor."""
+    return _indices_ordenados(inventario).top(campo, k)
+
+@instrumentar
+def percentil_productos(inventario: Dict[str, Product], campo: str, p: float) -> Optional[Tuple[str, float]]:
+    """(nombre, valor) en el percentil p de `campo`, o None si el inventario está vacío."""
+    return _indices_ordenados(inventario).percentil(campo, p)
+
+@instrumentar
 def actualizar_producto(inventario: Dict[str, Product], nombre: str,
                         nuevo_precio: Optional[float] = None,
                         nueva_cantidad: Optional[int] = None) -> bool:
+    propia = getattr(inventario, "actualizar_producto", None)
+    if propia is not None:
+        return propia(nombre, nuevo_precio, nueva_cantidad)
     producto = buscar_producto(inventario, nombre)
     if not producto:
         return False
     actualizado = False
     if nuevo_precio is not None:
-        if nuevo_precio < 0:
+        if not precio_valido(nuevo_precio):
             return False
         producto.precio = float(nuevo_precio)
         actualizado = True
@@ -83,15 +214,115 @@ def actualizar_producto(inventario: Dict[str, Product], nombre: str,
             return False
         producto.cantidad = int(nueva_cantidad)
         actualizado = True
+    # Reescribe el producto: necesario cuando el inventario devuelve copias (InventoryStore)
+    inventario[nombre] = producto
     return actualizado
 
+@instrumentar
 def eliminar_producto(inventario: Dict[str, Product], nombre: str) -> bool:
+    propia = getattr(inventario, "eliminar_producto", None)
+    if propia is not None:
+        return propia(nombre)
     if nombre in inventario:
         del inventario[nombre]
         return True
     return False
 
+# Un lote es un iterable de filas o un dict de columnas {'nombre': [...], 'precio': [...], ...}
+Lote = Iterable[tuple] | Mapping[str, Sequence]
+
+
+def _filas_lote(lote: Lote, campos: Tuple[str, ...]) -> List[tuple]:
+    if isinstance(lote, Mapping):
+        return list(zip(*(lote[c] for c in campos)))
+    return list(lote)
+
+
+@instrumentar
+def agregar_productos(inventario: Dict[str, Product], lote: Lote,
+                      atomico: bool = False) -> Tuple[bool, List[bool]]:
+    """
+    Agrega muchos productos validando el lote completo en una sola pasada.
+    Devuelve (aplicado, resultado por fila). Con atomico=True no se aplica nada
+    si alguna fila es inválida; el vector indica entonces qué filas eran válidas.
+    """
+    filas = _filas_lote(lote, ('nombre', 'precio', 'cantidad'))
+    # Los repetidos dentro del lote se detectan con la misma clave que usa el inventario
+    clave = getattr(inventario, "clave_nombre", str)
+    vistos = set()
+    resultados = [
+        not (nombre in inventario or clave(nombre) in vistos or not precio_valido(precio) or cantidad < 0
+             or vistos.add(clave(nombre)))
+        for nombre, precio, cantidad in filas
+    ]
+    if atomico and not all(resultados):
+        return False, resultados
+    agregar_lote = getattr(inventario, "agregar_lote", None)
+    if agregar_lote is not None:
+        agregar_lote([(nombre, float(precio), int(cantidad))
+                      for ok, (nombre, precio, cantidad) in zip(resultados, filas) if ok])
+    else:
+        inventario.update({nombre: Product(nombre, float(precio), int(cantidad))
+                           for ok, (nombre, precio, cantidad) in zip(resultados, filas) if ok})
+    return True, resultados
+
+
+@instrumentar
+def actualizar_productos(inventario: Dict[str, Product], lote: Lote,
+                         atomico: bool = False) -> Tuple[bool, List[bool]]:
+    """
+    Actualiza muchos productos: filas (nombre, nuevo_precio|None, nueva_cantidad|None).
+    Cada fila sigue las reglas de actualizar_producto, pero se valida antes de tocar nada.
+    """
+    filas = _filas_lote(lote, ('nombre', 'precio', 'cantidad'))
+    resultados = [
+        nombre in inventario and (precio is not None or cantidad is not None)
+        and (precio is None or precio_valido(precio)) and (cantidad is None or cantidad >= 0)
+        for nombre, precio, cantidad in filas
+    ]
+    if atomico and not all(resultados):
+        return False, resultados
+    # Un InventoryStore actualiza sus columnas sin crear Product intermedios
+    actualizar = getattr(inventario, "actualizar_producto", None)
+    for ok, (nombre, precio, cantidad) in zip(resultados, filas):
+        if not ok:
+            continue
+        if actualizar is not None:
+            actualizar(nombre, precio, cantidad)
+            continue
+        producto = inventario[nombre]
+        if precio is not None:
+            producto.precio = float(precio)
+        if cantidad is not None:
+            producto.cantidad = int(cantidad)
+        inventario[nombre] = producto
+    return True, resultados
+
+
+@instrumentar
+def eliminar_productos(inventario: Dict[str, Product], nombres: Iterable[str],
+                       atomico: bool = False) -> Tuple[bool, List[bool]]:
+    """Elimina muchos productos. Un nombre repetido en el lote solo se elimina una vez."""
+    nombres = list(nombres)
+    clave = getattr(inventario, "clave_nombre", str)
+    vistos = set()
+    resultados = [nombre in inventario and not (clave(nombre) in vistos or vistos.add(clave(nombre)))
+                  for nombre in nombres]
+    if atomico and not all(resultados):
+        return False, resultados
+    eliminar = getattr(inventario, "eliminar_producto", None) or inventario.__delitem__
+    for ok, nombre in zip(resultados, nombres):
+        if ok:
+            eliminar(nombre)
+    return True, resultados
+
+
+@instrumentar
 def calcular_estadisticas(inventario: Dict[str, Product]) -> Dict[str, object]:
+    # Los inventarios que mantienen sus estadísticas (InventoryStore) responden sin recorrerse
+    resumen = getattr(inventario, "resumen_estadisticas", None)
+    if resumen is not None:
+        return resumen()
     if not inventario:
         return {
             "unidades_totales": 0,
@@ -101,6 +332,7 @@ def calcular_estadisticas(inventario: Dict[str, Product]) -> Dict[str, object]:
         }
     productos = list(inventario.values())
     unidades_totales = sum(p.cantidad for p in productos)
+    # Suma float de siempre; los inventarios con resumen_estadisticas dan la suma exacta (math.fsum)
     valor_total = sum(p.calcular_subtotal() for p in productos)
     mas_caro = max(productos, key=lambda p: p.precio)
     mayor_stock = max(productos, key=lambda p: p.cantidad)
@@ -111,50 +343,146 @@ def calcular_estadisticas(inventario: Dict[str, Product]) -> Dict[str, object]:
         "producto_mayor_stock": (mayor_stock.nombre, mayor_stock.cantidad)
     }
 
+@instrumentar
 def guardar_csv(inventario: Dict[str, Product], archivo: str | None = None) -> bool:
     ruta = _resolver_ruta(archivo)
     try:
         with open(ruta, mode='w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(['nombre', 'precio', 'cantidad'])
-            for p in inventario.values():
-                writer.writerow([p.nombre, p.precio, p.cantidad])
+            filas = getattr(inventario, "filas", None)
+            if filas is not None:
+                writer.writerows(filas())
+            else:
+                for p in inventario.values():
+                    writer.writerow([p.nombre, p.precio, p.cantidad])
+        contar("csv_bytes_escritos", os.path.getsize(ruta))
         return True
     except IOError:
         return False
 
+# Filas procesadas por lote en la carga en streaming
+TAM_LOTE_CSV = 8192
+
+# Fila ya validada: (nombre, precio, cantidad)
+FilaCSV = Tuple[str, float, int]
+# progreso(filas_leidas, bytes_leidos, bytes_totales)
+Progreso = Callable[[int, int, int], None]
+
+
+def _indices_encabezado(encabezado: List[str]) -> Tuple[int, int, int]:
+    # Como DictReader: si una columna se repite gana la última; si falta, todas las filas fallan
+    posiciones = {campo: i for i, campo in enumerate(encabezado)}
+    return tuple(posiciones.get(c, -1) for c in ('nombre', 'precio', 'cantidad'))
+
+
+def _leer_lotes(reader: Iterator[List[str]], tam_lote: int) -> Iterator[List[List[str]]]:
+    """Parseo: agrupa las filas del lector en listas de `tam_lote` filas (sin dict por fila)."""
+    while True:
+        lote = list(islice(reader, tam_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def _validar_fila(fila: List[str], i_nombre: int, i_precio: int, i_cantidad: int,
+                  decimales: int | None = None) -> Optional[FilaCSV]:
+    # Con decimales el precio se devuelve como entero en punto fijo, leído del texto sin pasar por float
+    try:
+        if i_nombre < 0 or i_precio < 0 or i_cantidad < 0:
+            return None
+        nombre = fila[i_nombre].strip()
+        if decimales is None:
+            precio = float(fila[i_precio])
+        else:
+            # Misma gramática que float(), así ambos modos aceptan y rechazan las mismas filas
+            precio = parse_fixed_decimal(fila[i_precio], decimales)
+        cantidad = int(fila[i_cantidad])
+    except (IndexError, ValueError):
+        return None
+    if not nombre or not precio_valido(precio) or cantidad < 0:
+        return None
+    return nombre, precio, cantidad
+
+
+def _validar_lotes(encabezado: List[str], lotes: Iterator[List[List[str]]],
+                   decimales: int | None = None) -> Iterator[Tuple[List[Optional[FilaCSV]], int]]:
+    """Validación: cada lote se convierte en tuplas (o None si la fila es inválida)."""
+    i_nombre, i_precio, i_cantidad = _indices_encabezado(encabezado)
+    for lote in lotes:
+        # Las líneas vacías se ignoran, igual que en csv.DictReader
+        yield [_validar_fila(fila, i_nombre, i_precio, i_cantidad, decimales) for fila in lote if fila], len(lote)
+
+
+@instrumentar
 def cargar_csv(inventario: Dict[str, Product], archivo: str | None,
-               reemplazar: bool, politica_precio: str) -> Tuple[bool, int, int, int]:
+               reemplazar: bool, politica_precio: str,
+               progreso: Optional[Progreso] = None,
+               tam_lote: int = TAM_LOTE_CSV) -> Tuple[bool, int, int, int]:
     ruta = _resolver_ruta(archivo)
     nuevos = actualizados = errores = 0
-    inventario_temporal: Dict[str, Product] = {}
+    # En reemplazo se llena un inventario nuevo y se intercambia al final (atómico ante errores de E/S).
+    # Un InventoryStore se llena como columnas compactas, con menor pico que un dict de Product.
+    intercambiar = getattr(inventario, "intercambiar", None)
+    destino: Dict[str, Product] = inventario.vacio() if intercambiar else {}
+    # En fusión, un almacenamiento con fusionar_parciales (InventarioSQLite) recibe cada lote entero;
+    # cada fila válida es un parcial (nombre, primer_precio, ultimo_precio, cantidad, apariciones)
+    fusionar = None if reemplazar else getattr(inventario, "fusionar_parciales", None)
+    # Con precios en punto fijo (InventoryStore con decimales) las filas llevan el precio como
+    # entero escalado y el almacenamiento las guarda sin convertirlas
+    decimales = getattr(inventario, "decimales", None)
+    escalados = None if decimales is None else (destino if reemplazar else inventario).aplicar_escalados
     try:
-        with open(ruta, mode='r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    nombre = row['nombre'].strip()
-                    precio = float(row['precio'])
-                    cantidad = int(row['cantidad'])
-                    if not nombre or precio < 0 or cantidad < 0:
-                        raise ValueError()
-                    if reemplazar:
-                        inventario_temporal[nombre] = Product(nombre, precio, cantidad)
-                        nuevos += 1
-                    else:
-                        if nombre in inventario:
-                            inventario[nombre].cantidad += cantidad
+        total = os.path.getsize(ruta)
+        with open(ruta, mode='r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            # Como DictReader, las líneas vacías previas al encabezado se saltan
+            encabezado = next((fila for fila in reader if fila), [])
+            leidas = 0
+            for filas, crudas in _validar_lotes(encabezado, _leer_lotes(reader, tam_lote), decimales):
+                if escalados is not None:
+                    validas = [fila for fila in filas if fila is not None]
+                    errores += len(filas) - len(validas)
+                    n, a = escalados(validas, reemplazar, politica_precio)
+                    nuevos += n
+                    actualizados += a
+                elif fusionar is not None:
+                    parciales = [(n, p, p, c, 1) for n, p, c in filter(None, filas)]
+                    errores += len(filas) - len(parciales)
+                    n, a = fusionar(parciales, politica_precio)
+                    nuevos += n
+                    actualizados += a
+                else:
+                    for fila in filas:
+                        if fila is None:
+                            errores += 1
+                            continue
+                        nombre, precio, cantidad = fila
+                        if reemplazar:
+                            destino[nombre] = Product(nombre, precio, cantidad)
+                            nuevos += 1
+                        elif nombre in inventario:
+                            existente = inventario[nombre]
+                            existente.cantidad += cantidad
                             if politica_precio == 'csv':
-                                inventario[nombre].precio = precio
+                                existente.precio = precio
+                            inventario[nombre] = existente
                             actualizados += 1
                         else:
                             inventario[nombre] = Product(nombre, precio, cantidad)
                             nuevos += 1
-                except Exception:
-                    errores += 1
+                leidas += crudas
+                if progreso is not None:
+                    progreso(leidas, f.buffer.tell(), total)
         if reemplazar:
-            inventario.clear()
-            inventario.update(inventario_temporal)
+            if intercambiar:
+                intercambiar(destino)
+            else:
+                inventario.clear()
+                inventario.update(destino)
+        contar("csv_bytes_leidos", total)
+        contar("csv_filas_leidas", nuevos + actualizados + errores)
+        contar("csv_filas_rechazadas", errores)
         return True, nuevos, actualizados, errores
     except FileNotFoundError:
         return False, 0, 0, 0
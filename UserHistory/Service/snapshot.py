@@ -0,0 +1,260 @@
+"""
+Archivo: `snapshot.py`
+
+Formato binario versionado para guardar y abrir el inventario sin parsear texto.
+
+Estructura (little-endian, secciones alineadas a 8 bytes):
+- encabezado: magia, versión, configuración del inventario (decimales del
+  punto fijo y modo de nombres), nº de productos, estadísticas precalculadas,
+  (offset, longitud, crc32) de cada sección y crc32 del propio encabezado
+- precios:    n x float64
+- cantidades: n x int64
+- offsets:    (n + 1) x uint64 dentro de la tabla de nombres
+- nombres:    tabla de cadenas UTF-8 concatenadas
+- orden:      n x uint64, filas ordenadas por nombre (búsqueda binaria)
+
+`SnapshotInventario` abre el archivo con mmap y resuelve búsquedas y
+estadísticas directamente sobre el mapeo; `cargar_snapshot` lo materializa
+en un InventoryStore copiando columnas completas, con los mismos decimales y
+modo de nombres que tenía el inventario guardado. Los archivos de la versión 1
+(sin configuración) se siguen abriendo como float y nombres exactos. El CSV sigue siendo el
+formato de importación/exportación.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
+
+from UserHistory.Service.services import Product, _resolver_ruta, calcular_estadisticas
+from UserHistory.Service.store import InventoryStore
+
+MAGIA = b"UHSNAP\x00\x00"
+VERSION = 2
+VERSIONES_LEGIBLES = (1, 2)
+_SECCIONES = ("precios", "cantidades", "offsets", "nombres", "orden")
+# magia, versión, decimales (-1 = float), modo de nombres, n, unidades, valor_total,
+# fila_mas_caro, fila_mayor_stock; en la versión 1 decimales y modo eran relleno a cero
+_CABECERA = struct.Struct("<8sIhBxQqdqq")
+# Modo de nombres en el encabezado; mismos nombres que guarda base_datos en `meta`
+MODOS_NOMBRES = ("exactos", "normalizados", "sin_acentos")
+_SECCION = struct.Struct("<QQI4x")
+_CRC = struct.Struct("<I4x")
+TAM_ENCABEZADO = _CABECERA.size + _SECCION.size * len(_SECCIONES) + _CRC.size
+
+
+class SnapshotInvalido(ValueError):
+    """El archivo no es un snapshot válido o está corrupto."""
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def guardar_snapshot(inventario: Dict[str, Product], archivo: str | None = None) -> bool:
+    ruta = _resolver_ruta(archivo, "inventario.snap")
+    filas = inventario.filas() if hasattr(inventario, "filas") else (
+        (p.nombre, p.precio, p.cantidad) for p in inventario.values())
+    precios = array('d')
+    cantidades = array('q')
+    offsets = array('Q', [0])
+    nombres = bytearray()
+    claves = []
+    fila_de: Dict[str, int] = {}
+    for nombre, precio, cantidad in filas:
+        codificado = nombre.encode("utf-8")
+        fila_de[nombre] = len(precios)
+        claves.append(codificado)
+        precios.append(precio)
+        cantidades.append(cantidad)
+        nombres += codificado
+        offsets.append(len(nombres))
+    orden = array('Q', sorted(range(len(claves)), key=claves.__getitem__))
+
+    stats = calcular_estadisticas(inventario)
+    mas_caro = fila_de[stats["producto_mas_caro"][0]] if stats["producto_mas_caro"] else -1
+    mayor_stock = fila_de[stats["producto_mayor_stock"][0]] if stats["producto_mayor_stock"] else -1
+
+    secciones = [precios.tobytes(), cantidades.tobytes(), offsets.tobytes(), bytes(nombres), orden.tobytes()]
+    decimales = getattr(inventario, "decimales", None)
+    modo = 0
+    if getattr(inventario, "normaliza_nombres", False):
+        modo = 2 if getattr(inventario, "plegar_acentos", False) else 1
+    cabecera = bytearray(_CABECERA.pack(MAGIA, VERSION, -1 if decimales is None else decimales, modo,
+                                        len(precios), stats["unidades_totales"], stats["valor_total"],
+                                        mas_caro, mayor_stock))
+    posicion = TAM_ENCABEZADO
+    for datos in secciones:
+        cabecera += _SECCION.pack(posicion, len(datos), zlib.crc32(datos))
+        posicion = _alinear(posicion + len(datos))
+    cabecera += _CRC.pack(zlib.crc32(cabecera))
+
+    temporal = ruta + ".tmp"
+    try:
+        with open(temporal, "wb") as f:
+            f.write(cabecera)
+            for datos in secciones:
+                f.write(datos)
+                f.write(b"\x00" * (_alinear(len(datos)) - len(datos)))
+            f.flush()
+            os.fsync(f.fileno())
+        # Reemplazo atómico: nunca queda un snapshot a medio escribir
+        os.replace(temporal, ruta)
+        return True
+    except IOError:
+        return False
+
+
+class SnapshotInventario(Mapping):
+    """
+    Vista de solo lectura sobre un snapshot mapeado en memoria. Las búsquedas usan
+    el nombre exacto; `decimales` y `modo_nombres` son la configuración guardada.
+    """
+
+    def __init__(self, ruta: str, verificar: bool = True):
+        self._vistas: list = []
+        with open(ruta, "rb") as f:
+            if os.fstat(f.fileno()).st_size < TAM_ENCABEZADO:
+                raise SnapshotInvalido("Archivo truncado.")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._abrir(verificar)
+        except Exception:
+            self.cerrar()
+            raise
+
+    def _abrir(self, verificar: bool) -> None:
+        mm = self._mm
+        (magia, version, decimales, modo, self._n, self._unidades, self._valor_total,
+         self._mas_caro, self._mayor_stock) = _CABECERA.unpack_from(mm, 0)
+        if magia != MAGIA:
+            raise SnapshotInvalido("No es un snapshot de inventario.")
+        if version not in VERSIONES_LEGIBLES:
+            raise SnapshotInvalido(f"Versión de snapshot no soportada: {version}.")
+        if version == 1:
+            decimales, modo = -1, 0
+        if modo >= len(MODOS_NOMBRES):
+            raise SnapshotInvalido(f"Modo de nombres desconocido: {modo}.")
+        self.decimales: Optional[int] = None if decimales < 0 else decimales
+        self.modo_nombres = MODOS_NOMBRES[modo]
+        (crc,) = _CRC.unpack_from(mm, TAM_ENCABEZADO - _CRC.size)
+        if zlib.crc32(mm[:TAM_ENCABEZADO - _CRC.size]) != crc:
+            raise SnapshotInvalido("Encabezado corrupto.")
+        vista = self._registrar(memoryview(mm))
+        self._secciones = {}
+        for i, nombre in enumerate(_SECCIONES):
+            offset, longitud, crc = _SECCION.unpack_from(mm, _CABECERA.size + i * _SECCION.size)
+            if offset + longitud > len(mm):
+                raise SnapshotInvalido(f"Sección '{nombre}' fuera del archivo.")
+            datos = self._registrar(vista[offset:offset + longitud])
+            if verificar and zlib.crc32(datos) != crc:
+                raise SnapshotInvalido(f"Sección '{nombre}' corrupta.")
+            self._secciones[nombre] = datos
+        self._precios = self._registrar(self._secciones["precios"].cast('d'))
+        self._cantidades = self._registrar(self._secciones["cantidades"].cast('q'))
+        self._offsets = self._registrar(self._secciones["offsets"].cast('Q'))
+        self._orden = self._registrar(self._secciones["orden"].cast('Q'))
+        self._nombres = self._secciones["nombres"]
+
+    def _registrar(self, vista: memoryview) -> memoryview:
+        # Las vistas exportadas del mmap deben liberarse antes de cerrarlo
+        self._vistas.append(vista)
+        return vista
+
+    # --- Acceso sin deserializar ----------------------------------------------
+
+    def _nombre_bytes(self, fila: int) -> bytes:
+        return bytes(self._nombres[self._offsets[fila]:self._offsets[fila + 1]])
+
+    def _nombre(self, fila: int) -> str:
+        return self._nombre_bytes(fila).decode("utf-8")
+
+    def _buscar_fila(self, nombre: str) -> Optional[int]:
+        clave = nombre.encode("utf-8")
+        bajo, alto = 0, self._n
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._nombre_bytes(self._orden[medio]) < clave:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < self._n and self._nombre_bytes(self._orden[bajo]) == clave:
+            return self._orden[bajo]
+        return None
+
+    def resumen_estadisticas(self) -> Dict[str, object]:
+        """Estadísticas precalculadas al escribir el snapshot."""
+        return {
+            "unidades_totales": self._unidades,
+            "valor_total": self._valor_total,
+            "producto_mas_caro": (self._nombre(self._mas_caro), self._precios[self._mas_caro])
+            if self._mas_caro >= 0 else None,
+            "producto_mayor_stock": (self._nombre(self._mayor_stock), self._cantidades[self._mayor_stock])
+            if self._mayor_stock >= 0 else None
+        }
+
+    def filas(self) -> Iterator[Tuple[str, float, int]]:
+        for fila in range(self._n):
+            yield self._nombre(fila), self._precios[fila], self._cantidades[fila]
+
+    def a_store(self) -> InventoryStore:
+        """Materializa el snapshot copiando las columnas numéricas de golpe."""
+        tabla = bytes(self._nombres)
+        offsets = self._offsets
+        nombres = [tabla[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self._n)]
+        precios = array('d')
+        precios.frombytes(self._secciones["precios"])
+        cantidades = array('q')
+        cantidades.frombytes(self._secciones["cantidades"])
+        store = InventoryStore.desde_columnas(nombres, precios, cantidades)
+        if self.modo_nombres != "exactos":
+            store.normalizar_nombres(self.modo_nombres == "sin_acentos")
+        if self.decimales is not None:
+            store.fijar_decimales(self.decimales)
+        return store
+
+    # --- Mapping[str, Product] ----------------------------------------------
+
+    def __getitem__(self, nombre: str) -> Product:
+        fila = self._buscar_fila(nombre)
+        if fila is None:
+            raise KeyError(nombre)
+        return Product(nombre, self._precios[fila], self._cantidades[fila])
+
+    def __contains__(self, nombre: object) -> bool:
+        return isinstance(nombre, str) and self._buscar_fila(nombre) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._nombre(fila) for fila in range(self._n))
+
+    def __len__(self) -> int:
+        return self._n
+
+    def cerrar(self) -> None:
+        for vista in reversed(self._vistas):
+            vista.release()
+        self._vistas = []
+        self._mm.close()
+
+    def __enter__(self) -> "SnapshotInventario":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+
+def abrir_snapshot(archivo: str | None = None, verificar: bool = True) -> SnapshotInventario:
+    return SnapshotInventario(_resolver_ruta(archivo, "inventario.snap"), verificar)
+
+
+def cargar_snapshot(archivo: str | None = None) -> Optional[InventoryStore]:
+    """Carga un snapshot completo en un InventoryStore. None si no existe o es inválido."""
+    try:
+        with abrir_snapshot(archivo) as snapshot:
+            return snapshot.a_store()
+    except (OSError, ValueError):
+        # ValueError incluye SnapshotInvalido
+        return None
@@ -0,0 +1,546 @@
+"""
+Archivo: `store.py`
+
+Inventario columnar respaldado por arrays tipados:
+- nombre   -> list[str] (None marca una fila borrada / tombstone)
+- precio   -> array('d'), o array('q') de enteros escalados en punto fijo
+  (`fijar_decimales`): sumas exactas y sin deriva de coma flotante
+- cantidad -> array('q')
+- secuencia de inserción -> array('q')
+- índice clave -> fila en un dict (la clave es el nombre, o el nombre
+  normalizado si se activa `normalizar_nombres`)
+
+Expone las mismas operaciones que el módulo de servicios (agregar_producto,
+buscar_producto, actualizar_producto, eliminar_producto) y además implementa
+la interfaz de MutableMapping[str, Product], de modo que las funciones de
+`services.py` y `app.py` que esperan un Dict[str, Product] siguen funcionando
+sin cambios.
+
+Con `vistas=True` el adaptador devuelve ProductoVista en lugar de copias:
+objetos de dos referencias que leen y escriben directamente en las columnas.
+
+Los observadores suscritos (estadísticas, índices, journal...) reciben cada
+alta, modificación, baja y vaciado mediante los métodos al_agregar,
+al_modificar, al_eliminar y al_limpiar.
+"""
+
+import math
+from array import array
+from collections.abc import MutableMapping
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from UserHistory.Service.busqueda import IndiceBusqueda
+from UserHistory.Service.estadisticas import EstadisticasIncrementales
+from UserHistory.Service.indices import IndicesOrdenados
+from UserHistory.Service.services import Product, precio_valido
+from UserHistory.Utils.Validator import normalize_name
+
+# Se compacta cuando las filas borradas superan este mínimo y además
+# son más de la mitad de las filas ocupadas.
+_MIN_BORRADOS_COMPACTAR = 1024
+
+
+class _ColumnaFija:
+    """
+    Columna de precios en punto fijo: enteros escalados por 10**decimales en un array('q').
+    Se lee y escribe en float como el array('d') al que reemplaza; `enteros` da el valor exacto.
+    """
+    __slots__ = ("decimales", "escala", "enteros")
+
+    def __init__(self, decimales: int, enteros: Optional[array] = None):
+        self.decimales = decimales
+        self.escala = 10 ** decimales
+        self.enteros = enteros if enteros is not None else array('q')
+
+    def __len__(self) -> int:
+        return len(self.enteros)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            escala = self.escala
+            return array('d', [e / escala for e in self.enteros[i]])
+        return self.enteros[i] / self.escala
+
+    def __setitem__(self, i: int, precio: float) -> None:
+        self.enteros[i] = round(precio * self.escala)
+
+    def append(self, precio: float) -> None:
+        self.enteros.append(round(precio * self.escala))
+
+    def extend(self, precios: Iterable[float]) -> None:
+        escala = self.escala
+        self.enteros.extend(round(precio * escala) for precio in precios)
+
+
+class ProductoVista:
+    """
+    Product sin valores propios: lee y escribe la fila del producto en el InventoryStore.
+    La fila se resuelve por clave en cada acceso, así que sobrevive a la compactación;
+    si el producto se elimina, acceder a la vista lanza KeyError.
+    No hereda de Product para no cargar sus tres slots sin usar; ofrece la misma interfaz.
+    """
+    __slots__ = ("_store", "_clave")
+
+    def __init__(self, store: "InventoryStore", clave: str):
+        self._store = store
+        self._clave = clave
+
+    def _fila(self) -> int:
+        return self._store._filas[self._clave]
+
+    @property
+    def nombre(self) -> str:
+        return self._store._nombres[self._fila()]
+
+    @property
+    def precio(self) -> float:
+        return self._store._precios[self._fila()]
+
+    @precio.setter
+    def precio(self, valor: float) -> None:
+        if not math.isfinite(valor):
+            raise ValueError(f"Precio no finito para '{self.nombre}'.")
+        fila = self._fila()
+        self._store._escribir(fila, float(valor), self._store._cantidades[fila])
+
+    @property
+    def cantidad(self) -> int:
+        return self._store._cantidades[self._fila()]
+
+    @cantidad.setter
+    def cantidad(self, valor: int) -> None:
+        fila = self._fila()
+        self._store._escribir(fila, self._store._precios[fila], int(valor))
+
+    def calcular_subtotal(self) -> float:
+        fila = self._fila()
+        return self._store._precios[fila] * self._store._cantidades[fila]
+
+    def __eq__(self, otro: object) -> bool:
+        if not isinstance(otro, (Product, ProductoVista)):
+            return NotImplemented
+        return (self.nombre, self.precio, self.cantidad) == (otro.nombre, otro.precio, otro.cantidad)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ProductoVista(nombre={self.nombre!r}, precio={self.precio!r}, cantidad={self.cantidad!r})"
+
+
+class InventoryStore(MutableMapping):
+    """Inventario en columnas contiguas con índice nombre -> fila."""
+
+    def __init__(self, productos: Iterable[Tuple[str, float, int]] = (), vistas: bool = False,
+                 decimales: Optional[int] = None):
+        self._vistas = vistas
+        self._decimales = decimales
+        self._nombres: List[Optional[str]] = []
+        self._precios = self._columna_precios()
+        self._cantidades = array('q')
+        self._secuencias = array('q')
+        self._siguiente_seq = 0
+        self._filas: dict[str, int] = {}
+        self._borrados = 0
+        self._observadores: list = []
+        self._estadisticas: Optional[EstadisticasIncrementales] = None
+        self._busqueda: Optional[IndiceBusqueda] = None
+        self._indices: Optional[IndicesOrdenados] = None
+        self._normalizar: Optional[Callable[[str], str]] = None
+        self._plegar_acentos = False
+        for nombre, precio, cantidad in productos:
+            self[nombre] = Product(nombre, precio, cantidad)
+
+    @classmethod
+    def desde_columnas(cls, nombres: List[Optional[str]], precios: array, cantidades: array) -> "InventoryStore":
+        """Construye el inventario adoptando columnas ya armadas (snapshot o `columnas()`)."""
+        store = cls()
+        store._nombres = list(nombres)
+        store._precios = precios
+        store._cantidades = cantidades
+        store._secuencias = array('q', range(len(store._nombres)))
+        store._siguiente_seq = len(store._nombres)
+        store._filas = {nombre: fila for fila, nombre in enumerate(store._nombres) if nombre is not None}
+        vivos = len(store._nombres) - store._nombres.count(None)
+        if len(store._filas) != vivos:
+            raise ValueError("Nombres de producto duplicados.")
+        store._borrados = len(store._nombres) - vivos
+        store.compactar()
+        return store
+
+    def copia(self) -> "InventoryStore":
+        """Copia independiente (sin observadores) con la misma configuración de nombres."""
+        copia = InventoryStore.desde_columnas(*self.columnas())
+        copia._normalizar, copia._plegar_acentos = self._normalizar, self._plegar_acentos
+        copia._vistas = self._vistas
+        if self._normalizar is not None:
+            copia._filas = {copia._clave_guardada(n): f for n, f in copia._filas.items()}
+        if self._decimales is not None:
+            copia.fijar_decimales(self._decimales)
+        return copia
+
+    def vacio(self) -> "InventoryStore":
+        """Inventario vacío con la misma configuración de nombres."""
+        store = type(self)(vistas=self._vistas, decimales=self._decimales)
+        store._normalizar, store._plegar_acentos = self._normalizar, self._plegar_acentos
+        return store
+
+    # --- Nombres normalizados -----------------------------------------------
+
+    def normalizar_nombres(self, plegar_acentos: bool = False) -> None:
+        """
+        Indexa por nombre normalizado (sin espacios sobrantes, sin mayúsculas y,
+        opcionalmente, sin acentos): 'Papa', ' papa ' y 'PAPA' pasan a ser el mismo
+        producto. Lanza ValueError si dos productos existentes colisionan.
+        """
+        normalizar = partial(normalize_name, fold_accents=plegar_acentos)
+        filas: dict[str, int] = {}
+        for fila, nombre in enumerate(self._nombres):
+            if nombre is None:
+                continue
+            clave = normalizar(nombre)
+            if clave == nombre:
+                clave = nombre
+            if clave in filas:
+                raise ValueError(f"'{nombre}' y '{self._nombres[filas[clave]]}' coinciden al normalizar.")
+            filas[clave] = fila
+        self._filas = filas
+        self._normalizar, self._plegar_acentos = normalizar, plegar_acentos
+
+    @property
+    def normaliza_nombres(self) -> bool:
+        return self._normalizar is not None
+
+    @property
+    def plegar_acentos(self) -> bool:
+        """True si la normalización de nombres además quita los acentos."""
+        return self._normalizar is not None and self._plegar_acentos
+
+    @property
+    def normalizador(self) -> Optional[Callable[[str], str]]:
+        """Función de normalización activa (serializable, para procesos trabajadores)."""
+        return self._normalizar
+
+    # --- Precios en punto fijo -----------------------------------------------
+
+    def fijar_decimales(self, decimales: int = 2) -> None:
+        """
+        Guarda los precios como enteros escalados por 10**decimales (array('q')).
+        Los precios existentes se redondean a esa precisión; los que cambian se
+        notifican a los observadores como modificación.
+        """
+        escala = 10 ** decimales
+        anterior = self._precios
+        # Se convierte todo antes de tocar el inventario: un precio no representable no deja cambios a medias
+        enteros = array('q', [round(precio * escala) for precio in anterior])
+        self._precios, self._decimales = _ColumnaFija(decimales, enteros), decimales
+        # Las estadísticas se rehacen con suma entera en la próxima consulta
+        if self._estadisticas is not None:
+            self.desuscribir(self._estadisticas)
+            self._estadisticas = None
+        if not self._observadores:
+            return
+        for fila, nombre in enumerate(self._nombres):
+            precio = enteros[fila] / escala
+            if nombre is not None and precio != anterior[fila]:
+                for obs in self._observadores:
+                    obs.al_modificar(nombre, anterior[fila], self._cantidades[fila],
+                                     precio, self._cantidades[fila], self._secuencias[fila])
+
+    @property
+    def decimales(self) -> Optional[int]:
+        """Decimales del punto fijo, o None si los precios son float."""
+        return self._decimales
+
+    def aplicar_escalados(self, filas: Iterable[Tuple[str, int, int]], reemplazar: bool,
+                          politica_precio: str) -> Tuple[int, int]:
+        """
+        Aplica filas validadas de un CSV con el precio ya en punto fijo, con la semántica
+        de cargar_csv (reemplazo: gana la última fila; fusión: suma cantidades y aplica
+        `politica_precio`). Los enteros se guardan tal cual. Devuelve (nuevos, actualizados).
+        """
+        escala = 10 ** self._decimales
+        enteros = self._precios.enteros
+        nuevos = actualizados = 0
+        for nombre, entero, cantidad in filas:
+            fila = self._filas.get(self.clave_nombre(nombre))
+            if fila is None:
+                self._anexar(nombre, entero / escala, cantidad, entero)
+                nuevos += 1
+                continue
+            if reemplazar:
+                nuevos += 1
+            else:
+                cantidad += self._cantidades[fila]
+                if politica_precio != 'csv':
+                    entero = enteros[fila]
+                actualizados += 1
+            self._escribir(fila, entero / escala, cantidad, entero)
+        return nuevos, actualizados
+
+    def _columna_precios(self, nativos: Optional[array] = None):
+        if self._decimales is None:
+            return nativos if nativos is not None else array('d')
+        return _ColumnaFija(self._decimales, nativos)
+
+    @property
+    def usa_vistas(self) -> bool:
+        return self._vistas
+
+    def clave_nombre(self, nombre: str) -> str:
+        return nombre if self._normalizar is None else self._normalizar(nombre)
+
+    def _clave_guardada(self, nombre: str) -> str:
+        # Clave que queda en el índice: si normalizar no cambia el nombre se reutiliza el mismo
+        # objeto, en lugar de guardar dos cadenas iguales (columna de nombres y clave del dict)
+        if self._normalizar is None:
+            return nombre
+        clave = self._normalizar(nombre)
+        return nombre if clave == nombre else clave
+
+    def resolver_nombre(self, nombre: str) -> Optional[str]:
+        """Nombre tal como está guardado, o None si no existe."""
+        fila = self._filas.get(self.clave_nombre(nombre))
+        return None if fila is None else self._nombres[fila]
+
+    # --- Operaciones del servicio -------------------------------------------
+
+    def agregar_producto(self, nombre: str, precio: float, cantidad: int) -> bool:
+        if self.clave_nombre(nombre) in self._filas or not precio_valido(precio) or cantidad < 0:
+            return False
+        self._anexar(nombre, float(precio), int(cantidad))
+        return True
+
+    def buscar_producto(self, nombre: str) -> Optional[Product]:
+        clave = self.clave_nombre(nombre)
+        fila = self._filas.get(clave)
+        if fila is None:
+            return None
+        if self._vistas:
+            return ProductoVista(self, clave)
+        return Product(self._nombres[fila], self._precios[fila], self._cantidades[fila])
+
+    def actualizar_producto(self, nombre: str,
+                            nuevo_precio: Optional[float] = None,
+                            nueva_cantidad: Optional[int] = None) -> bool:
+        # Mismo orden de validación que services.actualizar_producto
+        fila = self._filas.get(self.clave_nombre(nombre))
+        if fila is None:
+            return False
+        actualizado = False
+        if nuevo_precio is not None:
+            if not precio_valido(nuevo_precio):
+                return False
+            self._escribir(fila, float(nuevo_precio), self._cantidades[fila])
+            actualizado = True
+        if nueva_cantidad is not None:
+            if nueva_cantidad < 0:
+                return False
+            self._escribir(fila, self._precios[fila], int(nueva_cantidad))
+            actualizado = True
+        return actualizado
+
+    def eliminar_producto(self, nombre: str) -> bool:
+        fila = self._filas.pop(self.clave_nombre(nombre), None)
+        if fila is None:
+            return False
+        nombre = self._nombres[fila]
+        self._nombres[fila] = None
+        self._borrados += 1
+        for obs in self._observadores:
+            obs.al_eliminar(nombre, self._precios[fila], self._cantidades[fila], self._secuencias[fila])
+        if self._borrados > _MIN_BORRADOS_COMPACTAR and self._borrados > len(self._filas):
+            self.compactar()
+        return True
+
+    def agregar_lote(self, filas: List[Tuple[str, float, int]]) -> None:
+        """Anexa filas ya validadas (nombres nuevos y únicos) extendiendo las columnas de golpe."""
+        inicio = len(self._nombres)
+        seq = self._siguiente_seq
+        nombres = [fila[0] for fila in filas]
+        self._nombres.extend(nombres)
+        self._precios.extend(fila[1] for fila in filas)
+        self._cantidades.extend(fila[2] for fila in filas)
+        self._secuencias.extend(range(seq, seq + len(filas)))
+        self._siguiente_seq = seq + len(filas)
+        claves = nombres if self._normalizar is None else map(self._clave_guardada, nombres)
+        self._filas.update(zip(claves, range(inicio, inicio + len(filas))))
+        precios = self._precios
+        for obs in self._observadores:
+            for i, (nombre, _, cantidad) in enumerate(filas):
+                obs.al_agregar(nombre, precios[inicio + i], cantidad, seq + i)
+
+    def compactar(self) -> None:
+        """Elimina los tombstones reescribiendo las columnas en orden."""
+        if not self._borrados:
+            return
+        nombres: List[Optional[str]] = []
+        # Se copian los valores nativos (enteros en punto fijo) sin convertirlos
+        origen = self._precios if self._decimales is None else self._precios.enteros
+        precios = array(origen.typecode)
+        cantidades = array('q')
+        secuencias = array('q')
+        nueva_fila = array('q', [0]) * len(self._nombres)
+        for fila, nombre in enumerate(self._nombres):
+            if nombre is None:
+                continue
+            nueva_fila[fila] = len(nombres)
+            nombres.append(nombre)
+            precios.append(origen[fila])
+            cantidades.append(self._cantidades[fila])
+            secuencias.append(self._secuencias[fila])
+        self._nombres, self._precios, self._cantidades = nombres, self._columna_precios(precios), cantidades
+        self._secuencias = secuencias
+        # Las claves no cambian: solo se renumeran las filas
+        self._filas = {clave: nueva_fila[fila] for clave, fila in self._filas.items()}
+        self._borrados = 0
+
+    def filas(self) -> Iterator[Tuple[str, float, int]]:
+        """Itera (nombre, precio, cantidad) en orden de inserción sin crear Product."""
+        precios, cantidades = self._precios, self._cantidades
+        for fila, nombre in enumerate(self._nombres):
+            if nombre is not None:
+                yield nombre, precios[fila], cantidades[fila]
+
+    def intercambiar(self, otro: "InventoryStore") -> None:
+        """Reemplaza de golpe el contenido por el de `otro` (creado con `vacio()`, queda vacío)."""
+        otro.compactar()
+        self._nombres, self._precios, self._cantidades = otro._nombres, otro._precios, otro._cantidades
+        self._secuencias, self._siguiente_seq = otro._secuencias, otro._siguiente_seq
+        self._filas, self._borrados = otro._filas, 0
+        otro._observadores = []
+        otro.clear()
+        for obs in self._observadores:
+            obs.al_limpiar()
+            for fila, nombre in enumerate(self._nombres):
+                obs.al_agregar(nombre, self._precios[fila], self._cantidades[fila], self._secuencias[fila])
+
+    def columnas(self) -> Tuple[List[Optional[str]], array, array]:
+        """Copia barata (listas y memcpy de arrays) de las columnas, tombstones incluidos."""
+        return self._nombres[:], self._precios[:], self._cantidades[:]
+
+    def consultar(self, nombre: str) -> Optional[Tuple[float, int, int]]:
+        """Devuelve (precio, cantidad, secuencia) de un producto o None."""
+        fila = self._filas.get(self.clave_nombre(nombre))
+        if fila is None:
+            return None
+        return self._precios[fila], self._cantidades[fila], self._secuencias[fila]
+
+    def suscribir(self, observador) -> None:
+        self._observadores.append(observador)
+
+    def desuscribir(self, observador) -> None:
+        self._observadores.remove(observador)
+
+    def resumen_estadisticas(self) -> Dict[str, object]:
+        """Estadísticas en O(1): el motor incremental se crea en la primera consulta."""
+        if self._estadisticas is None:
+            escala = None if self._decimales is None else 10 ** self._decimales
+            motor = EstadisticasIncrementales(self.consultar, escala)
+            for fila, nombre in enumerate(self._nombres):
+                if nombre is not None:
+                    motor.al_agregar(nombre, self._precios[fila], self._cantidades[fila], self._secuencias[fila])
+            self.suscribir(motor)
+            self._estadisticas = motor
+        return self._estadisticas.resumen()
+
+    def sumandos_valor(self) -> List[float]:
+        """Sumandos exactos del valor total, para combinar resúmenes de varios inventarios."""
+        self.resumen_estadisticas()
+        return self._estadisticas.sumandos()
+
+    def indice_busqueda(self) -> IndiceBusqueda:
+        """Índice de prefijos y trigramas; se construye en la primera búsqueda."""
+        if self._busqueda is None:
+            self._busqueda = IndiceBusqueda(iter(self))
+            self.suscribir(self._busqueda)
+        return self._busqueda
+
+    def indices_ordenados(self) -> IndicesOrdenados:
+        """Índices por precio, cantidad y subtotal; se construyen en la primera consulta."""
+        if self._indices is None:
+            self._indices = IndicesOrdenados(
+                (nombre, self._precios[fila], self._cantidades[fila], self._secuencias[fila])
+                for fila, nombre in enumerate(self._nombres) if nombre is not None
+            )
+            self.suscribir(self._indices)
+        return self._indices
+
+    def _anexar(self, nombre: str, precio: float, cantidad: int, entero: Optional[int] = None) -> None:
+        # entero: precio ya escalado (punto fijo), se guarda sin pasar por `precio`
+        seq = self._siguiente_seq
+        self._siguiente_seq += 1
+        self._filas[self._clave_guardada(nombre)] = len(self._nombres)
+        self._nombres.append(nombre)
+        if entero is None:
+            self._precios.append(precio)
+        else:
+            self._precios.enteros.append(entero)
+        self._cantidades.append(cantidad)
+        self._secuencias.append(seq)
+        if self._decimales is not None:
+            # Los observadores reciben el precio guardado (redondeado), no el pedido
+            precio = self._precios[-1]
+        for obs in self._observadores:
+            obs.al_agregar(nombre, precio, cantidad, seq)
+
+    def _escribir(self, fila: int, precio: float, cantidad: int, entero: Optional[int] = None) -> None:
+        precio_ant, cantidad_ant = self._precios[fila], self._cantidades[fila]
+        if entero is None:
+            self._precios[fila] = precio
+        else:
+            self._precios.enteros[fila] = entero
+        self._cantidades[fila] = cantidad
+        if self._decimales is not None:
+            precio = self._precios[fila]
+        for obs in self._observadores:
+            obs.al_modificar(self._nombres[fila], precio_ant, cantidad_ant,
+                             precio, cantidad, self._secuencias[fila])
+
+    # --- Adaptador MutableMapping[str, Product] -----------------------------
+
+    def __getitem__(self, nombre: str) -> Product:
+        clave = self.clave_nombre(nombre)
+        fila = self._filas[clave]
+        if self._vistas:
+            return ProductoVista(self, clave)
+        return Product(self._nombres[fila], self._precios[fila], self._cantidades[fila])
+
+    def __setitem__(self, nombre: str, producto: Product) -> None:
+        # Sin vistas los Product devueltos son copias: los cambios se escriben de vuelta con inventario[nombre] = producto
+        if not math.isfinite(producto.precio):
+            # NaN o inf dejarían inservibles los montículos y la suma exacta de las estadísticas
+            raise ValueError(f"Precio no finito para '{nombre}'.")
+        fila = self._filas.get(self.clave_nombre(nombre))
+        if fila is None:
+            self._anexar(nombre, float(producto.precio), int(producto.cantidad))
+        else:
+            self._escribir(fila, float(producto.precio), int(producto.cantidad))
+
+    def __delitem__(self, nombre: str) -> None:
+        if not self.eliminar_producto(nombre):
+            raise KeyError(nombre)
+
+    def __contains__(self, nombre: object) -> bool:
+        if self._normalizar is not None and isinstance(nombre, str):
+            nombre = self._normalizar(nombre)
+        return nombre in self._filas
+
+    def __iter__(self) -> Iterator[str]:
+        return (nombre for nombre in self._nombres if nombre is not None)
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def clear(self) -> None:
+        self._nombres = []
+        self._precios = self._columna_precios()
+        self._cantidades = array('q')
+        self._secuencias = array('q')
+        self._filas = {}
+        self._borrados = 0
+        for obs in self._observadores:
+            obs.al_limpiar()
+
+    def __repr__(self) -> str:
+        return f"InventoryStore({len(self)} productos, {self._borrados} borrados)"
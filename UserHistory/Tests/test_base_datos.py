@@ -0,0 +1,118 @@
+"""
+Archivo: `test_base_datos.py`
+
+Inventario en SQLite (InventarioSQLite) contra InventoryStore como referencia:
+- mismas respuestas y mismo estado ante secuencias aleatorias (con filas inválidas)
+- mismas consultas ordenadas, percentiles y estadísticas resueltas en SQL
+- importación de CSV (fusión y reemplazo) y exportación idénticas
+- el contenido y el modo de nombres normalizados persisten al reabrir la base
+"""
+
+import random
+
+import pytest
+
+from UserHistory.Bench.generador import escribir_csv
+from UserHistory.Service.base_datos import InventarioSQLite
+from UserHistory.Service.services import (
+    actualizar_producto, actualizar_productos, agregar_producto, agregar_productos, buscar_producto,
+    calcular_estadisticas, cargar_csv, eliminar_producto, eliminar_productos, guardar_csv, nombres_ordenados,
+    percentil_productos, productos_en_rango, top_productos
+)
+from UserHistory.Service.store import InventoryStore
+
+CAMPOS = ("precio", "cantidad", "subtotal")
+
+
+def _estado(inventario) -> list:
+    return [(p.nombre, p.precio, p.cantidad) for p in inventario.values()]
+
+
+def _consultas(inventario) -> list:
+    resultado = [calcular_estadisticas(inventario), len(inventario)]
+    for campo in CAMPOS:
+        resultado += [top_productos(inventario, campo, 7), productos_en_rango(inventario, campo, 10, 200, 15),
+                      percentil_productos(inventario, campo, 50), percentil_productos(inventario, campo, 99),
+                      list(nombres_ordenados(inventario, campo, True)), list(nombres_ordenados(inventario, campo))]
+    return resultado
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_mismo_comportamiento_que_el_store(semilla):
+    az = random.Random(semilla)
+    referencia, base = InventoryStore(), InventarioSQLite("inventario.db")
+    nombres = [f"P{i}" for i in range(40)]
+    for paso in range(1200):
+        op, nombre = az.random(), az.choice(nombres)
+        precio = az.choice([1.0, 2.5, -1.0, round(az.uniform(0, 50), 2)])
+        cantidad = az.choice([0, 5, -2, az.randint(0, 100)])
+        if op < 0.35:
+            operacion = lambda inv: agregar_producto(inv, nombre, precio, cantidad)
+        elif op < 0.6:
+            nuevo = az.choice([None, precio])
+            operacion = lambda inv: actualizar_producto(inv, nombre, nuevo, cantidad)
+        elif op < 0.75:
+            operacion = lambda inv: eliminar_producto(inv, nombre)
+        elif op < 0.85:
+            operacion = lambda inv: buscar_producto(inv, nombre)
+        elif op < 0.9:
+            lote = [(n, precio, cantidad) for n in az.sample(nombres, 4)]
+            operacion = lambda inv: agregar_productos(inv, lote)
+        elif op < 0.95:
+            lote = [(n, az.choice([None, precio]), cantidad) for n in az.sample(nombres, 4)]
+            operacion = lambda inv: actualizar_productos(inv, lote)
+        elif op < 0.99:
+            lote = az.sample(nombres, 3)
+            operacion = lambda inv: eliminar_productos(inv, lote)
+        else:
+            operacion = lambda inv: inv.clear()
+        assert operacion(base) == operacion(referencia)
+        if paso % 100 == 0:
+            assert _estado(base) == _estado(referencia)
+            assert _consultas(base) == _consultas(referencia)
+    assert _estado(base) == _estado(referencia)
+    assert _consultas(base) == _consultas(referencia)
+    base.cerrar()
+
+
+def test_csv_importacion_y_exportacion(directorio_datos):
+    ruta = escribir_csv(str(directorio_datos / "generado.csv"), 3000, semilla=3)
+    referencia, base = InventoryStore(), InventarioSQLite("inventario.db")
+    for reemplazar, politica in ((False, "csv"), (False, "existente"), (True, "csv"), (False, "existente")):
+        assert (cargar_csv(base, ruta, reemplazar, politica, tam_lote=700)
+                == cargar_csv(referencia, ruta, reemplazar, politica, tam_lote=700))
+        assert _estado(base) == _estado(referencia)
+        assert _consultas(base) == _consultas(referencia)
+    assert guardar_csv(base, "base.csv") and guardar_csv(referencia, "store.csv")
+    assert (directorio_datos / "base.csv").read_bytes() == (directorio_datos / "store.csv").read_bytes()
+    base.cerrar()
+
+
+def test_persistencia_y_nombres_normalizados():
+    base = InventarioSQLite("inventario.db")
+    agregar_productos(base, [(f"L{i}", 1.0 + i, i) for i in range(30)] + [("Café", 3.0, 2)])
+    eliminar_producto(base, "L3")
+    base.normalizar_nombres(plegar_acentos=True)
+    assert not agregar_producto(base, "  l1 ", 1.0, 1)
+    assert buscar_producto(base, "CAFE").nombre == "Café"
+    estado, consultas = _estado(base), _consultas(base)
+    base.cerrar()
+
+    reabierta = InventarioSQLite("inventario.db")
+    assert reabierta.normaliza_nombres
+    assert _estado(reabierta) == estado
+    assert _consultas(reabierta) == consultas
+    assert "cafe" in reabierta and "l1" in reabierta
+    # Los ids no se reutilizan: una alta nueva va al final aunque se haya borrado otra
+    assert agregar_producto(reabierta, "L3", 9.0, 9)
+    assert list(reabierta)[-1] == "L3"
+    reabierta.cerrar()
+
+
+def test_normalizar_con_choques_no_cambia_nada():
+    base = InventarioSQLite(":memory:")
+    agregar_productos(base, [("Papa", 1.0, 1), ("papa ", 2.0, 2)])
+    with pytest.raises(ValueError):
+        base.normalizar_nombres()
+    assert not base.normaliza_nombres
+    assert _estado(base) == [("Papa", 1.0, 1), ("papa ", 2.0, 2)]
@@ -0,0 +1,116 @@
+"""
+Archivo: `test_cambios.py`
+
+Simulación de la fusión de un CSV (calcular_cambios / aplicar_cambios):
+- calcular no modifica el inventario y sus contadores son los de cargar_csv
+- aplicar deja el inventario igual que cargar_csv en modo fusión, en cada
+  almacenamiento y con ambas políticas de precio
+- si el inventario cambió desde el cálculo, aplicar no escribe nada
+- cada fila rechazada se informa con su línea y motivo
+"""
+
+import pytest
+
+from UserHistory.Bench.generador import escribir_csv
+from UserHistory.Service.base_datos import InventarioSQLite
+from UserHistory.Service.cambios import CambiosDesactualizados, aplicar_cambios, calcular_cambios
+from UserHistory.Service.particiones import InventarioParticionado
+from UserHistory.Service.services import (
+    actualizar_producto, agregar_producto, agregar_productos, cargar_csv, eliminar_producto
+)
+from UserHistory.Service.store import InventoryStore
+
+INVENTARIOS = {
+    "dict": dict,
+    "store": InventoryStore,
+    "vistas": lambda: InventoryStore(vistas=True),
+    "punto_fijo": lambda: InventoryStore(decimales=2),
+    "sqlite": lambda: InventarioSQLite(":memory:"),
+    "particionado": lambda: InventarioParticionado(3, procesos=False),
+}
+RECHAZADAS = "X,abc,3\n,1,2\nY,-1,2\nZ,1,-3\nW,1\n\nV,2,x\nU,nan,1\n"
+
+
+def _estado(inventario) -> list:
+    return sorted((p.nombre, p.precio, p.cantidad) for p in inventario.values())
+
+
+@pytest.fixture
+def ruta_csv(directorio_datos) -> str:
+    ruta = escribir_csv(str(directorio_datos / "generado.csv"), 3000, semilla=3)
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(RECHAZADAS)
+    return ruta
+
+
+def _pareja(tipo: str, inicial: list) -> tuple:
+    a, b = INVENTARIOS[tipo](), INVENTARIOS[tipo]()
+    for inventario in (a, b):
+        agregar_productos(inventario, inicial)
+    return a, b
+
+
+@pytest.mark.parametrize("politica", ["csv", "existente"])
+@pytest.mark.parametrize("tipo", sorted(INVENTARIOS))
+def test_aplicar_igual_que_cargar_csv(tipo, politica, ruta_csv):
+    cargado, simulado = _pareja(tipo, [(f"Producto {i:05d}", 1.0 + i, i) for i in range(0, 3000, 7)])
+    antes = _estado(simulado)
+    cambios = calcular_cambios(simulado, ruta_csv)
+    assert _estado(simulado) == antes
+    esperado = cargar_csv(cargado, ruta_csv, False, politica)
+    assert cambios.contadores() == esperado[1:]
+    assert aplicar_cambios(simulado, cambios, politica) == esperado[1:]
+    assert _estado(simulado) == _estado(cargado)
+
+    # Segunda pasada: todo son modificaciones de productos existentes
+    cambios = calcular_cambios(simulado, ruta_csv)
+    assert not cambios.altas() and cambios.modificaciones()
+    precios = {(n, nuevo) for n, _, nuevo in cambios.cambios_de_precio(politica)}
+    assert aplicar_cambios(simulado, cambios, politica) == cargar_csv(cargado, ruta_csv, False, politica)[1:]
+    assert _estado(simulado) == _estado(cargado)
+    assert all(simulado[n].precio == precio for n, precio in precios)
+
+
+@pytest.mark.parametrize("tipo", sorted(INVENTARIOS))
+def test_cambios_desactualizados_no_escriben(tipo, ruta_csv):
+    inventario = INVENTARIOS[tipo]()
+    cambios = calcular_cambios(inventario, ruta_csv)
+    # Un alta previa a aplicar invalida el cálculo
+    alta = cambios.altas()[5].nombre
+    agregar_producto(inventario, alta, 1.0, 1)
+    with pytest.raises(CambiosDesactualizados):
+        aplicar_cambios(inventario, cambios, "csv")
+    assert _estado(inventario) == [(alta, 1.0, 1)]
+
+    eliminar_producto(inventario, alta)
+    aplicar_cambios(inventario, cambios, "csv")
+    cambios = calcular_cambios(inventario, ruta_csv)
+    for modificar in (lambda n: actualizar_producto(inventario, n, None, 999999),
+                      lambda n: eliminar_producto(inventario, n)):
+        modificar(cambios.modificaciones()[3].nombre)
+        estado = _estado(inventario)
+        with pytest.raises(CambiosDesactualizados):
+            aplicar_cambios(inventario, cambios, "existente")
+        assert _estado(inventario) == estado
+
+
+def test_rechazos_con_linea_y_motivo(ruta_csv):
+    cambios = calcular_cambios({}, ruta_csv)
+    # Las filas agregadas al final del CSV generado (3001 líneas); la línea vacía no cuenta
+    assert [(r.linea, r.nombre, r.motivo) for r in cambios.rechazos[-7:]] == [
+        (3002, "X", "Precio inválido."), (3003, "", "Nombre vacío."), (3004, "Y", "Precio negativo."),
+        (3005, "Z", "Cantidad negativa."), (3006, "W", "Faltan campos."), (3008, "V", "Cantidad inválida."),
+        (3009, "U", "Precio no finito."),
+    ]
+    lineas = [r.linea for r in cambios.rechazos]
+    assert lineas == sorted(lineas)
+    registros = list(cambios.registros("csv"))
+    assert sum(r["tipo"] == "rechazo" for r in registros) == len(cambios.rechazos)
+    assert cambios.resumen("csv")["errores"] == len(cambios.rechazos)
+    assert calcular_cambios({}, "no_existe.csv") is None
+
+
+def test_politica_invalida(ruta_csv):
+    cambios = calcular_cambios({}, ruta_csv)
+    with pytest.raises(ValueError):
+        aplicar_cambios({}, cambios, "otra")
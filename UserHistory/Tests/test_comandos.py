@@ -0,0 +1,49 @@
+"""
+Archivo: `test_comandos.py`
+
+Modo batch: un comando inválido o que falla produce un resultado de error y la
+corrida sigue con los demás.
+"""
+
+import json
+
+from UserHistory.Service import comandos
+from UserHistory.Service.comandos import ejecutar_comandos
+from UserHistory.Service.store import InventoryStore
+
+
+def test_archivo_que_no_es_texto_es_un_error():
+    inventario = InventoryStore()
+    resultados = list(ejecutar_comandos(inventario, [
+        {"op": "guardar", "archivo": 5},
+        {"op": "cargar", "archivo": ["a.csv"], "id": 2},
+        {"op": "agregar", "nombre": "Papa", "precio": 2.5, "cantidad": 3},
+    ]))
+    assert [r["ok"] for r in resultados] == [False, False, True]
+    assert resultados[1]["id"] == 2 and "archivo" in resultados[1]["error"]
+    assert "Papa" in inventario
+
+
+def test_un_fallo_inesperado_no_corta_la_corrida(monkeypatch):
+    def falla(*_):
+        raise RuntimeError("disco lleno")
+    monkeypatch.setattr(comandos, "guardar_csv", falla)
+    monkeypatch.setattr(comandos, "agregar_productos", falla)
+    resultados = list(ejecutar_comandos(InventoryStore(), [
+        {"op": "agregar", "nombre": "Papa", "precio": 2.5, "cantidad": 3},
+        {"op": "guardar"},
+        {"op": "estadisticas"},
+    ]))
+    assert [r["ok"] for r in resultados] == [False, False, True]
+    assert "disco lleno" in resultados[1]["error"]
+
+
+def test_batch_termina_con_comandos_invalidos(tmp_path, capsys):
+    from UserHistory.app import ejecutar_batch
+    entrada = tmp_path / "comandos.jsonl"
+    entrada.write_text('{"op": "guardar", "archivo": 5}\n'
+                       '{"op": "agregar", "nombre": "Papa", "precio": 2.5, "cantidad": 3}\n', encoding="utf-8")
+    salida = tmp_path / "resultados.jsonl"
+    assert ejecutar_batch(str(entrada), str(salida)) == 0
+    resultados = [json.loads(linea) for linea in salida.read_text(encoding="utf-8").splitlines()]
+    assert [r["ok"] for r in resultados] == [False, True]
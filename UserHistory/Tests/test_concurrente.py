@@ -0,0 +1,218 @@
+"""
+Archivo: `test_concurrente.py`
+
+Prueba de estrés acotada (por número de operaciones, no por tiempo) del
+inventario para varios hilos:
+- LockLectoresEscritor: nunca un escritor junto a otro o a un lector, varios
+  lectores sí a la vez, y un escritor en espera entra aunque lleguen lectores
+- InventarioConcurrente: incrementos en paralelo sin actualizaciones perdidas,
+  y transferencias, recreaciones y recargas completas del CSV en paralelo con
+  lectores que siempre ven el mismo total de unidades
+"""
+
+import random
+import sys
+import threading
+from typing import Callable, List
+
+import pytest
+
+from UserHistory.Service.concurrente import InventarioConcurrente, LockLectoresEscritor, cargar_csv_concurrente
+from UserHistory.Service.services import actualizar_producto, agregar_producto, eliminar_producto
+from UserHistory.Service.store import InventoryStore
+
+PRODUCTOS = 200
+TOTAL = PRODUCTOS * 100
+ESPERA = 30
+
+
+@pytest.fixture(autouse=True)
+def cambios_de_hilo_frecuentes():
+    # Más cambios de hilo por operación: más intercalados posibles en poco tiempo
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(anterior)
+
+
+def _correr(objetivos: List[Callable[[], None]]) -> List[BaseException]:
+    """Corre cada objetivo en su hilo y devuelve las excepciones (un hilo colgado también cuenta)."""
+    errores: List[BaseException] = []
+
+    def proteger(objetivo: Callable[[], None]) -> Callable[[], None]:
+        def correr() -> None:
+            try:
+                objetivo()
+            except BaseException as e:
+                errores.append(e)
+        return correr
+
+    hilos = [threading.Thread(target=proteger(objetivo), daemon=True) for objetivo in objetivos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(ESPERA)
+        if hilo.is_alive():
+            errores.append(TimeoutError(hilo.name))
+    return errores
+
+
+def test_lock_excluye_escritores_y_comparte_lectores():
+    lock = LockLectoresEscritor()
+    mutex = threading.Lock()
+    dentro = {"lectores": 0, "escritores": 0, "max_lectores": 0}
+    violaciones = []
+    # Dos lectores deben poder estar dentro a la vez: si el lock fuera exclusivo, la barrera vencería
+    juntos = threading.Barrier(2, timeout=ESPERA)
+
+    def entrar(tipo: str) -> None:
+        with mutex:
+            dentro[tipo] += 1
+            dentro["max_lectores"] = max(dentro["max_lectores"], dentro["lectores"])
+            if dentro["escritores"] > 1 or (dentro["escritores"] and dentro["lectores"]):
+                violaciones.append(dict(dentro))
+
+    def salir(tipo: str) -> None:
+        with mutex:
+            dentro[tipo] -= 1
+
+    def lector(barrera: bool) -> None:
+        if barrera:
+            with lock.lectura():
+                juntos.wait()
+        for _ in range(400):
+            with lock.lectura():
+                entrar("lectores")
+                salir("lectores")
+
+    def escritor() -> None:
+        for _ in range(200):
+            with lock.escritura():
+                entrar("escritores")
+                salir("escritores")
+
+    errores = _correr([lambda: lector(True), lambda: lector(True)] + [lambda: lector(False)] * 4 + [escritor] * 3)
+    assert errores == []
+    assert violaciones == []
+    assert dentro == {"lectores": 0, "escritores": 0, "max_lectores": dentro["max_lectores"]}
+
+
+def test_escritor_entra_con_lectores_continuos():
+    lock = LockLectoresEscritor()
+    escrito = threading.Event()
+    empezaron = threading.Barrier(5, timeout=ESPERA)
+
+    def lector() -> None:
+        empezaron.wait()
+        # Sin el torniquete, lectores que se solapan sin pausa dejarían al escritor esperando siempre
+        while not escrito.is_set():
+            with lock.lectura():
+                pass
+
+    def escritor() -> None:
+        empezaron.wait()
+        with lock.escritura():
+            escrito.set()
+
+    assert _correr([lector] * 4 + [escritor]) == []
+    assert escrito.is_set()
+
+
+def test_incrementos_en_paralelo_sin_perdidas():
+    inventario = InventarioConcurrente(InventoryStore([("Contador", 1.0, 0)]))
+    hilos, incrementos = 6, 300
+
+    def incrementar(inv) -> None:
+        actualizar_producto(inv, "Contador", None, inv["Contador"].cantidad + 1)
+
+    def trabajador() -> None:
+        for _ in range(incrementos):
+            inventario.escribir(incrementar)
+
+    version = inventario.version
+    assert _correr([trabajador] * hilos) == []
+    assert inventario["Contador"].cantidad == hilos * incrementos
+    assert inventario.version == version + hilos * incrementos
+
+
+def _repartir(azar: random.Random) -> List[int]:
+    # Cantidades positivas al azar que suman exactamente TOTAL
+    cortes = sorted(azar.sample(range(1, TOTAL), PRODUCTOS - 1))
+    return [b - a for a, b in zip([0] + cortes, cortes + [TOTAL])]
+
+
+def test_transferencias_y_recargas_conservan_el_total(directorio_datos):
+    inventario = InventarioConcurrente(InventoryStore((f"P{i}", 1.0, 100) for i in range(PRODUCTOS)))
+    terminados = threading.Semaphore(0)
+    escritores = 4
+    violaciones = []
+
+    def transferir(inv, origen: str, destino: str, unidades: int) -> None:
+        a, b = inv[origen], inv[destino]
+        if origen != destino and a.cantidad > unidades:
+            actualizar_producto(inv, origen, None, a.cantidad - unidades)
+            actualizar_producto(inv, destino, None, b.cantidad + unidades)
+
+    def recrear(inv, nombre: str) -> None:
+        producto = inv[nombre]
+        eliminar_producto(inv, nombre)
+        agregar_producto(inv, nombre, producto.precio, producto.cantidad)
+
+    def escritor(n: int) -> Callable[[], None]:
+        def correr() -> None:
+            azar = random.Random(n)
+            try:
+                for _ in range(400):
+                    origen, destino = f"P{azar.randrange(PRODUCTOS)}", f"P{azar.randrange(PRODUCTOS)}"
+                    if azar.random() < 0.9:
+                        inventario.escribir(lambda inv: transferir(inv, origen, destino, azar.randint(1, 5)))
+                    else:
+                        inventario.escribir(lambda inv: recrear(inv, origen))
+            finally:
+                terminados.release()
+        return correr
+
+    def recargador() -> None:
+        azar = random.Random(99)
+        ruta = directorio_datos / "recarga.csv"
+        try:
+            for _ in range(8):
+                filas = "".join(f"P{i},1.0,{c}\n" for i, c in enumerate(_repartir(azar)))
+                ruta.write_text("nombre,precio,cantidad\n" + filas, encoding="utf-8")
+                assert cargar_csv_concurrente(inventario, str(ruta), True, "csv")[0]
+        finally:
+            terminados.release()
+
+    fin = threading.Event()
+
+    def vigilar() -> None:
+        # El último escritor en terminar detiene a los lectores
+        for _ in range(escritores + 1):
+            terminados.acquire()
+        fin.set()
+
+    def lector(n: int) -> Callable[[], None]:
+        def correr() -> None:
+            azar = random.Random(-n)
+            ultima_version = -1
+            while not fin.is_set():
+                if inventario.resumen_estadisticas()["unidades_totales"] != TOTAL:
+                    violaciones.append("estadisticas")
+                version, copia = inventario.instantanea()
+                if len(copia) != PRODUCTOS or sum(p.cantidad for p in copia.values()) != TOTAL:
+                    violaciones.append("instantanea")
+                if version < ultima_version:
+                    violaciones.append("version")
+                ultima_version = version
+                if sum(p.cantidad for p in inventario.values()) != TOTAL:
+                    violaciones.append("values")
+                if inventario.get(f"P{azar.randrange(PRODUCTOS)}") is None:
+                    violaciones.append("get")
+        return correr
+
+    objetivos = ([lector(i) for i in range(4)] + [escritor(i) for i in range(escritores)]
+                 + [recargador, vigilar])
+    assert _correr(objetivos) == []
+    assert violaciones == []
+    assert inventario.resumen_estadisticas()["unidades_totales"] == TOTAL
+    assert len(inventario) == PRODUCTOS
@@ -0,0 +1,123 @@
+"""
+Archivo: `test_estadisticas.py`
+
+Prueba diferencial de las estadísticas incrementales (EstadisticasIncrementales,
+vía InventoryStore.resumen_estadisticas) contra calcular_estadisticas sobre un
+dict de Product, que las recalcula recorriendo todo el inventario. Secuencias
+aleatorias con semilla fija de altas, modificaciones, bajas, vaciados, altas por
+lote y reemplazos, en cada configuración del almacenamiento.
+"""
+
+import math
+import random
+
+import pytest
+
+from UserHistory.Service.services import (
+    Product, actualizar_producto, agregar_producto, agregar_productos, calcular_estadisticas, cargar_csv,
+    eliminar_producto
+)
+from UserHistory.Service.store import InventoryStore
+
+PASOS = 1500
+CONFIGURACIONES = {
+    "columnas": lambda: InventoryStore(),
+    "vistas": lambda: InventoryStore(vistas=True),
+    "punto_fijo": lambda: InventoryStore(decimales=2),
+}
+
+
+def _valor_exacto(inventario) -> float:
+    # El motor incremental suma sin error de redondeo: el total exacto redondeado una vez
+    escala = 10 ** inventario.decimales if inventario.decimales is not None else None
+    if escala is None:
+        return math.fsum(p.calcular_subtotal() for p in inventario.values())
+    return sum(round(p.precio * escala) * p.cantidad for p in inventario.values()) / escala
+
+
+def _comparar(inventario) -> None:
+    incremental = dict(calcular_estadisticas(inventario))
+    recorrido = dict(calcular_estadisticas({n: Product(p.nombre, p.precio, p.cantidad)
+                                            for n, p in inventario.items()}))
+    # El recorrido de un dict suma floats en orden; el valor se compara aparte, sin tolerancia
+    recorrido.pop("valor_total")
+    assert incremental.pop("valor_total") == _valor_exacto(inventario)
+    assert incremental == recorrido
+
+
+def _precio(az: random.Random) -> float:
+    # Precios repetidos a propósito: los empates en el máximo ejercitan el desempate
+    return az.choice([1.0, 2.5, 9.99, round(az.uniform(0.01, 500), az.randint(0, 3))])
+
+
+@pytest.mark.parametrize("semilla", range(4))
+@pytest.mark.parametrize("configuracion", sorted(CONFIGURACIONES))
+def test_estadisticas_incrementales_igual_que_recorrer(configuracion, semilla):
+    az = random.Random(semilla)
+    inventario = CONFIGURACIONES[configuracion]()
+    nombres = [f"P{i}" for i in range(40)]
+    _comparar(inventario)
+    for paso in range(PASOS):
+        op = az.random()
+        nombre = az.choice(nombres)
+        if op < 0.35:
+            agregar_producto(inventario, nombre, _precio(az), az.randint(0, 60))
+        elif op < 0.65:
+            actualizar_producto(inventario, nombre, az.choice([None, _precio(az)]),
+                                az.choice([None, az.randint(0, 60)]))
+        elif op < 0.85:
+            eliminar_producto(inventario, nombre)
+        elif op < 0.95:
+            agregar_productos(inventario, [(n, _precio(az), az.randint(0, 60)) for n in az.sample(nombres, 5)])
+        elif op < 0.98:
+            nuevo = inventario.vacio()
+            nuevo.agregar_lote([(n, _precio(az), az.randint(0, 60)) for n in az.sample(nombres, 10)])
+            inventario.intercambiar(nuevo)
+        else:
+            inventario.clear()
+        # Consultar a mitad de la secuencia también: el motor se crea en la primera consulta
+        if paso % 25 == 0:
+            _comparar(inventario)
+    _comparar(inventario)
+
+
+def _sqlite():
+    from UserHistory.Service.base_datos import InventarioSQLite
+    return InventarioSQLite("inventario.db")
+
+
+NO_FINITOS = ["nan", "inf", "-inf", "NaN", "Infinity"]
+INVENTARIOS = dict(CONFIGURACIONES, dict=dict, sqlite=_sqlite)
+
+
+@pytest.mark.parametrize("texto", NO_FINITOS)
+@pytest.mark.parametrize("configuracion", sorted(INVENTARIOS))
+def test_csv_con_precio_no_finito_se_rechaza(configuracion, texto, directorio_datos):
+    (directorio_datos / "entrada.csv").write_text(f"nombre,precio,cantidad\nPapa,{texto},3\nArroz,2.5,4\n",
+                                                  encoding="utf-8")
+    inventario = INVENTARIOS[configuracion]()
+    assert cargar_csv(inventario, "entrada.csv", False, "csv") == (True, 1, 0, 1)
+    assert "Papa" not in inventario
+    estadisticas = calcular_estadisticas(inventario)
+    assert estadisticas["valor_total"] == 10.0
+    assert estadisticas["producto_mas_caro"] == ("Arroz", 2.5)
+
+
+@pytest.mark.parametrize("precio", [math.nan, math.inf])
+@pytest.mark.parametrize("configuracion", sorted(INVENTARIOS))
+def test_precio_no_finito_no_entra_y_estadisticas_sobreviven_a_la_baja(configuracion, precio):
+    inventario = INVENTARIOS[configuracion]()
+    assert agregar_producto(inventario, "Arroz", 2.5, 4)
+    calcular_estadisticas(inventario)
+    assert not agregar_producto(inventario, "Papa", precio, 3)
+    assert agregar_producto(inventario, "Papa", 1.0, 3)
+    assert not actualizar_producto(inventario, "Papa", precio, None)
+    assert agregar_productos(inventario, [("Sal", precio, 1)]) == (True, [False])
+    # Antes un NaN en el inventario hacía que la baja dejara la cima y la suma inservibles
+    assert eliminar_producto(inventario, "Papa")
+    estadisticas = calcular_estadisticas(inventario)
+    assert estadisticas["valor_total"] == 10.0
+    assert estadisticas["producto_mas_caro"] == ("Arroz", 2.5)
+    if configuracion != "dict":
+        with pytest.raises(ValueError):
+            inventario["Arroz"] = Product("Arroz", precio, 4)
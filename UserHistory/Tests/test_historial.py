@@ -0,0 +1,191 @@
+"""
+Archivo: `test_historial.py`
+
+Historial de precios y cantidades (serie temporal), con reloj simulado:
+- el inventario en cada instante coincide con el estado real, también tras reabrir el archivo
+- una cola truncada o corrupta se descarta al abrir sin perder los registros íntegros
+- retener y reducir por partes dan lo mismo que de una vez, y repetirlos no cambia nada
+- un vaciado seguido del alta del mismo producto en el mismo milisegundo no deja rastro
+"""
+
+import os
+import random
+
+import pytest
+
+from UserHistory.Service.base_datos import InventarioSQLite
+from UserHistory.Service.historial import Historial
+from UserHistory.Service.services import (
+    actualizar_producto, agregar_producto, agregar_productos, eliminar_producto
+)
+from UserHistory.Service.store import InventoryStore
+
+PASOS = 1500
+INVENTARIOS = {
+    "store": InventoryStore,
+    "sqlite": lambda: InventarioSQLite("inventario.db"),
+}
+
+
+class Reloj:
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _estado(inventario) -> dict:
+    return {p.nombre: (p.precio, p.cantidad) for p in inventario.values()}
+
+
+def _simular(inventario, reloj: Reloj, semilla: int) -> list:
+    """Aplica operaciones aleatorias y devuelve [(instante, estado)] tomados por el camino."""
+    az = random.Random(semilla)
+    nombres = [f"P{i}" for i in range(20)]
+    fotos = []
+    for paso in range(PASOS):
+        reloj.t += az.choice([0, 0.001, 0.5, 3, 60])
+        op, nombre = az.random(), az.choice(nombres)
+        if op < 0.3:
+            agregar_producto(inventario, nombre, round(az.uniform(1, 9), 1), az.randint(0, 50))
+        elif op < 0.75:
+            actualizar_producto(inventario, nombre, az.choice([None, round(az.uniform(1, 9), 1)]),
+                                az.randint(0, 50))
+        elif op < 0.95:
+            eliminar_producto(inventario, nombre)
+        elif op < 0.97:
+            inventario.clear()
+        else:
+            agregar_productos(inventario, [(n, 2.0, 5) for n in az.sample(nombres, 4)])
+        if paso % 7 == 0:
+            fotos.append((reloj.t, _estado(inventario)))
+            # La foto vale para su milisegundo: lo siguiente ocurre después
+            reloj.t += 0.002
+    fotos.append((reloj.t, _estado(inventario)))
+    return fotos
+
+
+def _series(historial: Historial) -> dict:
+    return {n: historial.serie(n) for n in sorted(historial._series)}
+
+
+@pytest.mark.parametrize("semilla", range(2))
+@pytest.mark.parametrize("tipo", sorted(INVENTARIOS))
+def test_inventario_en_cada_instante_y_tras_reabrir(tipo, semilla, directorio_datos):
+    ruta = str(directorio_datos / "historial.seg")
+    reloj = Reloj()
+    inventario = INVENTARIOS[tipo]()
+    historial = Historial(ruta, reloj=reloj, puntos_por_segmento=8)
+    historial.observar(inventario)
+    fotos = _simular(inventario, reloj, semilla)
+    for t, estado in fotos:
+        assert _estado(historial.inventario_en(t)) == estado
+    series = _series(historial)
+    historial.cerrar()
+
+    reabierto = Historial(ruta)
+    assert _series(reabierto) == series
+    for t, estado in fotos:
+        assert _estado(reabierto.inventario_en(t)) == estado
+    reabierto.cerrar()
+
+
+@pytest.mark.parametrize("dano", ["truncado", "corrupto", "basura"])
+def test_cola_danada_se_descarta_al_abrir(dano, directorio_datos):
+    ruta = str(directorio_datos / "historial.seg")
+    reloj = Reloj()
+    historial = Historial(ruta, reloj=reloj, puntos_por_segmento=4)
+    for i in range(12):
+        reloj.t += 1
+        historial.registrar("Papa", 1.0 + i, i)
+    historial.cerrar()
+    # Tres registros de cuatro puntos; el último se daña
+    tam = os.path.getsize(ruta)
+    integro = Historial(ruta)
+    ultimo = integro._series["Papa"].segmentos[-1]
+    integro.cerrar()
+    with open(ruta, "r+b") as f:
+        if dano == "truncado":
+            f.truncate(tam - 3)
+        elif dano == "corrupto":
+            f.seek(tam - 10)
+            byte = f.read(1)
+            f.seek(tam - 10)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        else:
+            f.seek(tam)
+            f.write(b"\x07" * 40)
+
+    reabierto = Historial(ruta, reloj=reloj)
+    puntos = reabierto.serie("Papa")
+    if dano == "basura":
+        assert len(puntos) == 12
+        assert os.path.getsize(ruta) == tam
+    else:
+        assert [p for _, p, _ in puntos] == [1.0 + i for i in range(8)]
+        assert os.path.getsize(ruta) < tam
+        assert reabierto.estado_en("Papa", ultimo.fin / 1000).precio == 8.0
+    # El archivo sigue siendo utilizable: lo nuevo se anexa tras la parte íntegra
+    reloj.t += 1
+    reabierto.registrar("Papa", 50.0, 1)
+    reabierto.cerrar()
+    assert Historial(ruta).serie("Papa")[-1][1:] == (50.0, 1)
+
+
+def _historial_aleatorio(reloj: Reloj, semilla: int) -> Historial:
+    historial = Historial(reloj=reloj, puntos_por_segmento=8)
+    inventario = InventoryStore()
+    historial.observar(inventario)
+    _simular(inventario, reloj, semilla)
+    return historial
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_retener_y_reducir_por_partes_igual_que_de_una_vez(semilla):
+    reloj = Reloj()
+    inicio = reloj.t
+    de_una_vez = _historial_aleatorio(reloj, semilla)
+    fin = reloj.t
+    reloj.t = inicio
+    por_partes = _historial_aleatorio(reloj, semilla)
+    assert _series(por_partes) == _series(de_una_vez)
+
+    cortes = [inicio + (fin - inicio) * k / 5 for k in range(1, 5)]
+    for corte in cortes:
+        por_partes.reducir(corte, 120)
+    de_una_vez.reducir(cortes[-1], 120)
+    assert _series(por_partes) == _series(de_una_vez)
+    de_una_vez.reducir(cortes[-1], 120)
+    assert _series(por_partes) == _series(de_una_vez)
+
+    for corte in cortes[:3]:
+        por_partes.retener(corte)
+    de_una_vez.retener(cortes[2])
+    assert _series(por_partes) == _series(de_una_vez)
+    de_una_vez.retener(cortes[2])
+    assert _series(por_partes) == _series(de_una_vez)
+
+
+def test_vaciado_y_alta_en_el_mismo_milisegundo():
+    reloj = Reloj()
+    inventario = InventoryStore()
+    historial = Historial(reloj=reloj)
+    historial.observar(inventario)
+    agregar_producto(inventario, "Papa", 1.5, 3)
+    agregar_producto(inventario, "Arroz", 2.0, 1)
+    reloj.t += 1
+    # Reemplazo del inventario: vaciado y nuevas altas en el mismo instante
+    inventario.clear()
+    agregar_producto(inventario, "Papa", 1.5, 3)
+    agregar_producto(inventario, "Arroz", 2.5, 1)
+    assert historial.serie("Papa") == [(1000.0, 1.5, 3)]
+    assert historial.serie("Arroz") == [(1000.0, 2.0, 1), (1001.0, 2.5, 1)]
+
+    # En milisegundos distintos la baja sí queda
+    reloj.t += 1
+    inventario.clear()
+    reloj.t += 0.001
+    agregar_producto(inventario, "Papa", 1.5, 3)
+    assert historial.serie("Papa") == [(1000.0, 1.5, 3), (1002.0, None, None), (1002.001, 1.5, 3)]
+    assert historial.estado_en("Arroz", 1002.5) is None
@@ -0,0 +1,53 @@
+"""
+Archivo: `test_importacion.py`
+
+Costo de `import UserHistory.app` (arranque del menú y del modo batch):
+- los módulos pesados (almacenamiento, carga en paralelo, snapshot, journal,
+  historial, simulación de cargas) no se cargan al importar app
+- el tiempo acumulado que informa `python -X importtime` para UserHistory.app
+  (el mejor de varios intentos, en un proceso nuevo) no supera PRESUPUESTO_MS;
+  en máquinas lentas se puede ajustar con USERHISTORY_PRESUPUESTO_IMPORT_MS
+"""
+
+import os
+import subprocess
+import sys
+
+PRESUPUESTO_MS = float(os.environ.get("USERHISTORY_PRESUPUESTO_IMPORT_MS", 50))
+INTENTOS = 5
+DIFERIDOS = (
+    "UserHistory.Service.store",
+    "UserHistory.Service.carga_paralela",
+    "UserHistory.Service.cambios",
+    "UserHistory.Service.snapshot",
+    "UserHistory.Service.journal",
+    "UserHistory.Service.historial",
+    "UserHistory.Service.comandos",
+)
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _python(*argumentos: str) -> subprocess.CompletedProcess:
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    return subprocess.run([sys.executable, *argumentos], cwd=RAIZ, env=entorno,
+                          capture_output=True, text=True, check=True)
+
+
+def test_app_no_carga_modulos_pesados():
+    codigo = "import sys, UserHistory.app; print('\\n'.join(sys.modules))"
+    cargados = set(_python("-c", codigo).stdout.split())
+    assert not cargados.intersection(DIFERIDOS)
+
+
+def _microsegundos_import() -> int:
+    # Formato de cada línea: "import time: propio | acumulado | módulo"
+    for linea in _python("-X", "importtime", "-c", "import UserHistory.app").stderr.splitlines():
+        campos = [c.strip() for c in linea.split("|")]
+        if len(campos) == 3 and campos[2] == "UserHistory.app":
+            return int(campos[1])
+    raise AssertionError("importtime no informó UserHistory.app")
+
+
+def test_import_dentro_del_presupuesto():
+    mejor_ms = min(_microsegundos_import() for _ in range(INTENTOS)) / 1000
+    assert mejor_ms <= PRESUPUESTO_MS, f"import UserHistory.app: {mejor_ms:.1f} ms > {PRESUPUESTO_MS} ms"
@@ -0,0 +1,148 @@
+"""
+Archivo: `test_journal.py`
+
+Journal (WAL) del inventario:
+- reabrir (snapshot + log) reproduce el inventario, también tras una caída
+  con la cola del log a medio escribir
+- reaplicar un log ya contenido en el snapshot no cambia el resultado
+- compactar no se solapa con una rotación lanzada por las escrituras concurrentes
+- una compactación que no pudo guardar el snapshot se informa y conserva el log
+"""
+
+import os
+import random
+import shutil
+import threading
+
+import pytest
+
+from UserHistory.Service.journal import abrir_inventario, reaplicar_log
+from UserHistory.Service.services import (
+    actualizar_producto, agregar_producto, agregar_productos, eliminar_producto
+)
+from UserHistory.Service.snapshot import guardar_snapshot
+from UserHistory.app import gestionar_guardar_snapshot
+
+
+def _estado(inventario) -> dict:
+    return {n: (p.precio, p.cantidad) for n, p in inventario.items()}
+
+
+def _operar(inventario, az: random.Random, pasos: int) -> None:
+    nombres = [f"P{i}" for i in range(30)]
+    for _ in range(pasos):
+        op, nombre = az.random(), az.choice(nombres)
+        if op < 0.35:
+            agregar_producto(inventario, nombre, round(az.uniform(0, 50), 2), az.randint(0, 99))
+        elif op < 0.7:
+            actualizar_producto(inventario, nombre, az.choice([None, round(az.uniform(0, 50), 2)]),
+                                az.choice([None, az.randint(0, 99)]))
+        elif op < 0.93:
+            eliminar_producto(inventario, nombre)
+        elif op < 0.96:
+            inventario.clear()
+        else:
+            agregar_productos(inventario, [(n, 1.25, 2) for n in az.sample(nombres, 5)])
+
+
+@pytest.mark.parametrize("umbral", [1 << 30, 4096])
+@pytest.mark.parametrize("semilla", range(2))
+def test_reabrir_reproduce_el_inventario(semilla, umbral, tmp_path):
+    az = random.Random(semilla)
+    inventario, journal = abrir_inventario(str(tmp_path), fsync_cada=7, umbral_compactacion=umbral)
+    for _ in range(3):
+        _operar(inventario, az, 400)
+        journal.cerrar()
+        esperado = _estado(inventario)
+        inventario, journal = abrir_inventario(str(tmp_path), fsync_cada=7, umbral_compactacion=umbral)
+        assert _estado(inventario) == esperado
+    journal.cerrar()
+
+
+@pytest.mark.parametrize("corte", [1, 5, 17])
+def test_caida_con_cola_a_medio_escribir(corte, tmp_path):
+    inventario, journal = abrir_inventario(str(tmp_path))
+    _operar(inventario, random.Random(corte), 300)
+    journal.sincronizar()
+    previo = _estado(inventario)
+    agregar_producto(inventario, "Ultimo", 9.5, 1)
+    journal.sincronizar()
+    # Copia de los archivos tal como quedarían si el proceso muriera a mitad del último registro
+    caida = tmp_path / "caida"
+    caida.mkdir()
+    for nombre in os.listdir(tmp_path):
+        if nombre.startswith("inventario."):
+            shutil.copy(tmp_path / nombre, caida / nombre)
+    journal.cerrar()
+    wal = caida / "inventario.wal"
+    tam = os.path.getsize(wal)
+    with open(wal, "r+b") as f:
+        f.truncate(tam - corte)
+
+    recuperado, journal = abrir_inventario(str(caida))
+    assert _estado(recuperado) == previo
+    # La cola rota se descartó: lo siguiente se anexa a un log íntegro
+    agregar_producto(recuperado, "Despues", 1.0, 2)
+    journal.cerrar()
+    reabierto, journal = abrir_inventario(str(caida))
+    journal.cerrar()
+    assert _estado(reabierto) == dict(previo, Despues=(1.0, 2))
+
+
+def test_reaplicar_log_contenido_en_el_snapshot(tmp_path):
+    inventario, journal = abrir_inventario(str(tmp_path))
+    _operar(inventario, random.Random(7), 500)
+    journal.cerrar()
+    esperado = _estado(inventario)
+    # Snapshot del estado final con el log completo todavía presente: se reaplica encima
+    assert guardar_snapshot(inventario, str(tmp_path / "inventario.snap"))
+    reabierto, journal = abrir_inventario(str(tmp_path))
+    journal.cerrar()
+    assert _estado(reabierto) == esperado
+    assert reaplicar_log(reabierto, str(tmp_path / "inventario.wal")) == os.path.getsize(
+        tmp_path / "inventario.wal")
+    assert _estado(reabierto) == esperado
+
+
+def test_compactar_con_escrituras_concurrentes(tmp_path):
+    # Umbral mínimo: casi cada escritura intenta rotar mientras compactar espera
+    inventario, journal = abrir_inventario(str(tmp_path), umbral_compactacion=1)
+    fin = threading.Event()
+
+    def escribir():
+        for i in range(1500):
+            agregar_producto(inventario, f"P{i % 50}", 1.0, 0)
+            actualizar_producto(inventario, f"P{i % 50}", None, i)
+        fin.set()
+
+    hilo = threading.Thread(target=escribir)
+    hilo.start()
+    while not fin.is_set():
+        assert journal.compactar()
+    hilo.join()
+    journal.cerrar()
+    esperado = _estado(inventario)
+    assert not os.path.exists(tmp_path / "inventario.wal.old")
+
+    reabierto, journal = abrir_inventario(str(tmp_path))
+    journal.cerrar()
+    assert _estado(reabierto) == esperado
+
+
+def test_compactacion_fallida_se_informa(tmp_path, capsys):
+    inventario, journal = abrir_inventario(str(tmp_path))
+    agregar_producto(inventario, "Papa", 1.5, 3)
+    # Un directorio en la ruta del snapshot hace fallar el reemplazo del archivo
+    (tmp_path / "inventario.snap").mkdir()
+    assert not journal.compactar()
+    assert journal.ultima_compactacion is False
+    gestionar_guardar_snapshot(inventario, journal)
+    assert "Error al guardar el snapshot" in capsys.readouterr().out
+    assert os.path.exists(tmp_path / "inventario.wal.old")
+    journal.cerrar()
+
+    (tmp_path / "inventario.snap").rmdir()
+    reabierto, journal = abrir_inventario(str(tmp_path))
+    assert _estado(reabierto) == {"Papa": (1.5, 3)}
+    assert journal.compactar()
+    journal.cerrar()
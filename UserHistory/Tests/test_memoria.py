@@ -0,0 +1,65 @@
+"""
+Archivo: `test_memoria.py`
+
+Límites de memoria por producto (tracemalloc, con la misma medición que
+`Bench/memoria.py`): una regresión en la representación compacta de Product o
+del InventoryStore hace fallar la prueba en lugar de solo cambiar el informe.
+Los límites dejan ~15% de margen sobre lo medido con FILAS productos en CPython
+3.11 de 64 bits (el tamaño de los dicts depende de FILAS, que queda fijo).
+"""
+
+import sys
+
+import pytest
+
+from UserHistory.Bench.memoria import CASOS, ProductoAnterior, _filas, _retenido
+from UserHistory.Service.services import Product
+from UserHistory.Service.store import InventoryStore
+
+FILAS = 50_000
+# Bytes por producto medidos: antes 186.5, slots 146.4, InventoryStore 103.4, normalizado 168.4
+LIMITES = {
+    "dict[Product] con slots": 165,
+    "InventoryStore": 120,
+    "InventoryStore normalizado": 195,
+}
+
+
+@pytest.fixture(scope="module")
+def bytes_por_producto():
+    datos = _filas(FILAS)
+    casos = ["dict[Product] con __dict__ (antes)", *LIMITES]
+    return {caso: _retenido(CASOS[caso], datos) / FILAS for caso in casos}
+
+
+@pytest.mark.parametrize("caso", sorted(LIMITES))
+def test_limite_de_bytes_por_producto(bytes_por_producto, caso):
+    assert bytes_por_producto[caso] <= LIMITES[caso], f"{caso}: {bytes_por_producto[caso]:.1f} B/producto"
+
+
+def test_representaciones_compactas_ahorran_memoria(bytes_por_producto):
+    antes = bytes_por_producto["dict[Product] con __dict__ (antes)"]
+    slots = bytes_por_producto["dict[Product] con slots"]
+    assert slots <= antes - 30
+    assert bytes_por_producto["InventoryStore"] <= 0.8 * slots
+
+
+def test_product_sin_dict_por_instancia():
+    producto = Product("Papa", 1.5, 300)
+    assert not hasattr(producto, "__dict__")
+    assert hasattr(ProductoAnterior("Papa", 1.5, 300), "__dict__")
+
+
+class _DosReferencias:
+    __slots__ = ("a", "b")
+
+
+def test_vista_de_dos_referencias():
+    store = InventoryStore(vistas=True)
+    store.agregar_producto("Papa", 1.5, 300)
+    vista = store["Papa"]
+    assert not hasattr(vista, "__dict__")
+    # Solo _store y _clave: sin los tres slots de Product
+    assert sys.getsizeof(vista) == sys.getsizeof(_DosReferencias())
+    assert vista == Product("Papa", 1.5, 300) and Product("Papa", 1.5, 300) == vista
+    assert vista.calcular_subtotal() == 450.0
@@ -0,0 +1,34 @@
+"""
+Archivo: `test_menu.py`
+
+Contrato del menú interactivo: las opciones 1-9 conservan su número original
+(9 = Salir) y las agregadas después (10-13) van a continuación.
+"""
+
+import pytest
+
+from UserHistory import app
+
+
+def _sesion(monkeypatch, capsys, entradas: list) -> str:
+    respuestas = iter(entradas)
+    monkeypatch.setattr("builtins.input", lambda _="": next(respuestas))
+    app.main(["--no-color"])
+    return capsys.readouterr().out
+
+
+def test_opciones_originales_conservan_su_numero(monkeypatch, capsys):
+    salida = _sesion(monkeypatch, capsys, ["9"])
+    menu = [linea for linea in salida.splitlines() if linea[:1].isdigit()]
+    assert menu[:9] == ["1. Agregar producto", "2. Mostrar inventario", "3. Buscar producto",
+                        "4. Actualizar producto", "5. Eliminar producto", "6. Estadísticas",
+                        "7. Guardar CSV", "8. Cargar CSV", "9. Salir"]
+    assert [linea.split(".")[0] for linea in menu[9:]] == ["10", "11", "12", "13"]
+    assert "Hasta pronto" in salida
+
+
+@pytest.mark.parametrize("opcion, texto", [("10", "Guardar Snapshot"), ("13", "Historial")])
+def test_opciones_nuevas_despues_de_salir(monkeypatch, capsys, opcion, texto):
+    salida = _sesion(monkeypatch, capsys, [opcion, "9"])
+    assert texto in salida
+    assert "Opción inválida" not in salida
@@ -0,0 +1,99 @@
+"""
+Archivo: `test_punto_fijo.py`
+
+Inventario con precios en punto fijo (`decimales`): los observadores (estadísticas,
+índices, journal, historial) deben ver el precio guardado, no el que se pidió, y
+el CSV acepta y rechaza las mismas filas que en modo float.
+"""
+
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import pytest
+
+from UserHistory.Service.historial import Historial
+from UserHistory.Service.journal import abrir_inventario
+from UserHistory.Service.services import (
+    _validar_fila, actualizar_producto, agregar_producto, agregar_productos, calcular_estadisticas, cargar_csv,
+    top_productos
+)
+from UserHistory.Service.store import InventoryStore
+
+
+def _iguales_a_recorrer(inventario) -> bool:
+    # Las mismas estadísticas calculadas sobre un dict (sin motor incremental); en punto
+    # fijo valor_total es la suma exacta, el dict la aproxima con floats
+    incremental = calcular_estadisticas(inventario)
+    recorrido = calcular_estadisticas({n: p for n, p in inventario.items()})
+    return (incremental.pop("valor_total") == pytest.approx(recorrido.pop("valor_total"))
+            and incremental == recorrido)
+
+
+def test_estadisticas_con_precio_redondeado():
+    st = InventoryStore(decimales=2)
+    calcular_estadisticas(st)
+    agregar_producto(st, "a", 1.234, 1)
+    agregar_productos(st, [("b", 7.891, 2)])
+    assert st["a"].precio == 1.23
+    assert _iguales_a_recorrer(st)
+    actualizar_producto(st, "a", 9.999, None)
+    assert _iguales_a_recorrer(st)
+
+
+def test_indices_sin_duplicados_tras_actualizar():
+    st = InventoryStore(decimales=2)
+    agregar_producto(st, "a", 1.234, 1)
+    top_productos(st, "precio", 5)
+    actualizar_producto(st, "a", 5.0, None)
+    assert top_productos(st, "precio", 5) == [("a", 5.0)]
+    agregar_productos(st, [("b", 2.346, 1)])
+    assert top_productos(st, "precio", 5) == [("a", 5.0), ("b", st["b"].precio)]
+
+
+def test_journal_e_historial_guardan_el_precio_redondeado(tmp_path):
+    inventario, journal = abrir_inventario(str(tmp_path))
+    inventario.fijar_decimales(2)
+    historial = Historial()
+    historial.observar(inventario)
+    agregar_producto(inventario, "a", 1.234, 1)
+    actualizar_producto(inventario, "a", 2.005, 3)
+    agregar_productos(inventario, [("b", 0.129, 4)])
+    guardado = {n: (p.precio, p.cantidad) for n, p in inventario.items()}
+    precios = {p for _, p, _ in historial.serie("a")} | {p for _, p, _ in historial.serie("b")}
+    assert precios == {1.23, inventario["a"].precio, inventario["b"].precio}
+    assert historial.estado_en("a", historial.serie("a")[-1][0]) == inventario["a"]
+    journal.cerrar()
+
+    reabierto, journal = abrir_inventario(str(tmp_path))
+    journal.cerrar()
+    assert {n: (p.precio, p.cantidad) for n, p in reabierto.items()} == guardado
+
+
+# Textos de precio en el borde de la gramática de float(); los de PRECIOS_CSV caben en la columna
+PRECIOS_CSV = [
+    "12", "12.50", "12.", ".5", "1e3", "1E-2", "2.5e+1", "1_0", "1_000.2_5", "+3", "-0", "0.125", "0.135",
+    " 7.5 ", "\t2\n", "1e-400", "0e999999999", "١٢", "１２.５",
+    "1 2", "1,5", "1__0", "_1", "1_", "1._5", "1e", "e3", ".", "", "-", "+.e1", "nan", "inf", "-inf",
+    "Infinity", "0x10", "1.2.3", "1e3.5", "--1", "-1",
+]
+PRECIOS = PRECIOS_CSV + ["1.7976931348623157e308", "1e309", "9" * 400, "1e-999999999"]
+
+
+@pytest.mark.parametrize("texto", PRECIOS)
+def test_punto_fijo_acepta_las_mismas_filas_que_float(texto):
+    fila = ["Papa", texto, "3"]
+    flotante = _validar_fila(fila, 0, 1, 2)
+    fijo = _validar_fila(fila, 0, 1, 2, 2)
+    assert (flotante is None) == (fijo is None)
+    if fijo is not None:
+        # El entero es el decimal exacto del texto redondeado al par, no el float redondeado
+        esperado = Decimal(texto.strip()).scaleb(2).to_integral_value(ROUND_HALF_EVEN)
+        assert fijo == ("Papa", int(esperado), 3)
+
+
+def test_csv_mismos_resultados_en_ambos_modos(directorio_datos):
+    filas = "".join(f'P{i},"{texto}",3\n' for i, texto in enumerate(PRECIOS_CSV))
+    (directorio_datos / "precios.csv").write_text("nombre,precio,cantidad\n" + filas, encoding="utf-8")
+    flotante, fijo = InventoryStore(), InventoryStore(decimales=2)
+    assert cargar_csv(flotante, "precios.csv", False, "csv") == cargar_csv(fijo, "precios.csv", False, "csv")
+    assert list(flotante) == list(fijo)
+    assert all(fijo[n].precio == round(flotante[n].precio, 2) for n in fijo)
@@ -0,0 +1,78 @@
+"""
+Archivo: `test_servidor.py`
+
+Importación de CSV en el servidor HTTP:
+- `aplicar_csv_por_tramos` deja el inventario igual que `aplicar_csv`, con
+  cualquier tamaño de tramo
+- mientras se aplica un CSV grande las lecturas siguen respondiendo: una fusión
+  se ve avanzar de a tramos y un reemplazo se ve entero o nada
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from UserHistory.Server.servidor import ServidorInventario
+from UserHistory.Service.carga_paralela import TAM_TRAMO, aplicar_csv, aplicar_csv_por_tramos, preparar_csv
+from UserHistory.Service.services import agregar_producto
+from UserHistory.Service.store import InventoryStore
+
+INVENTARIOS = {"dict": dict, "store": InventoryStore}
+CSV = "nombre,precio,cantidad\n" + "".join(f"P{i % 40},{i % 7 + 1}.5,{i % 5 + 1}\n" for i in range(100)) + "X,abc,1\n"
+
+
+def _estado(inventario) -> list:
+    return sorted((p.nombre, p.precio, p.cantidad) for p in inventario.values())
+
+
+@pytest.mark.parametrize("tipo", INVENTARIOS)
+@pytest.mark.parametrize("reemplazar", [False, True])
+@pytest.mark.parametrize("politica", ["csv", "existente"])
+@pytest.mark.parametrize("tam_tramo", [1, 7, 1000])
+def test_por_tramos_igual_que_de_una_vez(tipo, reemplazar, politica, tam_tramo):
+    inventarios = [INVENTARIOS[tipo]() for _ in range(2)]
+    for inventario in inventarios:
+        agregar_producto(inventario, "P3", 9.0, 2)
+        agregar_producto(inventario, "Otro", 1.0, 1)
+    preparado = preparar_csv(CSV, reemplazar)
+    esperado = aplicar_csv(inventarios[0], preparado, reemplazar, politica)
+    *_, resultado = aplicar_csv_por_tramos(inventarios[1], preparado, reemplazar, politica, tam_tramo)
+    assert resultado == esperado
+    assert _estado(inventarios[1]) == _estado(inventarios[0])
+
+
+def _unidades_durante_la_importacion(inventario, consulta: str, filas: int) -> list:
+    # Consulta las estadísticas en bucle mientras el servidor importa el CSV
+    cuerpo = ("nombre,precio,cantidad\n" + "".join(f"P{i},1,1\n" for i in range(filas))).encode("utf-8")
+
+    async def escenario():
+        servidor = ServidorInventario(inventario)
+        importacion = asyncio.create_task(servidor._despachar("POST", f"/csv?{consulta}", cuerpo))
+        vistas = []
+        while not importacion.done():
+            _, respuesta, _ = await servidor._despachar("GET", "/estadisticas", b"")
+            vistas.append(json.loads(respuesta)["unidades_totales"])
+            await asyncio.sleep(0)
+        estado, _, _ = importacion.result()
+        assert estado == 200
+        return vistas
+
+    return asyncio.run(escenario())
+
+
+def test_fusion_grande_no_bloquea_las_lecturas():
+    filas = 3 * TAM_TRAMO + 5
+    inventario = InventoryStore()
+    vistas = _unidades_durante_la_importacion(inventario, "reemplazar=no", filas)
+    assert len(inventario) == filas
+    assert any(0 < unidades < filas for unidades in vistas)
+
+
+def test_reemplazo_grande_se_ve_entero_o_nada():
+    filas = 3 * TAM_TRAMO + 5
+    inventario = InventoryStore()
+    agregar_producto(inventario, "Viejo", 1.0, 7)
+    vistas = _unidades_durante_la_importacion(inventario, "reemplazar=si", filas)
+    assert "Viejo" not in inventario and len(inventario) == filas
+    assert vistas and set(vistas) <= {7, filas}
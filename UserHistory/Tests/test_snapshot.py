@@ -0,0 +1,160 @@
+"""
+Archivo: `test_snapshot.py`
+
+Snapshot binario del inventario:
+- guardar y volver a abrir (mmap o materializado) da el mismo inventario y estadísticas
+- un archivo truncado, corrupto o ajeno se rechaza con SnapshotInvalido y
+  cargar_snapshot devuelve None
+- el encabezado conserva los decimales del punto fijo y el modo de nombres
+  (también a través de la compactación del journal); la versión 1 se sigue leyendo
+"""
+
+import random
+import struct
+import zlib
+
+import pytest
+
+from UserHistory.Service.services import (
+    agregar_producto, calcular_estadisticas, eliminar_producto, top_productos
+)
+from UserHistory.Service.snapshot import (
+    TAM_ENCABEZADO, SnapshotInvalido, abrir_snapshot, cargar_snapshot, guardar_snapshot
+)
+from UserHistory.Service.store import InventoryStore
+from UserHistory.app import cerrar_inventario, gestionar_guardar_snapshot, inventario_inicial
+
+
+def _estado(inventario) -> dict:
+    return {n: (p.precio, p.cantidad) for n, p in inventario.items()}
+
+
+def _inventario(semilla: int) -> InventoryStore:
+    az = random.Random(semilla)
+    inventario = InventoryStore()
+    nombres = [f"Producto {i}" for i in range(300)] + ["Ñandú", "café", "Café", "日本", ""]
+    for nombre in nombres:
+        agregar_producto(inventario, nombre, round(az.uniform(0, 100), 2), az.randint(0, 500))
+    # Las bajas dejan huecos en las columnas que el snapshot no debe copiar
+    for nombre in az.sample(nombres, 60):
+        eliminar_producto(inventario, nombre)
+    return inventario
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_ida_y_vuelta(semilla):
+    inventario = _inventario(semilla)
+    assert guardar_snapshot(inventario)
+    cargado = cargar_snapshot()
+    assert list(_estado(cargado).items()) == list(_estado(inventario).items())
+    assert calcular_estadisticas(cargado) == calcular_estadisticas(inventario)
+    assert top_productos(cargado, "precio", 5) == top_productos(inventario, "precio", 5)
+
+    with abrir_snapshot() as snapshot:
+        assert len(snapshot) == len(inventario)
+        assert _estado(snapshot) == _estado(inventario)
+        assert snapshot.resumen_estadisticas() == calcular_estadisticas(inventario)
+        for nombre in ("Ñandú", "café", "Producto 7", "no existe"):
+            assert (nombre in snapshot) == (nombre in inventario)
+            assert snapshot.get(nombre) == inventario.get(nombre)
+
+
+def test_inventario_vacio_y_dict():
+    assert guardar_snapshot({}, "vacio.snap")
+    assert len(cargar_snapshot("vacio.snap")) == 0
+    with abrir_snapshot("vacio.snap") as snapshot:
+        assert snapshot.resumen_estadisticas()["producto_mas_caro"] is None
+    inventario = {n: p for n, p in _inventario(0).items()}
+    assert guardar_snapshot(inventario, "dict.snap")
+    assert _estado(cargar_snapshot("dict.snap")) == _estado(inventario)
+
+
+@pytest.mark.parametrize("dano", ["truncado", "encabezado", "seccion", "magia", "corto"])
+def test_archivo_danado_se_rechaza(dano, directorio_datos):
+    assert guardar_snapshot(_inventario(0))
+    ruta = directorio_datos / "inventario.snap"
+    datos = bytearray(ruta.read_bytes())
+    if dano == "truncado":
+        del datos[-100:]
+    elif dano == "encabezado":
+        datos[12] ^= 0xFF
+    elif dano == "seccion":
+        datos[TAM_ENCABEZADO + 3] ^= 0xFF
+    elif dano == "magia":
+        datos[:8] = b"NOSNAP\x00\x00"
+    else:
+        del datos[TAM_ENCABEZADO // 2:]
+    ruta.write_bytes(bytes(datos))
+    with pytest.raises(SnapshotInvalido):
+        abrir_snapshot().cerrar()
+    assert cargar_snapshot() is None
+
+
+def test_sin_verificar_no_comprueba_las_secciones(directorio_datos):
+    assert guardar_snapshot(_inventario(0))
+    ruta = directorio_datos / "inventario.snap"
+    datos = bytearray(ruta.read_bytes())
+    datos[TAM_ENCABEZADO] ^= 0x01
+    ruta.write_bytes(bytes(datos))
+    with abrir_snapshot(verificar=False) as snapshot:
+        assert len(snapshot) == len(_inventario(0))
+
+
+def test_fallo_al_guardar_conserva_el_anterior(directorio_datos):
+    inventario = _inventario(0)
+    assert guardar_snapshot(inventario)
+    agregar_producto(inventario, "Nuevo", 1.0, 1)
+    # Un directorio en la ruta temporal impide escribir el nuevo snapshot
+    (directorio_datos / "inventario.snap.tmp").mkdir()
+    assert not guardar_snapshot(inventario)
+    assert "Nuevo" not in cargar_snapshot()
+
+
+@pytest.mark.parametrize("plegar", [False, True])
+def test_encabezado_conserva_decimales_y_modo_de_nombres(plegar):
+    inventario = InventoryStore(decimales=2)
+    agregar_producto(inventario, "Café Molido", 4.239, 3)
+    agregar_producto(inventario, "Azúcar", 1.005, 10)
+    inventario.normalizar_nombres(plegar)
+    assert guardar_snapshot(inventario)
+    with abrir_snapshot() as snapshot:
+        assert snapshot.decimales == 2
+        assert snapshot.modo_nombres == ("sin_acentos" if plegar else "normalizados")
+    cargado = cargar_snapshot()
+    assert cargado.decimales == 2 and cargado.normaliza_nombres and cargado.plegar_acentos == plegar
+    assert _estado(cargado) == _estado(inventario)
+    assert ("  cafe molido " in cargado) == plegar and "CAFÉ MOLIDO" in cargado
+    # Sigue en punto fijo: los precios nuevos se redondean y el total es exacto
+    agregar_producto(cargado, "Sal", 0.125, 1)
+    assert cargado["Sal"].precio == 0.12
+
+
+def test_version_1_se_lee_como_float_y_nombres_exactos(directorio_datos):
+    inventario = InventoryStore(decimales=2)
+    agregar_producto(inventario, "Papa", 1.5, 3)
+    inventario.normalizar_nombres()
+    assert guardar_snapshot(inventario)
+    ruta = directorio_datos / "inventario.snap"
+    datos = bytearray(ruta.read_bytes())
+    # Encabezado como lo escribía la versión 1: relleno a cero donde ahora va la configuración
+    struct.pack_into("<I4x", datos, 8, 1)
+    fin = TAM_ENCABEZADO - 8
+    struct.pack_into("<I", datos, fin, zlib.crc32(bytes(datos[:fin])))
+    ruta.write_bytes(bytes(datos))
+    cargado = cargar_snapshot()
+    assert cargado.decimales is None and not cargado.normaliza_nombres
+    assert _estado(cargado) == {"Papa": (1.5, 3)}
+
+
+def test_inventario_en_punto_fijo_restaurado_sin_la_opcion():
+    inventario, journal = inventario_inicial(sqlite=None, decimales=2)
+    agregar_producto(inventario, "Papa", 1.239, 3)
+    gestionar_guardar_snapshot(inventario, journal)
+    cerrar_inventario(inventario, journal)
+
+    reabierto, journal = inventario_inicial()
+    assert reabierto.decimales == 2 and reabierto.normaliza_nombres
+    assert _estado(reabierto) == {"Papa": (1.24, 3)}
+    agregar_producto(reabierto, "Sal", 0.125, 1)
+    assert reabierto["sal"].precio == 0.12
+    cerrar_inventario(reabierto, journal)
@@ -0,0 +1,77 @@
+"""
+Archivo: `test_validadores_lote.py`
+
+Propiedad de los validadores por lotes: cada elemento del resultado coincide con
+el validador escalar (is_valid_name / parse_positive_int / parse_positive_decimal)
+aplicado a ese mismo valor. Las entradas salen de un generador aleatorio con
+semilla fija que mezcla casos válidos con los bordes conocidos (signos, comas,
+espacios, guiones bajos, exponentes, inf/nan, dígitos no ASCII...).
+"""
+
+import random
+
+import pytest
+
+from UserHistory.Utils.Validator import (
+    are_valid_names, clean_string, is_valid_name, parse_positive_decimal, parse_positive_decimals,
+    parse_positive_int, parse_positive_ints
+)
+
+SEMILLAS = range(20)
+TAM_LOTE = 300
+_PIEZAS_NUMERO = ["0", "1", "7", "9", "00", "12", "0.5", ".5", "5.", ",", ".", "-", "+", " ", "\t", "_",
+                  "e", "E", "e-3", "1e3", "inf", "nan", "١", "٣", "０", "²", "½", "x", " ", "\n"]
+_PIEZAS_NOMBRE = ["Papa", "papa", " ", "  ", "1", "9", "-", "_", "ñ", "Á", "é", "日本", "\t", "x" * 60,
+                  "Pan de maíz", "'", ".", "?", "​", "\n", "A1", "👍"]
+
+
+def _texto(az: random.Random, piezas: list) -> str:
+    return "".join(az.choice(piezas) for _ in range(az.randint(0, 5)))
+
+
+def _numero(az: random.Random) -> str:
+    forma = az.random()
+    if forma < 0.3:
+        return str(az.randint(-5, 10 ** az.randint(1, 12)))
+    if forma < 0.5:
+        return f"{az.uniform(-10, 10 ** 6):.{az.randint(0, 4)}f}".replace(".", az.choice([".", ","]))
+    return _texto(az, _PIEZAS_NUMERO)
+
+
+def _escalar(parser, valor):
+    try:
+        return True, parser(valor)
+    except ValueError:
+        return False, None
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_are_valid_names_coincide_con_is_valid_name(semilla):
+    az = random.Random(semilla)
+    valores = [None if az.random() < 0.02 else _texto(az, _PIEZAS_NOMBRE) for _ in range(TAM_LOTE)]
+    mascara, limpios = are_valid_names(valores)
+    for valor, ok, limpio in zip(valores, mascara, limpios):
+        assert ok == is_valid_name(valor), repr(valor)
+        assert limpio == (clean_string(valor) if ok else ""), repr(valor)
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_parse_positive_ints_coincide_con_parse_positive_int(semilla):
+    az = random.Random(semilla)
+    valores = [_numero(az) for _ in range(TAM_LOTE)]
+    mascara, numeros = parse_positive_ints(valores)
+    for valor, ok, numero in zip(valores, mascara, numeros):
+        esperado_ok, esperado = _escalar(parse_positive_int, valor)
+        assert ok == esperado_ok, repr(valor)
+        assert numero == (esperado if ok else 0), repr(valor)
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_parse_positive_decimals_coincide_con_parse_positive_decimal(semilla):
+    az = random.Random(semilla)
+    valores = [_numero(az) for _ in range(TAM_LOTE)]
+    mascara, numeros = parse_positive_decimals(valores)
+    for valor, ok, numero in zip(valores, mascara, numeros):
+        esperado_ok, esperado = _escalar(parse_positive_decimal, valor)
+        assert ok == esperado_ok, repr(valor)
+        assert numero == (esperado if ok else 0.0), repr(valor)
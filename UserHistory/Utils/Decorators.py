@@ -1,3 +1,13 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from threading import get_ident
+from typing import Callable, Dict
+
 COLORS = {
         "red": "\033[31m",
         "green": "\033[32m",
@@ -8,6 +18,222 @@ COLORS = {
         "reset": "\033[0m",
 }
 
+# Se respeta la convención NO_COLOR (https://no-color.org) además de --no-color
+_color_enabled = not os.environ.get("NO_COLOR")
+
+def set_color_enabled(enabled: bool) -> None:
+    #Activa o desactiva los códigos ANSI en todas las llamadas a color().
+    global _color_enabled
+    _color_enabled = enabled
+
 def color(text: str, color: str) -> str:
     #Devuelve text envuelto con el color indicado (name: red/green/yellow/...).
+    if not _color_enabled:
+        return text
     return f"{COLORS.get(color, COLORS['reset'])}{text}{COLORS['reset']}"
+
+
+# --- Métricas ---------------------------------------------------------------
+#
+# @instrumentar registra por función: llamadas, errores y un histograma de latencia.
+# contar() acumula contadores libres (filas CSV leídas/rechazadas, bytes escritos...).
+# Con USERHISTORY_METRICS=0 los decoradores devuelven la función original (costo cero);
+# set_metrics_enabled(False) las apaga en caliente dejando solo una comprobación por llamada.
+
+# Límites superiores (en segundos) de los buckets del histograma, como en Prometheus
+BUCKETS_LATENCIA = (1e-6, 1e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_metricas_disponibles = os.environ.get("USERHISTORY_METRICS", "1") != "0"
+_metrics_enabled = _metricas_disponibles
+_lock_metricas = threading.Lock()
+# Cada hilo registra en su propio histograma (id de hilo -> Histograma): sin lock en el camino rápido
+_funciones: Dict[str, Dict[int, "Histograma"]] = {}
+_contadores: Dict[str, int] = {}
+
+
+class Histograma:
+    __slots__ = ("llamadas", "errores", "suma", "maximo", "buckets")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        # Un bucket por límite más el de +Inf; cada observación cae solo en uno
+        self.buckets = [0] * (len(BUCKETS_LATENCIA) + 1)
+
+    def observar(self, segundos: float, error: bool) -> None:
+        self.llamadas += 1
+        self.errores += error
+        self.suma += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+        self.buckets[bisect_left(BUCKETS_LATENCIA, segundos)] += 1
+
+    def combinar(self, otro: "Histograma") -> None:
+        self.llamadas += otro.llamadas
+        self.errores += otro.errores
+        self.suma += otro.suma
+        self.maximo = max(self.maximo, otro.maximo)
+        self.buckets = [a + b for a, b in zip(self.buckets, otro.buckets)]
+
+    def percentil(self, p: float) -> float | None:
+        #Cota superior del bucket que contiene el percentil p (0-100); None si no hay llamadas.
+        if not self.llamadas:
+            return None
+        objetivo = p / 100 * self.llamadas
+        acumulado = 0
+        for limite, conteo in zip(BUCKETS_LATENCIA, self.buckets):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return limite
+        return self.maximo
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    #Activa o desactiva el registro de métricas (sin efecto si se desactivaron al importar).
+    global _metrics_enabled
+    _metrics_enabled = enabled and _metricas_disponibles
+
+
+def _registro(clave: str) -> Callable[[float, bool], None]:
+    #Función que anota una observación de clave en el histograma del hilo actual.
+    with _lock_metricas:
+        por_hilo = _funciones.setdefault(clave, {})
+
+    def anotar(segundos: float, error: bool) -> None:
+        hilo = get_ident()
+        histograma = por_hilo.get(hilo)
+        if histograma is None:
+            histograma = por_hilo[hilo] = Histograma()
+        histograma.observar(segundos, error)
+    return anotar
+
+
+def contar(nombre: str, cantidad: int = 1) -> None:
+    #Suma cantidad al contador nombre.
+    if not _metrics_enabled:
+        return
+    with _lock_metricas:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+
+def instrumentar(funcion: Callable | None = None, *, nombre: str | None = None) -> Callable:
+    #Decorador (@instrumentar o @instrumentar(nombre=...)) que mide cada llamada a la función.
+    #En generadores se mide solo el tiempo dentro del generador, no el del consumidor entre elementos.
+    def decorar(f: Callable) -> Callable:
+        if not _metricas_disponibles:
+            return f
+        anotar = _registro(nombre or f.__qualname__)
+        reloj = time.perf_counter
+
+        if inspect.isgeneratorfunction(f):
+            @functools.wraps(f)
+            def envoltura_generador(*args, **kwargs):
+                if not _metrics_enabled:
+                    return (yield from f(*args, **kwargs))
+                generador = f(*args, **kwargs)
+                segundos = 0.0
+                error = False
+                try:
+                    while True:
+                        inicio = reloj()
+                        try:
+                            valor = next(generador)
+                        except StopIteration as fin:
+                            segundos += reloj() - inicio
+                            return fin.value
+                        except BaseException:
+                            segundos += reloj() - inicio
+                            error = True
+                            raise
+                        segundos += reloj() - inicio
+                        yield valor
+                finally:
+                    generador.close()
+                    anotar(segundos, error)
+            return envoltura_generador
+
+        @functools.wraps(f)
+        def envoltura(*args, **kwargs):
+            if not _metrics_enabled:
+                return f(*args, **kwargs)
+            inicio = reloj()
+            try:
+                resultado = f(*args, **kwargs)
+            except BaseException:
+                anotar(reloj() - inicio, True)
+                raise
+            anotar(reloj() - inicio, False)
+            return resultado
+        return envoltura
+
+    return decorar if funcion is None else decorar(funcion)
+
+
+def reiniciar_metricas() -> None:
+    with _lock_metricas:
+        for por_hilo in _funciones.values():
+            por_hilo.clear()
+        _contadores.clear()
+
+
+def metricas() -> Dict[str, object]:
+    #Copia de las métricas actuales (tiempos en segundos), lista para serializar a JSON.
+    funciones = {}
+    with _lock_metricas:
+        registradas = list(_funciones.items())
+        contadores = dict(_contadores)
+    for clave, por_hilo in registradas:
+        h = Histograma()
+        # list() copia los valores de una vez aunque otro hilo agregue su histograma en paralelo
+        for parcial in list(por_hilo.values()):
+            h.combinar(parcial)
+        if not h.llamadas:
+            continue
+        funciones[clave] = {
+            "llamadas": h.llamadas,
+            "errores": h.errores,
+            "segundos_total": h.suma,
+            "segundos_max": h.maximo,
+            "p50": h.percentil(50),
+            "p99": h.percentil(99),
+            "buckets": dict(zip([str(b) for b in BUCKETS_LATENCIA] + ["+Inf"], h.buckets)),
+        }
+    return {"habilitadas": _metrics_enabled, "funciones": funciones, "contadores": contadores}
+
+
+def metricas_json() -> str:
+    return json.dumps(metricas(), ensure_ascii=False, indent=2)
+
+
+def _nombre_prometheus(nombre: str) -> str:
+    return "".join(c if c.isalnum() and c.isascii() else "_" for c in nombre)
+
+
+def metricas_prometheus() -> str:
+    #Métricas en el formato de texto de Prometheus (buckets acumulados, prefijo userhistory_).
+    datos = metricas()
+    lineas = [
+        "# HELP userhistory_llamada_segundos Latencia de las funciones instrumentadas.",
+        "# TYPE userhistory_llamada_segundos histogram",
+    ]
+    for clave, f in datos["funciones"].items():
+        etiqueta = clave.replace("\\", "\\\\").replace('"', '\\"')
+        acumulado = 0
+        for limite, conteo in f["buckets"].items():
+            acumulado += conteo
+            lineas.append(f'userhistory_llamada_segundos_bucket{{funcion="{etiqueta}",le="{limite}"}} {acumulado}')
+        lineas.append(f'userhistory_llamada_segundos_sum{{funcion="{etiqueta}"}} {f["segundos_total"]!r}')
+        lineas.append(f'userhistory_llamada_segundos_count{{funcion="{etiqueta}"}} {f["llamadas"]}')
+    lineas += [
+        "# HELP userhistory_llamada_errores_total Llamadas terminadas con excepción.",
+        "# TYPE userhistory_llamada_errores_total counter",
+    ]
+    for clave, f in datos["funciones"].items():
+        etiqueta = clave.replace("\\", "\\\\").replace('"', '\\"')
+        lineas.append(f'userhistory_llamada_errores_total{{funcion="{etiqueta}"}} {f["errores"]}')
+    for nombre, valor in datos["contadores"].items():
+        metrica = f"userhistory_{_nombre_prometheus(nombre)}_total"
+        lineas += [f"# TYPE {metrica} counter", f"{metrica} {valor}"]
+    return "\n".join(lineas) + "\n"
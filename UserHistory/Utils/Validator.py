@@ -2,17 +2,19 @@
 Archivo: `validators.py`
 
 Funciones de validación y parseo para usar en el proyecto:
-- is_non_empty_string, clean_string
+- is_non_empty_string, clean_string, to_text
 - is_valid_name
 - is_positive_int_str / parse_positive_int
 - is_positive_decimal_str / parse_positive_decimal
-- is_unique_name
+- parse_fixed_decimal (punto fijo: entero escalado, sin pasar por float)
+- normalize_name / is_unique_name
 - format_decimal
 - parse_bool
+- are_valid_names / parse_positive_ints / parse_positive_decimals (por lotes)
 """
 
 import re
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 def is_non_empty_string(value: Optional[str]) -> bool:
     """True si value es un string no vacío después de strip()."""
@@ -24,6 +26,18 @@ def clean_string(value: Optional[str]) -> str:
     return (value or "").strip()
 
 
+def to_text(value: object) -> str:
+    """
+    Texto de un valor JSON para los validadores, que trabajan sobre texto como en el menú:
+    números con str() (5.7 -> "5.7" no pasa como entero), booleanos y otros tipos como "".
+    """
+    if isinstance(value, bool):
+        return ""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return value if isinstance(value, str) else ""
+
+
 _NAME_RE = re.compile(r"^(?!\d)[A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9\s\-\._']+$")
 
 
@@ -111,11 +125,22 @@ def is_valid_decimal(value: str) -> bool:
         return False
 
 
-def parse_positive_decimal(value: str) -> float:
+def parse_positive_decimal(value: str, decimals: Optional[int] = None) -> float | int:
     """
     Convierte value a float positivo (>0). Acepta coma o punto como separador.
+    Con `decimals` devuelve en cambio el entero en punto fijo (ver parse_fixed_decimal).
     Lanza ValueError si no es válido.
     """
+    if decimals is not None:
+        if not isinstance(value, str):
+            raise ValueError("Valor no es una cadena.")
+        s = value.strip().replace(" ", "")
+        if not _DECIMAL_RE.match(s):
+            raise ValueError("Formato decimal inválido.")
+        n = parse_fixed_decimal(s.replace(",", "."), decimals)
+        if n <= 0:
+            raise ValueError("El número debe ser mayor que 0.")
+        return n
     if not isinstance(value, str):
         raise ValueError("Valor no es una cadena.")
     s = value.strip().replace(" ", "")
@@ -127,28 +152,179 @@ def parse_positive_decimal(value: str) -> float:
     return f
 
 
+def _redondear_al_par(n: int, resto: str) -> int:
+    # resto: dígitos descartados; exactamente la mitad redondea al par (como round())
+    if not resto.strip("0"):
+        return n
+    descartado, mitad = int(resto), 5 * 10 ** (len(resto) - 1)
+    return n + 1 if descartado > mitad or (descartado == mitad and n % 2) else n
+
+
+# Gramática finita de float(): dígitos con '_' simples entre ellos, punto opcional
+# a cualquier lado, exponente opcional y espacios solo en los extremos
+_DIGITOS = r"\d(?:_?\d)*"
+_FLOAT_RE = re.compile(rf"([+-]?)(?:({_DIGITOS})(?:\.({_DIGITOS})?)?|\.({_DIGITOS}))(?:[eE]([+-]?{_DIGITOS}))?")
+
+
+def parse_fixed_decimal(value: str, decimals: int = 2) -> int:
+    """
+    Convierte texto decimal a entero en punto fijo: '232.12' con decimals=2 -> 23212.
+    Trabaja sobre los dígitos, sin pasar por float; los decimales sobrantes se
+    redondean al par ('232.125' -> 23212). Acepta exactamente los textos finitos
+    que acepta float() ('12.', '.5', '1e3', '1_0'); nan, inf y los que float()
+    desborda a inf se rechazan. Lanza ValueError si no es válido.
+    """
+    if not isinstance(value, str):
+        raise ValueError("Valor no es una cadena.")
+    entero, punto, fraccion = value.partition(".")
+    # Camino rápido para el texto habitual de un CSV: '123' o '12.50'
+    if (entero.isascii() and entero.isdigit() and len(entero) < 300
+            and (not punto or (fraccion.isascii() and fraccion.isdigit()))):
+        n = int(entero + fraccion[:decimals].ljust(decimals, "0"))
+        return _redondear_al_par(n, fraccion[decimals:])
+    m = _FLOAT_RE.fullmatch(value.strip())
+    if m is None:
+        raise ValueError("Formato decimal inválido.")
+    if float(m.group(0)) in (float("inf"), float("-inf")):
+        raise ValueError("Número fuera de rango.")
+    signo, entero, fraccion, solo_fraccion, exponente = m.groups()
+    entero = (entero or "").replace("_", "")
+    digitos = entero + (fraccion or solo_fraccion or "").replace("_", "")
+    if not digitos.strip("0"):
+        return 0
+    # Posición del punto decimal en `digitos` una vez escalado por 10**decimals
+    corte = len(entero) + int(exponente or "0") + decimals
+    if corte < 0:
+        # Menos de una décima de la última unidad: redondea a 0
+        return 0
+    if corte >= len(digitos):
+        n = int(digitos + "0" * (corte - len(digitos)))
+    else:
+        n = _redondear_al_par(int(digitos[:corte] or "0"), digitos[corte:])
+    return -n if signo == "-" else n
+
+
+_ACENTOS = str.maketrans("áéíóúüñ", "aeiouun")
+
+
+def normalize_name(value: Optional[str], fold_accents: bool = False) -> str:
+    """
+    Forma canónica de un nombre para compararlo: sin espacios al inicio/final,
+    espacios internos colapsados y en minúsculas. Con fold_accents también
+    quita tildes, diéresis y la virgulilla de la ñ (Á -> a, Ñ -> n).
+    """
+    s = " ".join(clean_string(value).split()).lower()
+    return s.translate(_ACENTOS) if fold_accents else s
+
+
 def is_unique_name(name: str, container: Iterable[str]) -> bool:
     """
-    Comprueba si name no está en container (case-insensitive).
-    container puede ser keys de un dict o lista de nombres.
+    Comprueba si name no está en container (según normalize_name).
+    container puede ser keys de un dict, lista de nombres o un inventario que
+    ya indexe por nombre normalizado (consulta O(1) con sus propias reglas).
     """
     if not is_non_empty_string(name):
         return False
-    name_norm = clean_string(name).lower()
-    return all(name_norm != clean_string(c).lower() for c in container)
+    if getattr(container, "normaliza_nombres", False):
+        return name not in container
+    name_norm = normalize_name(name)
+    return all(name_norm != normalize_name(c) for c in container)
 
 
-def format_decimal(value: float, decimals: int = 2, decimal_sep: str = ",") -> str:
+def format_decimal(value: float | int, decimals: int = 2, decimal_sep: str = ",",
+                   scale: Optional[int] = None) -> str:
     """
     Formatea un número con `decimals` decimales y usa `decimal_sep`
     (por ejemplo \",\") como separador decimal.
+    Con `scale`, value es un entero en punto fijo con `scale` decimales
+    (23212 con scale=2 es 232.12) y se formatea de forma exacta.
     """
+    if scale is not None:
+        if decimals < scale:
+            texto = str(abs(value)).rjust(scale + 1, "0")
+            corte = len(texto) - (scale - decimals)
+            value = (-1 if value < 0 else 1) * _redondear_al_par(int(texto[:corte]), texto[corte:])
+            scale = decimals
+        signo = "-" if value < 0 else ""
+        texto = str(abs(value)).rjust(scale + 1, "0")
+        entero, fraccion = texto[:len(texto) - scale], texto[len(texto) - scale:] + "0" * (decimals - scale)
+        return signo + entero + (decimal_sep + fraccion if decimals else "")
     fmt = f"{{:.{decimals}f}}".format(value)
     if decimal_sep != ".":
         fmt = fmt.replace(".", decimal_sep)
     return fmt
 
 
+def are_valid_names(values: Sequence[Optional[str]], min_len: int = 1,
+                    max_len: int = 100) -> Tuple[List[bool], List[str]]:
+    """
+    Versión por lotes de is_valid_name.
+    Devuelve (máscara de validez, nombres limpios); los inválidos quedan como "".
+    """
+    match = _NAME_RE.match
+    mascara: List[bool] = []
+    limpios: List[str] = []
+    for value in values:
+        s = clean_string(value)
+        ok = min_len <= len(s) <= max_len and match(s) is not None
+        mascara.append(ok)
+        limpios.append(s if ok else "")
+    return mascara, limpios
+
+
+def parse_positive_ints(values: Sequence[str]) -> Tuple[List[bool], List[int]]:
+    """
+    Versión por lotes de parse_positive_int.
+    Devuelve (máscara de validez, enteros); los inválidos quedan como 0.
+    La regla escalar ya es solo int(), así que se aplica en línea sin más llamadas.
+    """
+    mascara: List[bool] = []
+    numeros: List[int] = []
+    for value in values:
+        try:
+            n = int(value)
+        except Exception:
+            n = 0
+        ok = n > 0
+        mascara.append(ok)
+        numeros.append(n if ok else 0)
+    return mascara, numeros
+
+
+def _es_decimal_ascii_limpio(s: str) -> bool:
+    # "123" o "12.5": lo que float() interpreta igual que _DECIMAL_RE + replace(',', '.')
+    if not s.isascii():
+        return False
+    if s.isdigit():
+        return True
+    entero, punto, fraccion = s.partition(".")
+    return bool(punto) and entero.isdigit() and fraccion.isdigit()
+
+
+def parse_positive_decimals(values: Sequence[str]) -> Tuple[List[bool], List[float]]:
+    """
+    Versión por lotes de parse_positive_decimal.
+    Devuelve (máscara de validez, números); los inválidos quedan como 0.0.
+    Camino rápido para texto ASCII ya limpio; el resto (coma decimal, espacios,
+    signo...) usa las reglas exactas.
+    """
+    mascara: List[bool] = []
+    numeros: List[float] = []
+    for value in values:
+        if type(value) is str and _es_decimal_ascii_limpio(value):
+            f = float(value)
+            ok = f > 0
+        else:
+            try:
+                f = parse_positive_decimal(value)
+                ok = True
+            except ValueError:
+                ok = False
+        mascara.append(ok)
+        numeros.append(f if ok else 0.0)
+    return mascara, numeros
+
+
 def parse_bool(value: str) -> Optional[bool]:
     """
     Interpreta respuestas yes/no en múltiples idiomas.
@@ -1,17 +1,28 @@
 import sys
 import os
+import time
+from typing import TYPE_CHECKING
 sys.path.append("../../Utils")
 
 from UserHistory.Service.services import (
-    agregar_producto, mostrar_inventario, buscar_producto,
+    agregar_producto, buscar_producto, buscar_similares,
     actualizar_producto, eliminar_producto, calcular_estadisticas,
-    guardar_csv, cargar_csv, BASE_DIR
+    guardar_csv, productos_en_rango, paginas_inventario, obtener_base_dir, TAM_PAGINA
+)
+from UserHistory.Utils.Decorators import (
+    color, instrumentar, metricas, metricas_json, metricas_prometheus, set_color_enabled
 )
-from UserHistory.Utils.Decorators import color
 from UserHistory.Utils.Validator import (
     is_valid_name, parse_positive_decimal, parse_positive_int, clean_string
 )
 
+# Almacenamiento, carga en paralelo, snapshot, journal e historial se importan en las
+# funciones que los usan: importar app (o mostrar el menú) no los carga
+if TYPE_CHECKING:
+    from UserHistory.Service.historial import Historial
+    from UserHistory.Service.journal import Journal
+    from UserHistory.Service.store import InventoryStore
+
 
 def decorar_mensaje(texto: str, simbolo: str = "-", col: str = "reset") -> str:
     linea = simbolo * max(len(texto), 40)
@@ -50,6 +61,7 @@ def pedir_valor_numeric(prompt: str, parser, opcional: bool = False) -> int | fl
             print(color(" Valor inválido.", "red"))
 
 
+@instrumentar
 def gestionar_agregar_producto(inventario: dict):
     """Gestiona la lógica para agregar un nuevo producto."""
     print(decorar_mensaje("Agregar Producto", "-", "blue"))
@@ -65,25 +77,44 @@ def gestionar_agregar_producto(inventario: dict):
         print(color("\n Error al agregar producto.\n", "red"))
 
 
+@instrumentar
 def gestionar_mostrar_inventario(inventario: dict):
     """Gestiona la lógica para mostrar el inventario."""
     print(decorar_mensaje("Inventario Actual", "-", "blue"))
     if not inventario:
         print(color("El inventario está vacío.\n", "yellow"))
-    else:
-        mostrar_inventario(inventario)
-        input(color("\n\nPresiona cualquier tecla para continuar.", "green"))
+        return
+    ordenes = {"": None, "N": "nombre", "P": "precio", "C": "cantidad", "S": "subtotal"}
+    while True:
+        entrada = input("Ordenar por (N)ombre, (P)recio, (C)antidad, (S)ubtotal [Enter = inserción]: ").strip().upper()
+        if entrada in ordenes:
+            break
+        print(color("Opción no válida.", "red"))
+    orden = ordenes[entrada]
+    # Precio, cantidad y subtotal se muestran de mayor a menor
+    descendente = orden not in (None, "nombre")
+    total_paginas = -(-len(inventario) // TAM_PAGINA)
+    # Solo se formatea la página visible: la primera aparece al instante aunque haya millones de productos
+    for numero, pagina in enumerate(paginas_inventario(inventario, TAM_PAGINA, orden, descendente), 1):
+        sys.stdout.write(pagina)
+        if numero == total_paginas:
+            break
+        seguir = input(color(f"\nPágina {numero}/{total_paginas} - Enter: siguiente | Q: volver al menú ", "green"))
+        if seguir.strip().upper() == "Q":
+            return
+    input(color("\n\nPresiona cualquier tecla para continuar.", "green"))
 
 
+@instrumentar
 def gestionar_buscar_producto(inventario: dict):
     """Gestiona la lógica para buscar un producto."""
     print(decorar_mensaje("Buscar Producto", "-", "blue"))
     if not inventario:
         print(color("El inventario está vacío. No hay productos para buscar.\n", "yellow"))
         return
-    nombre = pedir_nombre("Nombre del producto: ", inventario, debe_existir=True)
+    nombre = pedir_nombre("Nombre del producto: ")
     if not nombre:
-        print(color("\nOperación cancelada o producto no encontrado.\n", "yellow"))
+        print(color("\nOperación cancelada.\n", "yellow"))
         return
     producto = buscar_producto(inventario, nombre)
     if producto:
@@ -91,10 +122,19 @@ def gestionar_buscar_producto(inventario: dict):
             f"\n Encontrado: {producto.nombre} | Precio: ${producto.precio:.2f} | "
             f"Cantidad: {producto.cantidad} | Subtotal: ${producto.calcular_subtotal():.2f}\n", "green"
         ))
-    else:
+        return
+    sugerencias = buscar_similares(inventario, nombre)
+    if not sugerencias:
         print(color(" Producto no encontrado.\n", "yellow"))
+        return
+    print(color(" Producto no encontrado. ¿Quisiste decir?", "yellow"))
+    for similar, _ in sugerencias:
+        producto = buscar_producto(inventario, similar)
+        print(color(f"   - {producto.nombre} | Precio: ${producto.precio:.2f} | Cantidad: {producto.cantidad}", "cyan"))
+    print()
 
 
+@instrumentar
 def gestionar_actualizar_producto(inventario: dict):
     """Gestiona la lógica para actualizar un producto."""
     print(decorar_mensaje("Actualizar Producto", "-", "blue"))
@@ -118,6 +158,7 @@ def gestionar_actualizar_producto(inventario: dict):
         print(color("\n No se proporcionaron nuevos datos para actualizar.\n", "yellow"))
 
 
+@instrumentar
 def gestionar_eliminar_producto(inventario: dict):
     """Gestiona la lógica para eliminar un producto."""
     print(decorar_mensaje("Eliminar Producto", "-", "blue"))
@@ -134,6 +175,7 @@ def gestionar_eliminar_producto(inventario: dict):
         print(color("\n Error al eliminar.\n", "red"))
 
 
+@instrumentar
 def gestionar_estadisticas(inventario: dict):
     """Gestiona la lógica para mostrar estadísticas."""
     print(decorar_mensaje("ESTADÍSTICAS DEL INVENTARIO", "=", "magenta"))
@@ -152,25 +194,46 @@ def gestionar_estadisticas(inventario: dict):
     print("\n" + "=" * 40 + "\n")
 
 
+@instrumentar
+def gestionar_stock_bajo(inventario: dict):
+    """Lista los productos con stock menor o igual a un umbral, de menor a mayor."""
+    print(decorar_mensaje("Reporte de Stock Bajo", "-", "blue"))
+    if not inventario:
+        print(color("El inventario está vacío. No hay productos para revisar.\n", "yellow"))
+        return
+    umbral = pedir_valor_numeric("Mostrar productos con stock de hasta (uds): ", parse_positive_int)
+    productos = productos_en_rango(inventario, "cantidad", maximo=umbral)
+    if not productos:
+        print(color(f"\n Ningún producto tiene {umbral} uds o menos.\n", "green"))
+        return
+    print(f"\n{'Nombre':<20}{'Cantidad':>12}")
+    print("-" * 32)
+    for nombre, cantidad in productos:
+        print(f"{nombre:<20}{color(f'{cantidad:>12d}', 'yellow')}")
+    print(color(f"\n {len(productos)} producto(s) con stock bajo.\n", "cyan"))
+
+
+@instrumentar
 def gestionar_guardar_csv(inventario: dict):
     print(decorar_mensaje("Guardar Inventario", "-", "blue"))
     if not inventario:
         print(color("El inventario está vacío. No hay nada que guardar.\n", "yellow"))
         return
-    entrada = input(f"Nombre de archivo (Enter para '{os.path.join(BASE_DIR, 'inventario.csv')}'): ").strip()
+    entrada = input(f"Nombre de archivo (Enter para '{os.path.join(obtener_base_dir(), 'inventario.csv')}'): ").strip()
     archivo = entrada if entrada else None
     if guardar_csv(inventario, archivo):
-        ruta_final = os.path.join(BASE_DIR, 'inventario.csv') if archivo is None else archivo
+        ruta_final = os.path.join(obtener_base_dir(), 'inventario.csv') if archivo is None else archivo
         if not os.path.isabs(ruta_final):
-            ruta_final = os.path.join(BASE_DIR, ruta_final)
+            ruta_final = os.path.join(obtener_base_dir(), ruta_final)
         print(color(f"\n Inventario guardado en '{ruta_final}'.\n", "green"))
     else:
         print(color("\n Error al guardar el archivo.\n", "red"))
 
 
+@instrumentar
 def gestionar_cargar_csv(inventario: dict):
     print(decorar_mensaje("Cargar Inventario", "-", "blue"))
-    entrada = input(f"Nombre de archivo (Enter para '{os.path.join(BASE_DIR, 'inventario.csv')}'): ").strip()
+    entrada = input(f"Nombre de archivo (Enter para '{os.path.join(obtener_base_dir(), 'inventario.csv')}'): ").strip()
     archivo = entrada if entrada else None
 
     # Resolución previa para mostrar errores tempranos
@@ -198,7 +261,15 @@ def gestionar_cargar_csv(inventario: dict):
                     break
                 print(color("Opción no válida.", "red"))
 
-    exito, nuevos, actualizados, errores = cargar_csv(inventario, archivo, reemplazar, politica_precio)
+    if not reemplazar and inventario and input("¿Revisar los cambios antes de aplicarlos? [s/N]: ").strip().upper() == 'S':
+        resultado = previsualizar_fusion(inventario, archivo, politica_precio)
+        if resultado is None:
+            return
+        exito, nuevos, actualizados, errores = resultado
+    else:
+        # Los archivos grandes se procesan en varios procesos; los pequeños con cargar_csv
+        from UserHistory.Service.carga_paralela import cargar_csv_paralelo
+        exito, nuevos, actualizados, errores = cargar_csv_paralelo(inventario, archivo, reemplazar, politica_precio)
     if not exito:
         print(color(f"\n Error al procesar '{ruta}'.\n", "red"))
         return
@@ -211,6 +282,266 @@ def gestionar_cargar_csv(inventario: dict):
     if not (nuevos or actualizados): print(color("Sin cambios.", "yellow"))
     print(color("----------------------------------\n", "cyan"))
 
+def previsualizar_fusion(inventario: dict, archivo: str | None, politica_precio: str,
+                         muestra: int = 5) -> tuple | None:
+    """Muestra los cambios que haría la fusión y los aplica solo si se confirman."""
+    from UserHistory.Service.cambios import CambiosDesactualizados, aplicar_cambios, calcular_cambios
+    cambios = calcular_cambios(inventario, archivo)
+    if cambios is None:
+        return False, 0, 0, 0
+    resumen = cambios.resumen(politica_precio)
+    print(color("\n--- Cambios a aplicar ---", "cyan"))
+    print(f"Productos nuevos: {resumen['nuevos']}")
+    print(f"Productos existentes modificados: {resumen['productos_modificados']}")
+    print(f"Unidades agregadas: {resumen['unidades_agregadas']}")
+    print(f"Cambios de precio: {resumen['cambios_de_precio']}")
+    for nombre, antes, despues in cambios.cambios_de_precio(politica_precio)[:muestra]:
+        print(f"  {nombre}: {antes} -> {despues}")
+    if cambios.rechazos:
+        print(color(f"Filas con error: {len(cambios.rechazos)}", "red"))
+        for rechazo in cambios.rechazos[:muestra]:
+            print(color(f"  Línea {rechazo.linea}: {rechazo.motivo}", "red"))
+    if input("¿Aplicar estos cambios? [s/N]: ").strip().upper() != 'S':
+        print(color("\n No se aplicaron cambios.\n", "yellow"))
+        return None
+    try:
+        return (True, *aplicar_cambios(inventario, cambios, politica_precio))
+    except CambiosDesactualizados as e:
+        print(color(f"\n {e} Vuelve a cargar el archivo.\n", "red"))
+        return None
+
+@instrumentar
+def gestionar_guardar_snapshot(inventario: dict, journal: "Journal | None" = None):
+    """Guarda el inventario en formato binario para arrancar sin parsear CSV."""
+    from UserHistory.Service.snapshot import guardar_snapshot
+    print(decorar_mensaje("Guardar Snapshot", "-", "blue"))
+    if not inventario:
+        print(color("El inventario está vacío. No hay nada que guardar.\n", "yellow"))
+        return
+    ruta = os.path.join(obtener_base_dir(), 'inventario.snap')
+    if journal is not None:
+        # Con journal activo el snapshot además vacía el log de cambios
+        if journal.compactar():
+            print(color(f"\n Snapshot guardado en '{ruta}' y log compactado.\n", "green"))
+        else:
+            print(color("\n Error al guardar el snapshot. El log se conserva y se reaplicará al iniciar.\n", "red"))
+    elif guardar_snapshot(inventario):
+        print(color(f"\n Snapshot guardado en '{ruta}'. Se cargará al iniciar.\n", "green"))
+    else:
+        print(color("\n Error al guardar el snapshot.\n", "red"))
+
+
+@instrumentar
+def gestionar_metricas(inventario: dict):
+    """Muestra las llamadas y latencias registradas en la sesión y permite exportarlas."""
+    print(decorar_mensaje("Métricas de la Sesión", "-", "blue"))
+    datos = metricas()
+    if not datos["habilitadas"]:
+        print(color("Las métricas están desactivadas (USERHISTORY_METRICS=0).\n", "yellow"))
+        return
+    print(f"{'Función':<32}{'Llamadas':>10}{'Errores':>9}{'Total ms':>12}{'Media ms':>11}{'p99 ms':>10}")
+    print("-" * 84)
+    # Las funciones que más tiempo acumulan primero
+    funciones = sorted(datos["funciones"].items(), key=lambda kv: kv[1]["segundos_total"], reverse=True)
+    for nombre, f in funciones:
+        media = f["segundos_total"] / f["llamadas"] * 1000
+        p99 = f"<{f['p99'] * 1000:.3g}" if f["p99"] is not None else "-"
+        print(f"{nombre:<32}{f['llamadas']:>10}{f['errores']:>9}{f['segundos_total'] * 1000:>12.2f}"
+              f"{media:>11.3f}{p99:>10}")
+    for nombre, valor in sorted(datos["contadores"].items()):
+        print(f"{nombre}: " + color(str(valor), "cyan"))
+    formato = input("\nExportar (J)SON, (P)rometheus o Enter para volver: ").strip().upper()
+    if formato not in ("J", "P"):
+        return
+    ruta = os.path.join(obtener_base_dir(), "metricas.json" if formato == "J" else "metricas.prom")
+    if exportar_metricas(ruta):
+        print(color(f"\n Métricas exportadas a '{ruta}'.\n", "green"))
+    else:
+        print(color("\n Error al exportar las métricas.\n", "red"))
+
+
+def exportar_metricas(ruta: str) -> bool:
+    """Escribe las métricas en `ruta`: formato Prometheus si termina en .prom, JSON en otro caso."""
+    texto = metricas_prometheus() if ruta.endswith(".prom") else metricas_json()
+    try:
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(texto)
+        return True
+    except OSError:
+        return False
+
+
+def pedir_fecha(prompt: str) -> float | None:
+    """Lee 'AAAA-MM-DD' o 'AAAA-MM-DD HH:MM[:SS]' (hora local) y devuelve el timestamp."""
+    from datetime import datetime
+    while True:
+        entrada = input(prompt).strip()
+        if entrada == "":
+            return None
+        for formato in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(entrada, formato).timestamp()
+            except ValueError:
+                pass
+        print(color(" Fecha inválida. Usa AAAA-MM-DD o AAAA-MM-DD HH:MM.", "red"))
+
+
+@instrumentar
+def gestionar_historial(inventario: dict, historial: "Historial | None", limite: int = 20):
+    """Muestra los cambios de un producto o el inventario tal como estaba en una fecha."""
+    from datetime import datetime
+    print(decorar_mensaje("Historial", "-", "blue"))
+    if historial is None:
+        print(color("El historial está desactivado (inicia con --historial).\n", "yellow"))
+        return
+    while True:
+        modo = input("(P)roducto o (I)nventario en una fecha? [P/I]: ").strip().upper()
+        if modo in ("P", "I"):
+            break
+        print(color("Opción no válida.", "red"))
+    if modo == "I":
+        fecha = pedir_fecha("Fecha (AAAA-MM-DD [HH:MM]): ")
+        if fecha is None:
+            print(color("\nOperación cancelada.\n", "yellow"))
+            return
+        pasado = historial.inventario_en(fecha)
+        if not pasado:
+            print(color("\n No había productos en esa fecha.\n", "yellow"))
+            return
+        estadisticas = calcular_estadisticas(pasado)
+        print(color(f"\n {len(pasado)} productos, {estadisticas['unidades_totales']} uds, "
+                    f"valor ${estadisticas['valor_total']:.2f}", "cyan"))
+        print(f"\n{'Nombre':<30}{'Precio':>12}{'Cantidad':>12}")
+        print("-" * 54)
+        for producto in list(pasado.values())[:limite]:
+            print(f"{producto.nombre:<30}{producto.precio:>12.2f}{producto.cantidad:>12d}")
+        if len(pasado) > limite:
+            print(color(f" ... y {len(pasado) - limite} más.", "cyan"))
+        print()
+        return
+    nombre = pedir_nombre("Nombre del producto: ")
+    if not nombre:
+        print(color("\nOperación cancelada.\n", "yellow"))
+        return
+    # El historial usa el nombre tal como está guardado; un producto ya eliminado se busca tal cual
+    producto = buscar_producto(inventario, nombre)
+    puntos = historial.serie(producto.nombre if producto else nombre)
+    if not puntos:
+        print(color(f"\n Sin historial para '{nombre}'.\n", "yellow"))
+        return
+    print(f"\n{'Fecha':<22}{'Precio':>12}{'Cantidad':>12}")
+    print("-" * 46)
+    for tiempo, precio, cantidad in puntos[-limite:]:
+        fecha = datetime.fromtimestamp(tiempo).strftime("%Y-%m-%d %H:%M:%S")
+        if precio is None:
+            print(f"{fecha:<22}" + color(f"{'eliminado':>24}", "red"))
+        else:
+            print(f"{fecha:<22}{precio:>12.2f}{cantidad:>12d}")
+    print(color(f"\n {len(puntos)} cambio(s) registrados.\n", "cyan"))
+
+
+def inventario_inicial(avisos=None, sqlite: str | None = None,
+                       decimales: int | None = None) -> "tuple[InventoryStore, Journal | None]":
+    """
+    Recupera el último snapshot más el log de cambios y activa el journal.
+    Con `sqlite` abre en cambio esa base de datos, que ya es persistente (sin journal).
+    Con `decimales` los precios se guardan en punto fijo (solo snapshot + log).
+    """
+    avisos = avisos or sys.stdout
+    if sqlite is not None:
+        from UserHistory.Service.base_datos import InventarioSQLite
+        inventario, journal = InventarioSQLite(sqlite), None
+    else:
+        from UserHistory.Service.journal import abrir_inventario
+        inventario, journal = abrir_inventario()
+    try:
+        # 'Papa', 'papa' y ' PAPA ' son el mismo producto (salvo que el snapshot ya traiga su modo)
+        if not inventario.normaliza_nombres:
+            inventario.normalizar_nombres()
+    except ValueError as e:
+        print(color(f" Nombres duplicados al normalizar ({e}); se usan nombres exactos.", "yellow"), file=avisos)
+    if decimales is not None:
+        if sqlite is not None:
+            print(color(" --decimales no aplica a SQLite; los precios se guardan como REAL.", "yellow"), file=avisos)
+        else:
+            inventario.fijar_decimales(decimales)
+    if inventario:
+        print(color(f" Inventario recuperado: {len(inventario)} productos.", "green"), file=avisos)
+    return inventario, journal
+
+
+def cerrar_inventario(inventario, journal: "Journal | None", historial: "Historial | None" = None) -> None:
+    """Deja en disco el log de cambios (y el historial) o cierra la base de datos, según el almacenamiento."""
+    if historial is not None:
+        historial.cerrar()
+    if journal is not None:
+        journal.cerrar()
+    cerrar = getattr(inventario, "cerrar", None)
+    if cerrar is not None:
+        cerrar()
+
+
+def ejecutar_batch(ruta: str, ruta_salida: str | None = None, sqlite: str | None = None,
+                   decimales: int | None = None, con_historial: bool = False) -> int:
+    """Modo sin menú: ejecuta comandos JSONL de `ruta` ('-' = stdin) y escribe un resultado JSONL por comando."""
+    import json
+    from UserHistory.Service.comandos import ejecutar_comandos, leer_comandos
+    # Los avisos van a stderr para que la salida sea JSONL puro
+    inventario, journal = inventario_inicial(avisos=sys.stderr, sqlite=sqlite, decimales=decimales)
+    historial = None
+    if con_historial:
+        from UserHistory.Service.historial import abrir_historial
+        historial = abrir_historial(inventario)
+    try:
+        entrada = sys.stdin if ruta == "-" else open(ruta, encoding="utf-8")
+        salida = sys.stdout if ruta_salida is None else open(ruta_salida, "w", encoding="utf-8")
+    except OSError as e:
+        print(color(f" No se pudo abrir el archivo: {e}", "red"), file=sys.stderr)
+        cerrar_inventario(inventario, journal, historial)
+        return 2
+    total = fallidos = 0
+    inicio = time.perf_counter()
+    try:
+        for resultado in ejecutar_comandos(inventario, leer_comandos(entrada), historial=historial):
+            total += 1
+            fallidos += not resultado["ok"]
+            salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+        else:
+            salida.flush()
+        cerrar_inventario(inventario, journal, historial)
+    segundos = time.perf_counter() - inicio
+    print(color(f" {total} comandos ({fallidos} fallidos) en {segundos:.3f}s: "
+                f"{total / segundos if segundos else 0:.0f} ops/s", "cyan"), file=sys.stderr)
+    return 0
+
+
+def parsear_argumentos(argv: list | None = None) -> "argparse.Namespace":
+    # argparse se importa aquí para no cargarlo cuando app se usa como módulo
+    import argparse
+    parser = argparse.ArgumentParser(description="Gestión de inventario (menú interactivo o modo batch).")
+    parser.add_argument("--batch", metavar="ARCHIVO",
+                        help="ejecuta comandos JSONL desde ARCHIVO ('-' para stdin) sin mostrar el menú")
+    parser.add_argument("--salida", metavar="ARCHIVO",
+                        help="archivo donde escribir los resultados JSONL del modo batch (por defecto stdout)")
+    parser.add_argument("--no-color", action="store_true", help="desactiva los colores ANSI")
+    parser.add_argument("--sqlite", metavar="ARCHIVO",
+                        help="guarda el inventario en la base SQLite ARCHIVO en vez de snapshot + log "
+                             "(relativo al directorio de datos; se crea si no existe)")
+    parser.add_argument("--decimales", type=int, metavar="N",
+                        help="guarda los precios en punto fijo con N decimales (sumas exactas; redondea al cargar)")
+    parser.add_argument("--historial", action="store_true",
+                        help="registra cada cambio de precio y cantidad en historial.seg del directorio de datos "
+                             "(consultas por producto y del inventario en una fecha)")
+    parser.add_argument("--metricas", metavar="ARCHIVO",
+                        help="al salir escribe las métricas de la sesión en ARCHIVO (.prom = Prometheus, si no JSON)")
+    return parser.parse_args(argv)
+
+
 def mostrar_menu():
     print(decorar_mensaje("MENÚ INVENTARIO", "=", "cyan"))
     print("1. Agregar producto")
@@ -222,11 +553,28 @@ def mostrar_menu():
     print("7. Guardar CSV")
     print("8. Cargar CSV")
     print("9. Salir")
+    # Las opciones nuevas van después de Salir: 1-9 conservan su número original
+    print("10. Guardar snapshot")
+    print("11. Reporte de stock bajo")
+    print("12. Métricas")
+    print("13. Historial")
     print("=" * 40 + "\n")
 
 
-def main():
-    inventario = {}
+def main(argv: list | None = None):
+    args = parsear_argumentos(argv)
+    if args.no_color:
+        set_color_enabled(False)
+    if args.batch is not None:
+        codigo = ejecutar_batch(args.batch, args.salida, args.sqlite, args.decimales, args.historial)
+        if args.metricas:
+            exportar_metricas(args.metricas)
+        sys.exit(codigo)
+    inventario, journal = inventario_inicial(sqlite=args.sqlite, decimales=args.decimales)
+    historial = None
+    if args.historial:
+        from UserHistory.Service.historial import abrir_historial
+        historial = abrir_historial(inventario)
     opciones = {
         "1": gestionar_agregar_producto,
         "2": gestionar_mostrar_inventario,
@@ -236,11 +584,15 @@ def main():
         "6": gestionar_estadisticas,
         "7": gestionar_guardar_csv,
         "8": gestionar_cargar_csv,
+        "10": lambda inv: gestionar_guardar_snapshot(inv, journal),
+        "11": gestionar_stock_bajo,
+        "12": gestionar_metricas,
+        "13": lambda inv: gestionar_historial(inv, historial),
     }
     while True:
         try:
             mostrar_menu()
-            opcion = input(color("Selecciona una opción (1-9): ", "yellow")).strip()
+            opcion = input(color("Selecciona una opción (1-13): ", "yellow")).strip()
 
             if opcion == "9":
                 print(decorar_mensaje("¡Hasta pronto!", "-", "blue"))
@@ -250,13 +602,17 @@ def main():
             if accion:
                 accion(inventario)
             else:
-                print(color(" Opción inválida. Selecciona 1-9.\n", "red"))
+                print(color(" Opción inválida. Selecciona 1-13.\n", "red"))
 
         except KeyboardInterrupt:
             print(color("\n Operación cancelada. Saliendo...\n", "yellow"))
             break
         except Exception as e:
             print(color(f"\n Error inesperado: {e}\n", "red"))
+    # Deja el log de cambios sincronizado en disco antes de salir
+    cerrar_inventario(inventario, journal, historial)
+    if args.metricas:
+        exportar_metricas(args.metricas)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,18 @@
+"""
+Configuración de pytest para las pruebas de `UserHistory/Tests`:
+- la raíz del repositorio queda en sys.path (los módulos se importan como `UserHistory.…`)
+- cada prueba usa un directorio de datos temporal, nunca `UserHistory/Data`
+
+Uso:
+    python -m pytest -q
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def directorio_datos(tmp_path, monkeypatch):
+    from UserHistory.Service import services
+    monkeypatch.setenv("USERHISTORY_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(services, "_base_dir", None)
+    return tmp_path